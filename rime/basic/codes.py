@@ -22,19 +22,25 @@
 #
 
 import optparse
+import os
 import os.path
 import signal
 import subprocess
+import tempfile
 
 from rime.basic import consts
 from rime.core import codes
 from rime.core import taskgraph
+from rime.util import compression
 from rime.util import files
 
 
 class CodeBase(codes.Code):
   """Base class of program codes with various common methods."""
 
+  # Maximum size of outputs of a run in bytes, or None if unlimited.
+  output_limit = None
+
   def __init__(self, src_name, src_dir, out_dir, compile_args, run_args):
     super(CodeBase, self).__init__(src_name, src_dir, out_dir)
     self.log_name = os.path.splitext(src_name)[0] + consts.LOG_EXT
@@ -81,6 +87,33 @@ class CodeBase(codes.Code):
   def ReadCompileLog(self):
     return files.ReadFile(os.path.join(self.out_dir, self.log_name))
 
+  def GetBinaryHash(self, hash_file=None):
+    """Returns a hash of the run command and the program files."""
+    if hash_file is None:
+      hash_file = files.GetFileHash
+    # Absolute paths are reduced to basenames so that the hash does not
+    # depend on the location of the project.
+    parts = [self.__class__.__name__]
+    parts += [os.path.basename(arg) if os.path.isabs(arg) else arg
+              for arg in self.run_args]
+    for path in self._GetBinaryFiles():
+      parts += [os.path.basename(path), hash_file(path)]
+    return files.GetDataHash(*parts)
+
+  def _GetBinaryFiles(self):
+    """Lists files the program consists of.
+
+    By default, run arguments pointing to files owned by this code.
+    """
+    paths = []
+    for arg in self.run_args:
+      if not os.path.isabs(arg) or not os.path.isfile(arg):
+        continue
+      if any(d and arg.startswith(os.path.join(d, ''))
+             for d in (self.src_dir, self.out_dir)):
+        paths.append(arg)
+    return paths
+
   @taskgraph.task_method
   def _ExecForCompile(self, args):
     with open(os.path.join(self.out_dir, self.log_name), 'w') as outfile:
@@ -91,8 +124,25 @@ class CodeBase(codes.Code):
   @taskgraph.task_method
   def _ExecForRun(self, args, cwd, input, output, timeout, precise,
                   redirect_error=False):
-    with open(input, 'r') as infile:
-      with open(output, 'w') as outfile:
+    if self.output_limit is not None and compression.IsCompressed(output):
+      # Output limits do not apply to pipes to compressors, so the output is
+      # written to a plain file first and compressed after the run.
+      fd, plain_output = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(output)), prefix='.rime-out')
+      os.close(fd)
+      try:
+        result = yield self._ExecForRun(
+          args=args, cwd=cwd, input=input, output=plain_output,
+          timeout=timeout, precise=precise, redirect_error=redirect_error)
+        compression.CompressFile(plain_output, output)
+      finally:
+        os.remove(plain_output)
+        files.InvalidatePath(plain_output)
+      yield result
+    files.Unshare(output)
+    # Compressed files are streamed through pipes.
+    with compression.OpenInput(input) as infile:
+      with compression.OpenOutput(output) as outfile:
         if redirect_error:
           errfile = subprocess.STDOUT
         else:
@@ -100,14 +150,14 @@ class CodeBase(codes.Code):
         yield (yield self._ExecInternal(
             args=args, cwd=cwd,
             stdin=infile, stdout=outfile, stderr=errfile, timeout=timeout,
-            precise=precise))
+            precise=precise, output_limit=self.output_limit))
 
   @taskgraph.task_method
   def _ExecInternal(self, args, cwd, stdin, stdout, stderr,
-                    timeout=None, precise=False):
+                    timeout=None, precise=False, output_limit=None):
     task = taskgraph.ExternalProcessTask(
       args, cwd=cwd, stdin=stdin, stdout=stdout, stderr=stderr, timeout=timeout,
-      exclusive=precise)
+      exclusive=precise, output_limit=output_limit)
     proc = yield task
     code = proc.returncode
     # Retry if TLE.
@@ -115,18 +165,37 @@ class CodeBase(codes.Code):
       self._ResetIO(stdin, stdout, stderr)
       task = taskgraph.ExternalProcessTask(
         args, cwd=cwd, stdin=stdin, stdout=stdout, stderr=stderr, timeout=timeout,
-        exclusive=True)
+        exclusive=True, output_limit=output_limit)
       proc = yield task
       code = proc.returncode
+    self._InvalidateOutputs(cwd, stdout)
     if code == 0:
       status = codes.RunResult.OK
     elif code == -(signal.SIGXCPU):
       status = codes.RunResult.TLE
+    elif self._IsOutputLimitExceeded(code, stdout, output_limit):
+      status = codes.RunResult.OLE
     elif code < 0:
       status = codes.RunResult.RE
     else:
       status = codes.RunResult.NG
-    yield codes.RunResult(status, task.time)
+    yield codes.RunResult(status, task.time, task.memory)
+
+  def _IsOutputLimitExceeded(self, code, stdout, output_limit):
+    """Checks if the process failed by writing beyond the output limit."""
+    if output_limit is None or code == 0:
+      return False
+    if code == -(signal.SIGXFSZ):
+      return True
+    # Programs ignoring SIGXFSZ, e.g. Python scripts, fail to write instead.
+    return (isinstance(stdout, file) and
+            os.fstat(stdout.fileno()).st_size >= output_limit)
+
+  def _InvalidateOutputs(self, cwd, stdout):
+    """Drops cached listings which the process may have changed."""
+    files.InvalidatePath(cwd)
+    if isinstance(stdout, file):
+      files.InvalidatePath(stdout.name)
 
   def _ResetIO(self, *args):
     for f in args:
@@ -183,6 +252,11 @@ class JavaCode(CodeBase):
                  '-cp', files.ConvPath(out_dir)] +
                 run_flags + [mainclass]))
 
+  def _GetBinaryFiles(self):
+    return sorted(os.path.join(self.out_dir, name)
+                  for name in files.ListDir(self.out_dir, True)
+                  if name.endswith('.class'))
+
 
 class ScriptCode(CodeBase):
   QUIET_COMPILE = True
@@ -242,6 +316,7 @@ class InternalDiffCode(CodeBase):
     parser.add_option('-o', '--outfile', dest='outfile')
     (options, pos_args) = parser.parse_args([''] + list(args))
     run_args = ('diff', '-u', options.difffile, options.outfile)
+    files.Unshare(output)
     with open(input, 'r') as infile:
       with open(output, 'w') as outfile:
         if redirect_error:
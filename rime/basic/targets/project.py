@@ -44,27 +44,55 @@ class Project(targets.registry.Project):
     self._ChainLoad(ui)
 
   def _ChainLoad(self, ui):
-    # Chain-load problems.
-    self.problems = []
+    # Problems are loaded on demand; here we only find their directories.
+    self._ui = ui
+    self._problem_dirs = {}
+    self._loaded_problems = {}
+    self._all_problems = None
     for name in files.ListDir(self.base_dir):
       path = os.path.join(self.base_dir, name)
       if targets.registry.Problem.CanLoadFrom(path):
-        problem = targets.registry.Problem(name, path, self)
-        try:
-          problem.Load(ui)
-          self.problems.append(problem)
-        except targets.ConfigurationError:
-          ui.errors.Exception(problem)
-    self.problems.sort(lambda a, b: cmp((a.id, a.name), (b.id, b.name)))
+        self._problem_dirs[name] = path
+
+  @property
+  def problems(self):
+    """All problems in the project, loaded at the first access."""
+    if self._all_problems is None:
+      problems = [self._LoadProblem(name)
+                  for name in sorted(self._problem_dirs)]
+      self._all_problems = [problem for problem in problems if problem]
+      self._all_problems.sort(
+        lambda a, b: cmp((a.id, a.name), (b.id, b.name)))
+    return self._all_problems
+
+  def _LoadProblem(self, name):
+    """Loads a problem by its directory name.
+
+    Returns None if the problem could not be loaded.
+    """
+    if name not in self._loaded_problems:
+      problem = targets.registry.Problem(
+        name, self._problem_dirs[name], self)
+      try:
+        problem.Load(self._ui)
+      except targets.ConfigurationError:
+        self._ui.errors.Exception(problem)
+        problem = None
+      self._loaded_problems[name] = problem
+    return self._loaded_problems[name]
 
   def FindByBaseDir(self, base_dir):
     if self.base_dir == base_dir:
       return self
-    for problem in self.problems:
-      obj = problem.FindByBaseDir(base_dir)
-      if obj:
-        return obj
-    return None
+    # Load only the problem containing base_dir.
+    relpath = os.path.relpath(base_dir, self.base_dir)
+    name = relpath.split(os.sep)[0]
+    if name not in self._problem_dirs:
+      return None
+    problem = self._LoadProblem(name)
+    if problem is None:
+      return None
+    return problem.FindByBaseDir(base_dir)
 
   @taskgraph.task_method
   def Build(self, ui):
@@ -35,6 +35,14 @@ from rime.core import taskgraph
 from rime.util import files
 
 
+_DIGITS_RE = re.compile(r'\d+')
+
+
+def _GetSortKey(name):
+  """Returns a key to sort names with numbers padded to the same width."""
+  return _DIGITS_RE.sub(lambda match: '%08s' % match.group(0), name)
+
+
 class Testset(targets.TargetBase, problem.ProblemComponentMixin):
   """Testset target."""
 
@@ -103,13 +111,7 @@ class Testset(targets.TargetBase, problem.ProblemComponentMixin):
 
   def _SortTestCases(self, testcases):
     """Sorts test cases in a little bit smarter way."""
-    def tokenize_cmp(a, b):
-      def tokenize(s):
-        def replace_digits(match):
-          return '%08s' % match.group(0)
-        return re.sub(r'\d+', replace_digits, s)
-      return cmp(tokenize(a.infile), tokenize(b.infile))
-    testcases.sort(tokenize_cmp)
+    testcases.sort(key=lambda testcase: _GetSortKey(testcase.infile))
 
   @taskgraph.task_method
   def Build(self, ui):
@@ -376,12 +378,17 @@ class Testset(targets.TargetBase, problem.ProblemComponentMixin):
     ui.console.PrintAction('TEST', solution, *status_row)
     if solution.IsCorrect() and not result.expected:
       assert result.notable_testcase
-      judgefile = (os.path.splitext(result.notable_testcase.infile)[0] +
-                   consts.JUDGE_EXT)
-      log = files.ReadFile(judgefile)
-      ui.console.PrintLog(log)
+      ui.console.PrintLog(
+        self._ReadJudgeLog(solution, result.notable_testcase))
     yield [result]
 
+  def _ReadJudgeLog(self, solution, testcase):
+    """Returns the judge log of a test case, or None if missing."""
+    return files.ReadFile(os.path.join(
+      solution.out_dir,
+      os.path.splitext(os.path.basename(testcase.infile))[0] +
+      consts.JUDGE_EXT))
+
   @taskgraph.task_method
   def _TestSolutionWithChallengeCases(self, solution, ui):
     """Test a wrong solution which has explicitly-specified challenge cases."""
@@ -435,6 +442,7 @@ class Testset(targets.TargetBase, problem.ProblemComponentMixin):
         raise taskgraph.Bailout([False])
     elif case_result.verdict not in (test.TestCaseResult.WA,
                                      test.TestCaseResult.TLE,
+                                     test.TestCaseResult.OLE,
                                      test.TestCaseResult.RE):
       result.Finalize(False,
                       '%s: Judge Error' % os.path.basename(testcase.infile),
@@ -480,6 +488,7 @@ class Testset(targets.TargetBase, problem.ProblemComponentMixin):
     if case_result.verdict not in (test.TestCaseResult.AC,
                                    test.TestCaseResult.WA,
                                    test.TestCaseResult.TLE,
+                                   test.TestCaseResult.OLE,
                                    test.TestCaseResult.RE):
       result.Finalize(False,
                       '%s: Judge Error' %
@@ -546,10 +555,13 @@ class Testset(targets.TargetBase, problem.ProblemComponentMixin):
     if res.status == core_codes.RunResult.TLE:
       yield test.TestCaseResult(solution, testcase, test.TestCaseResult.TLE,
                                 time=None, cached=False)
+    if res.status == core_codes.RunResult.OLE:
+      yield test.TestCaseResult(solution, testcase, test.TestCaseResult.OLE,
+                                time=None, cached=False)
     if res.status != core_codes.RunResult.OK:
       yield test.TestCaseResult(solution, testcase, test.TestCaseResult.RE,
                                 time=None, cached=False)
-    time = res.time
+    time, memory = res.time, res.memory
     for judge in self.judges:
       res = yield judge.Run(
         args=('--infile', testcase.infile,
@@ -567,7 +579,7 @@ class Testset(targets.TargetBase, problem.ProblemComponentMixin):
                                   test.TestVerdict('Validator %s' % res.status),
                                   time=None, cached=False)
     yield test.TestCaseResult(solution, testcase, test.TestCaseResult.AC,
-                              time=time, cached=False)
+                              time=time, cached=False, memory=memory)
 
   @taskgraph.task_method
   def Clean(self, ui):
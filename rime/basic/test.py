@@ -57,15 +57,47 @@ class TestCaseResult(object):
   AC = TestVerdict('Accepted')
   WA = TestVerdict('Wrong Answer')
   TLE = TestVerdict('Time Limit Exceeded')
+  OLE = TestVerdict('Output Limit Exceeded')
   RE = TestVerdict('Runtime Error')
   ERR = TestVerdict('System Error')
 
-  def __init__(self, solution, testcase, verdict, time, cached):
+  def __init__(self, solution, testcase, verdict, time, cached, memory=None,
+               alias_of=None, first_time=None):
     self.solution = solution
     self.testcase = testcase
     self.verdict = verdict
     self.time = time
     self.cached = cached
+    # Peak memory usage in bytes, or None if unknown.
+    self.memory = memory
+    # Test case whose result is reused as identical, or None.
+    self.alias_of = alias_of
+    # Time of the first attempt if the case was run again, or None.
+    self.first_time = first_time
+
+  def ToDict(self):
+    """Returns a JSON-serializable summary of this result."""
+    return {
+      'testcase': os.path.basename(self.testcase.infile),
+      'verdict': self.verdict.msg,
+      'time': self.time,
+      'memory': self.memory,
+      'cached': self.cached,
+      'alias_of': (os.path.basename(self.alias_of.infile)
+                   if self.alias_of else None),
+      'first_time': self.first_time,
+      }
+
+
+def LookupVerdict(msg):
+  """Returns the verdict with the message, e.g. of a cached result.
+
+  Well-known verdicts are compared by identity, so they are reused.
+  """
+  for verdict in TestCaseResult.__dict__.values():
+    if isinstance(verdict, TestVerdict) and verdict.msg == msg:
+      return verdict
+  return TestVerdict(msg)
 
 
 class TestsetResult(object):
@@ -133,3 +165,26 @@ class TestsetResult(object):
     All case should be accepted.
     """
     return sum([c.time for k, c in self.results.items()])
+
+  def GetMaxMemory(self):
+    """Get maximum memory usage in bytes, or None if unknown."""
+    memories = [c.memory for c in self.results.values()
+                if c.memory is not None]
+    return max(memories) if memories else None
+
+  def ToDict(self):
+    """Returns a JSON-serializable summary of this result."""
+    accepted = self.IsAccepted()
+    return {
+      'problem': self.problem.name,
+      'testset': self.testset.name,
+      'solution': self.solution.name,
+      'accepted': accepted,
+      'expected': getattr(self, 'expected', None),
+      'detail': getattr(self, 'detail', None),
+      'max_time': self.GetMaxTime() if accepted and self.results else None,
+      'total_time': self.GetTotalTime() if accepted and self.results else None,
+      'max_memory': self.GetMaxMemory(),
+      'cases': [self.results[testcase].ToDict()
+                for testcase in self.testcases],
+      }
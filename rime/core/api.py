@@ -0,0 +1,171 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+"""Library interface to run Rime from other programs.
+
+Example:
+
+  session = api.Session('/path/to/project', parallelism=4)
+  result = session.Test('a+b')
+  for testset_result in result.value:
+    print testset_result.ToDict()
+  session.Close()
+
+A session keeps the project loaded between calls, so it can serve many
+requests in a long-running process without spawning rime for each of them.
+"""
+
+import os.path
+import threading
+
+from rime.core import commands as commands_mod
+from rime.core import hooks
+from rime.core import main
+from rime.core import ui as ui_mod
+from rime.util import console as console_mod
+from rime.util import files
+from rime.util import struct
+
+
+class Error(Exception):
+  pass
+
+
+class Result(object):
+  """Result of a command run in a session.
+
+  value is what the target returned: a list of TestsetResult for Test, and
+  a success flag for Build and Clean. errors and warnings hold messages
+  emitted while running the command.
+  """
+
+  def __init__(self, value, errors, warnings):
+    self.value = value
+    self.errors = errors
+    self.warnings = warnings
+
+  def IsSuccess(self):
+    return not self.errors and self.value is not False
+
+  def ToDict(self):
+    """Returns a JSON-serializable summary of this result."""
+    value = self.value
+    if isinstance(value, list):
+      value = [v.ToDict() if hasattr(v, 'ToDict') else v for v in value]
+    return {
+      'value': value,
+      'errors': self.errors,
+      'warnings': self.warnings,
+      }
+
+
+class Session(object):
+  """A loaded project to run commands on.
+
+  Options are given by their variable names, e.g. parallelism, precise,
+  cache_tests and keep_going, as well as those added by plugins. Commands
+  are serialized, so a session can be shared among threads.
+  """
+
+  def __init__(self, project_dir, console=None, **options):
+    self.project_dir = os.path.abspath(project_dir)
+    self.console = console or console_mod.NullConsole()
+    self.options = options
+    self.project = None
+    self._lock = threading.Lock()
+    main.LoadRequiredModules(self.project_dir)
+    self._commands = commands_mod.GetCommands()
+    self.ui = ui_mod.UiContext(
+      self._MakeOptions('test', {}), self.console, self._commands, None)
+    self.Reload()
+
+  def Build(self, target=None, **options):
+    """Builds a target and its dependencies."""
+    return self._Run('build', 'Build', target, options)
+
+  def Test(self, target=None, **options):
+    """Runs tests in a target and returns TestsetResult in the value."""
+    return self._Run('test', 'Test', target, options)
+
+  def Clean(self, target=None, **options):
+    """Removes intermediate files of a target."""
+    return self._Run('clean', 'Clean', target, options)
+
+  def Reload(self):
+    """Loads configs again, e.g. after they are edited."""
+    with self._lock:
+      self._CloseProject()
+      files.InvalidatePath()
+      self.ui.errors = ui_mod.ErrorRecorder(self.ui)
+      self.project = main.LoadProject(self.project_dir, self.ui)
+      if self.project is None:
+        errors = self.ui.errors.errors or ['PROJECT not found']
+        raise Error('%s: %s' % (self.project_dir, '; '.join(errors)))
+
+  def Close(self):
+    """Releases caches held by the project."""
+    with self._lock:
+      self._CloseProject()
+
+  def _Run(self, cmd_name, method_name, target, options):
+    with self._lock:
+      if self.project is None:
+        raise Error('Session is closed')
+      merged_options = dict(self.options)
+      merged_options.update(options)
+      self.ui.options = self._MakeOptions(cmd_name, merged_options)
+      self.ui.console = self.console
+      self.ui.graph = main.CreateTaskGraph(self.ui.options)
+      self.ui.errors = ui_mod.ErrorRecorder(self.ui)
+      # Files may have changed since the last command.
+      files.InvalidatePath()
+      obj = self.project.FindByBaseDir(self._ResolveTarget(target))
+      if obj is None:
+        raise Error('Target is missing or not managed by Rime: %s' % target)
+      method = getattr(obj, method_name, None)
+      if method is None:
+        raise Error('%s is not supported for %s' % (cmd_name, obj.fullname))
+      hooks.pre_command(self.ui)
+      value = self.ui.graph.Run(method(self.ui))
+      hooks.post_command(self.ui)
+      return Result(value, list(self.ui.errors.errors),
+                    list(self.ui.errors.warnings))
+
+  def _ResolveTarget(self, target):
+    if target is None:
+      return self.project.base_dir
+    return os.path.normpath(os.path.join(self.project.base_dir, target))
+
+  def _MakeOptions(self, cmd_name, options):
+    cmd = self._commands[cmd_name]
+    values = cmd.GetDefaultOptionDict()
+    for name, value in options.items():
+      if name not in values:
+        raise Error('Unknown option for %s: %s' % (cmd_name, name))
+      values[name] = value
+    return struct.Struct(values)
+
+  def _CloseProject(self):
+    if self.project is not None and hasattr(self.project, 'CloseCaches'):
+      self.project.CloseCaches()
+    self.project = None
@@ -36,10 +36,15 @@ class RunResult(object):
   NG = 'Exited Abnormally'
   RE = 'Runtime Error'
   TLE = 'Time Limit Exceeded'
+  OLE = 'Output Limit Exceeded'
 
-  def __init__(self, status, time):
+  def __init__(self, status, time, memory=None, first_time=None):
     self.status = status
     self.time = time
+    # Peak memory usage in bytes, or None if unknown.
+    self.memory = memory
+    # Time of the first attempt if the run was retried, or None.
+    self.first_time = first_time
 
 
 class Code(object):
@@ -73,6 +78,14 @@ class Code(object):
   def Clean(self):
     raise NotImplementedError()
 
+  def GetBinaryHash(self, hash_file=None):
+    """Returns a hash identifying the compiled program.
+
+    Two codes with the same hash are expected to behave identically.
+    hash_file, if given, is used to compute hashes of files.
+    """
+    raise NotImplementedError()
+
 
 registry = class_registry.ClassRegistry(Code)
 
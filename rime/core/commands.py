@@ -32,9 +32,16 @@ class ParseError(Exception):
 
 
 class OptionEntry(object):
-  def __init__(self, shortname, longname, varname, argtype, argdef, argname, description):
+  def __init__(self, shortname, longname, varname, argtype, argdef, argname,
+               description, implicit=None):
+    """Constructs an option entry.
+
+    If implicit is given, the parameter of the option is optional: it is
+    given only by --<longname>=<value>, and implicit is used without it.
+    """
     assert argtype in (bool, int, str)
     assert isinstance(argdef, argtype)
+    assert implicit is None or isinstance(implicit, argtype)
     self.shortname = shortname
     self.longname = longname
     self.varname = varname
@@ -42,6 +49,7 @@ class OptionEntry(object):
     self.argdef = argdef
     self.argname = argname
     self.description = description
+    self.implicit = implicit
 
   def Match(self, name):
     return (name in (self.shortname, self.longname))
@@ -51,6 +59,10 @@ class Command(object):
   name = None
   description = None
 
+  # Whether the command needs the project to be loaded before Run().
+  # If False, Run() may be called with project=None.
+  requires_project = True
+
   def __init__(self, parent):
     self.parent = parent
 
@@ -138,7 +150,9 @@ class CommandBase(Command):
     rows = []
     for option in sorted(self.options, lambda a, b: cmp(a.longname, b.longname)):
       longopt = '--%s' % option.longname
-      if option.argname:
+      if option.argname and option.implicit is not None:
+        longopt += '[=<%s>]' % option.argname
+      elif option.argname:
         longopt += ' <%s>' % option.argname
       if option.shortname:
         left_col_head = ' -%s, %s  ' % (option.shortname, longopt)
@@ -244,6 +258,8 @@ def Parse(argv, commands):
 
         if option.argtype is bool:
           optvalue = True
+        elif optvalue is None and option.implicit is not None:
+          optvalue = option.implicit
         elif optvalue is None:
           if i == len(argv):
             raise ParseError('Option parameter was missing for %s' % optfull)
@@ -265,6 +281,8 @@ def Parse(argv, commands):
 
 
 class Help(CommandBase):
+  requires_project = False
+
   def __init__(self, parent):
     super(Help, self).__init__(
       'help',
@@ -34,27 +34,19 @@ from rime.core import taskgraph
 from rime.core import ui as ui_mod
 from rime.util import console as console_mod
 from rime.util import module_loader
-from rime.util import struct
 
 
-def LoadRequiredModules():
-  # TODO(nya): Fix this hacky implementation.
+def LoadRequiredModules(cwd):
+  """Loads basic modules and plugins used by the project under cwd.
+
+  Plugins are found by scanning PROJECT without evaluating it, so that the
+  project is loaded only once with all plugins in place.
+  """
   module_loader.LoadPackage('rime.basic')
-  while True:
-    commands = commands_mod.GetCommands()
-    default_options = struct.Struct(commands[None].GetDefaultOptionDict())
-    null_console = console_mod.NullConsole()
-    graph = taskgraph.SerialTaskGraph()
-    fake_ui = ui_mod.UiContext(default_options, null_console, commands, graph)
-    try:
-      LoadProject(os.getcwd(), fake_ui)
-      break
-    except targets.ConfigurationError:
-      # Configuration errors should be processed later.
-      break
-    except targets.ReloadConfiguration:
-      # Processed use_plugin(). Retry.
-      pass
+  path = FindProjectDir(cwd)
+  if path is not None:
+    targets.LoadPlugins(targets.ScanPlugins(
+      os.path.join(path, targets.registry.Project.CONFIG_FILENAME)))
 
 
 def CheckSystem(ui):
@@ -65,25 +57,37 @@ def CheckSystem(ui):
   return True
 
 
-def LoadProject(cwd, ui):
-  """Loads configs and return Project instance.
-
-  Location of root directory is searched upward from cwd.
-  If PROJECT cannot be found, return None.
-  """
+def FindProjectDir(cwd):
+  """Returns the root directory of the project containing cwd, or None."""
   path = cwd
   while not targets.registry.Project.CanLoadFrom(path):
     (head, tail) = os.path.split(path)
     if head == path:
       return None
     path = head
-  project = targets.registry.Project(None, path, None)
-  try:
-    project.Load(ui)
-    return project
-  except targets.ConfigurationError:
-    ui.errors.Exception(project)
+  return path
+
+
+def LoadProject(cwd, ui):
+  """Loads configs and return Project instance.
+
+  Location of root directory is searched upward from cwd.
+  If PROJECT cannot be found, return None.
+  """
+  path = FindProjectDir(cwd)
+  if path is None:
     return None
+  while True:
+    project = targets.registry.Project(None, path, None)
+    try:
+      project.Load(ui)
+      return project
+    except targets.ReloadConfiguration:
+      # A plugin not found by the scan was loaded by use_plugin(). Retry.
+      continue
+    except targets.ConfigurationError:
+      ui.errors.Exception(project)
+      return None
 
 
 def CreateTaskGraph(options):
@@ -99,10 +103,19 @@ def CreateTaskGraph(options):
 
 def InternalMain(argv):
   """Main method called when invoked as stand-alone script."""
-  LoadRequiredModules()
-
+  LoadRequiredModules(os.getcwd())
   console = console_mod.TtyConsole(sys.stdout)
+  return RunCommand(argv, console, lambda ui: LoadProject(os.getcwd(), ui))
+
+
+def RunCommand(argv, console, load_project, ui=None):
+  """Parses arguments and runs the command.
 
+  load_project is called with the UI context when the command requires the
+  project, and returns the project or None. If ui is given, it is reused
+  for this command with its options, console, task graph and errors reset,
+  so that long-lived objects holding it see the current command.
+  """
   commands = commands_mod.GetCommands()
 
   # Parse arguments.
@@ -114,7 +127,14 @@ def InternalMain(argv):
 
   graph = CreateTaskGraph(options)
 
-  ui = ui_mod.UiContext(options, console, commands, graph)
+  if ui is None:
+    ui = ui_mod.UiContext(options, console, commands, graph)
+  else:
+    ui.options = options
+    ui.console = console
+    ui.commands = commands
+    ui.graph = graph
+    ui.errors = ui_mod.ErrorRecorder(ui)
 
   if options.help:
     cmd.PrintHelp(ui)
@@ -125,12 +145,14 @@ def InternalMain(argv):
     return 1
 
   # Try to load config files.
-  project = LoadProject(os.getcwd(), ui)
-  if ui.errors.HasError():
-    return 1
-  if not project:
-    console.PrintError('PROJECT not found. Make sure you are in Rime subtree.')
-    return 1
+  project = None
+  if cmd.requires_project:
+    project = load_project(ui)
+    if ui.errors.HasError():
+      return 1
+    if not project:
+      console.PrintError('PROJECT not found. Make sure you are in Rime subtree.')
+      return 1
 
   # Run the task.
   task = None
@@ -21,6 +21,7 @@
 # THE SOFTWARE.
 #
 
+import ast
 import os
 import os.path
 import sys
@@ -60,6 +61,14 @@ class TargetBase(object):
 
     self._loaded = False
 
+  def __getstate__(self):
+    # Exported symbols and config namespaces are needed only while loading,
+    # and they hold closures which cannot be serialized.
+    state = self.__dict__.copy()
+    state['exports'] = {}
+    state['configs'] = {}
+    return state
+
   def Export(self, method, name=None):
     """Exports a method to config modules."""
     if not name:
@@ -150,5 +159,44 @@ class Project(TargetBase):
     self.exports['use_plugin'] = use_plugin
 
 
+def ScanPlugins(config_file):
+  """Returns names of plugins declared in a config file.
+
+  Only top-level use_plugin() calls with a string literal are found, which
+  allows plugins to be loaded before evaluating configs. Plugins declared in
+  other ways are still loaded by use_plugin() at evaluation.
+  """
+  try:
+    tree = ast.parse(files.ReadFile(config_file), config_file)
+  except (IOError, SyntaxError, TypeError):
+    return []
+  names = []
+  for node in tree.body:
+    if not (isinstance(node, ast.Expr) and
+            isinstance(node.value, ast.Call)):
+      continue
+    call = node.value
+    if (isinstance(call.func, ast.Name) and call.func.id == 'use_plugin' and
+        len(call.args) == 1 and not call.keywords and
+        isinstance(call.args[0], ast.Str)):
+      names.append(call.args[0].s)
+  return names
+
+
+def LoadPlugins(names):
+  """Loads plugins ahead of evaluating configs.
+
+  Failures are ignored here; they are reported by use_plugin() later.
+  """
+  for name in names:
+    module_name = 'rime.plugins.%s' % name
+    if module_name in sys.modules:
+      continue
+    try:
+      module_loader.LoadModule(module_name)
+    except Exception:
+      pass
+
+
 registry = class_registry.ClassRegistry(TargetBase)
 registry.Add(Project)
@@ -25,7 +25,10 @@
 
 
 import functools
+import errno
+import hashlib
 import os
+import resource
 import signal
 import subprocess
 import sys
@@ -53,6 +56,63 @@ class TaskBlock(object):
   pass
 
 
+class Memoize(object):
+  """Declares that the result of a generator task can be memoized.
+
+  A task method may yield this as its first value to declare files and
+  parameters its result depends on, and files it produces. If a result was
+  recorded for the same contents of inputs and the same parameters, outputs
+  are restored and the recorded value is returned without running the rest
+  of the task. Otherwise the task continues, and its return value is recorded
+  together with outputs when it is true.
+
+  Parameters must have stable string representations, and return values must
+  be JSON-serializable. Memoization is enabled only when a memo store is set
+  by SetMemoStore().
+  """
+
+  def __init__(self, inputs=(), params=(), outputs=()):
+    self.inputs = list(inputs)
+    self.params = list(params)
+    self.outputs = list(outputs)
+
+
+class MemoStore(object):
+  """Interface of persistent stores of memoized task results."""
+
+  def Lookup(self, key):
+    """Returns the record saved for the key, or None."""
+    raise NotImplementedError()
+
+  def Save(self, key, record):
+    """Saves a JSON-serializable record for the key."""
+    raise NotImplementedError()
+
+  def GetFileHash(self, path):
+    """Returns the content hash of a file."""
+    raise NotImplementedError()
+
+  def PutFile(self, path):
+    """Stores a copy of the file and returns its content hash."""
+    raise NotImplementedError()
+
+  def HasFile(self, digest):
+    raise NotImplementedError()
+
+  def GetFile(self, digest, path):
+    """Restores a stored file at path. Returns False if unavailable."""
+    raise NotImplementedError()
+
+
+_memo_store = None
+
+
+def SetMemoStore(store):
+  """Sets the store used to memoize generator tasks across runs."""
+  global _memo_store
+  _memo_store = store
+
+
 class _TaskRaise(object):
   """Internal only; do not return an instance of this class from generators."""
 
@@ -171,6 +231,7 @@ class GeneratorTask(Task):
   def __init__(self, it, key):
     self.it = it
     self.key = key
+    self.memo = None
 
   def __repr__(self):
     return repr(self.key)
@@ -180,16 +241,66 @@ class GeneratorTask(Task):
 
   def Continue(self, value=None):
     try:
-      return self.it.send(value)
+      return self._ProcessResult(self.it.send(value))
     except StopIteration:
       return TaskReturn(None)
 
   def Throw(self, type, value=None, traceback=None):
     try:
-      return self.it.throw(type, value, traceback)
+      return self._ProcessResult(self.it.throw(type, value, traceback))
     except StopIteration:
       return TaskReturn(None)
 
+  def _ProcessResult(self, result):
+    if isinstance(result, Memoize):
+      return self._StartMemoize(result)
+    if (self.memo is not None and
+        not isinstance(result, (TaskBranch, TaskBlock, Task))):
+      value = result.value if isinstance(result, TaskReturn) else result
+      if value:
+        self._SaveMemo(value)
+    return result
+
+  def _StartMemoize(self, spec):
+    store = _memo_store
+    if store is not None:
+      func = self.key[1]
+      parts = ['%s.%s' % (func.__module__, func.__name__)]
+      parts += [len(spec.params)] + spec.params
+      # Missing inputs, e.g. outputs never generated, are hashed as empty
+      # so that the task itself can report them.
+      parts += [os.path.isfile(path) and store.GetFileHash(path) or ''
+                for path in spec.inputs]
+      parts += [os.path.basename(path) for path in spec.outputs]
+      memo_key = hashlib.sha1(
+        ''.join('%d:%s' % (len(str(part)), part) for part in parts)
+        ).hexdigest()
+      record = store.Lookup(memo_key)
+      if record is not None and self._RestoreOutputs(store, spec, record):
+        return TaskReturn(record['value'])
+      self.memo = (store, memo_key, spec)
+    return self._ProcessResult(self.it.send(None))
+
+  def _RestoreOutputs(self, store, spec, record):
+    digests = record['outputs']
+    if not all(digest is None or store.HasFile(digest) for digest in digests):
+      return False
+    for path, digest in zip(spec.outputs, digests):
+      if digest is None:
+        if os.path.lexists(path):
+          os.remove(path)
+      elif not (os.path.isfile(path) and store.GetFileHash(path) == digest):
+        if not store.GetFile(digest, path):
+          return False
+    return True
+
+  def _SaveMemo(self, value):
+    store, memo_key, spec = self.memo
+    self.memo = None
+    digests = [os.path.isfile(path) and store.PutFile(path) or None
+               for path in spec.outputs]
+    store.Save(memo_key, {'value': value, 'outputs': digests})
+
   def Close(self):
     try:
       self.it.close()
@@ -222,6 +333,11 @@ class GeneratorTask(Task):
 task_method = GeneratorTask.FromFunction
 
 
+# Return code of a process whose exit status was lost. It is negative, so it
+# is taken as abnormal termination.
+LOST_RETURNCODE = -1
+
+
 class ExternalProcessTask(Task):
   def __init__(self, *args, **kwargs):
     self.args = args
@@ -237,7 +353,21 @@ class ExternalProcessTask(Task):
       del kwargs['exclusive']
     else:
       self.exclusive = False
+    if 'output_limit' in kwargs:
+      # Maximum size of files written by the process in bytes, or None.
+      self.output_limit = kwargs['output_limit']
+      del kwargs['output_limit']
+    else:
+      self.output_limit = None
+    if self.output_limit is not None:
+      assert 'preexec_fn' not in kwargs
+      kwargs['preexec_fn'] = _OutputLimiter(self.output_limit)
     self.timer = None
+    self.rusage = None
+    # Peak resident memory of the program in bytes, or None if unknown.
+    # It is sampled from /proc while the program runs, so it is None where
+    # /proc is unavailable, and it may miss a peak reached just before exit.
+    self.memory = None
 
   def CacheKey(self):
     # Never cache.
@@ -255,7 +385,7 @@ class ExternalProcessTask(Task):
   def _ContinueExclusive(self):
     assert self.proc is None
     self._StartProcess()
-    self.proc.wait()
+    self.Wait()
     return TaskReturn(self._EndProcess())
 
   def _ContinueNonExclusive(self):
@@ -269,11 +399,46 @@ class ExternalProcessTask(Task):
 
   def Poll(self):
     assert self.proc is not None
-    return self.proc.poll() is not None
+    if self.proc.returncode is not None:
+      return True
+    return self._Reap(os.WNOHANG)
 
   def Wait(self):
     assert self.proc is not None
-    self.proc.wait()
+    while self.proc.returncode is None:
+      self._Reap(0)
+
+  def _Reap(self, flags):
+    """Reaps the process with wait4() to collect its resource usage.
+
+    Returns True if the process has exited.
+    """
+    try:
+      pid, status, rusage = os.wait4(self.proc.pid, flags)
+    except OSError as e:
+      if e.errno == errno.EINTR:
+        return False
+      if e.errno != errno.ECHILD:
+        raise
+      # Already reaped by someone else. The exit status is lost, so the
+      # process must not be taken as exited normally.
+      self.proc.returncode = LOST_RETURNCODE
+      self.memory = _memory_monitor.Remove(self.proc.pid)
+      return True
+    if pid == 0:
+      return False
+    if os.WIFSIGNALED(status):
+      self.proc.returncode = -os.WTERMSIG(status)
+    else:
+      self.proc.returncode = os.WEXITSTATUS(status)
+    self.rusage = rusage
+    self.memory = _memory_monitor.Remove(self.proc.pid)
+    # The peak RSS of the process counts pages inherited from this process
+    # before exec(), so it tells about the program only if it is larger.
+    peak = rusage.ru_maxrss * _MAXRSS_UNIT
+    if peak > self.parent_memory:
+      self.memory = max(self.memory, peak)
+    return True
 
   def Close(self):
     if self.timer is not None:
@@ -284,12 +449,17 @@ class ExternalProcessTask(Task):
         os.kill(self.proc.pid, signal.SIGKILL)
       except:
         pass
-      self.proc.wait()
+      self.Wait()
       self.proc = None
 
   def _StartProcess(self):
+    self.rusage = None
+    self.memory = None
+    self.parent_memory = _ReadResidentMemory()
     self.start_time = time.time()
     self.proc = subprocess.Popen(*self.args, **self.kwargs)
+    # Popen() returns after exec(), so samples are of the program itself.
+    _memory_monitor.Add(self.proc.pid)
     if self.timeout is not None:
       def TimeoutKiller():
         try:
@@ -313,6 +483,90 @@ class ExternalProcessTask(Task):
     return proc
 
 
+def _OutputLimiter(limit):
+  """Returns a function to limit sizes of files written by a child process.
+
+  The process is killed by SIGXFSZ when it writes beyond the limit.
+  """
+  def SetLimit():
+    # Python ignores SIGXFSZ, which would be inherited by the program.
+    signal.signal(signal.SIGXFSZ, signal.SIG_DFL)
+    resource.setrlimit(resource.RLIMIT_FSIZE, (limit, limit))
+  return SetLimit
+
+
+class _MemoryMonitor(object):
+  """Samples peak resident memory of running processes in a thread."""
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._peaks = {}
+    self._thread = None
+
+  def Add(self, pid):
+    with self._lock:
+      self._peaks[pid] = _ReadPeakMemory(pid)
+      if self._thread is None:
+        self._thread = threading.Thread(target=self._Run)
+        self._thread.daemon = True
+        self._thread.start()
+
+  def Remove(self, pid):
+    """Stops sampling the process and returns its peak, or None."""
+    with self._lock:
+      return self._peaks.pop(pid, None)
+
+  def _Run(self):
+    while True:
+      time.sleep(_MEMORY_SAMPLE_INTERVAL)
+      with self._lock:
+        if not self._peaks:
+          self._thread = None
+          return
+        pids = self._peaks.keys()
+      for pid in pids:
+        # The status of an exited process has no memory fields.
+        peak = _ReadPeakMemory(pid)
+        with self._lock:
+          if pid in self._peaks:
+            self._peaks[pid] = max(self._peaks[pid], peak)
+
+
+def _ReadPeakMemory(pid):
+  """Returns the peak resident memory of a process in bytes, or None."""
+  try:
+    with open('/proc/%d/status' % pid) as f:
+      for line in f:
+        if line.startswith('VmHWM:'):
+          return int(line.split()[1]) * 1024
+  except (IOError, ValueError, IndexError):
+    pass
+  return None
+
+
+def _ReadResidentMemory():
+  """Returns the resident memory of this process in bytes, or 0."""
+  try:
+    with open('/proc/self/statm') as f:
+      return int(f.read().split()[1]) * _PAGE_SIZE
+  except (IOError, ValueError, IndexError):
+    return 0
+
+
+try:
+  _PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (ValueError, OSError, AttributeError):
+  _PAGE_SIZE = 4096
+
+# ru_maxrss is in kilobytes except on Mac OS X, where it is in bytes.
+_MAXRSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+# Interval in seconds between samples of memory usage of processes.
+_MEMORY_SAMPLE_INTERVAL = 0.002
+
+_memory_monitor = _MemoryMonitor()
+
+
 class SerialTaskGraph(object):
   """TaskGraph which emulates normal serialized execution."""
 
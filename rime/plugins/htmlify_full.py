@@ -31,9 +31,6 @@ import os.path
 import re
 import socket
 import subprocess
-import urllib
-import urllib2
-import urlparse
 
 from rime.basic.targets import problem
 import rime.basic.targets.project  # target dependency
@@ -63,7 +60,9 @@ def SafeUnicode(s):
     s = s.decode('utf-8')
   return s
 
-def GetFileSize(dir, filename):
+def GetFileSize(dir, filename, entry=None):
+  if entry is not None:
+    return '%dB' % entry['size']
   filepath = os.path.join(dir, filename)
   if os.path.exists(filepath):
     return '%dB' % os.path.getsize(filepath)
@@ -71,7 +70,9 @@ def GetFileSize(dir, filename):
     return '-'
 
 
-def GetFileHash(dir, filename):
+def GetFileHash(dir, filename, entry=None):
+  if entry is not None:
+    return entry['md5']
   filepath = os.path.join(dir, filename)
   if os.path.exists(filepath):
     f = open(filepath)
@@ -81,6 +82,19 @@ def GetFileHash(dir, filename):
   else:
     return ''
 
+def GetManifestEntries(testset):
+  """Returns a dict of case name -> manifest entries of its input/output."""
+  manifest = getattr(testset, 'GetManifest', lambda: None)()
+  if manifest is None:
+    return {}
+  # Cases are named as in the listing, i.e. with compression extensions.
+  entries = {}
+  for case in manifest['cases']:
+    entries[os.path.splitext(case['in'])[0]] = (
+      testset.GetManifestEntry(case['in']),
+      case['diff'] and testset.GetManifestEntry(case['diff']))
+  return entries
+
 def GetHtmlifyFileComment(dir, filename):
   filepath = os.path.join(dir, filename)
   if os.path.exists(filepath):
@@ -192,15 +206,17 @@ class Project(targets.registry.Project):
       lists.append((testname, cols))
     rows = []
     dir = problem.testset.out_dir
+    entries = GetManifestEntries(problem.testset)
     for casename, cols in lists:
+      in_entry, diff_entry = entries.get(casename, (None, None))
       rows.append(
           '<tr><td' +
           '</td><td'.join(
             [
               '>' + casename.replace('_', ' ').replace('-', ' '),
-              '>' + GetFileSize(dir, casename + consts.IN_EXT),
-              '>' + GetFileSize(dir, casename + consts.DIFF_EXT),
-              '>' + GetFileHash(dir, casename + consts.IN_EXT)
+              '>' + GetFileSize(dir, casename + consts.IN_EXT, in_entry),
+              '>' + GetFileSize(dir, casename + consts.DIFF_EXT, diff_entry),
+              '>' + GetFileHash(dir, casename + consts.IN_EXT, in_entry)
             ]
             + [self._GetHtmlifyMessage(*t) for t in cols]
             + ['>' + GetHtmlifyFileComment(dir, casename + '.comment')]
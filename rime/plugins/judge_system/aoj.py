@@ -21,16 +21,8 @@
 # THE SOFTWARE.
 #
 
-import itertools
 import os
 import os.path
-import subprocess
-import cookielib
-import re
-import sys
-import time
-import urllib
-import urllib2
 
 import rime.basic.targets.testset   # target dependency
 from rime.basic import consts
@@ -39,13 +31,14 @@ from rime.basic import codes as basic_codes
 from rime.core import commands
 from rime.core import targets
 from rime.core import taskgraph
+from rime.util import compression
 from rime.util import files
 from rime.plugins.plus import commands as plus_commands
 
 class Testset(targets.registry.Testset):
   def __init__(self, *args, **kwargs):
     super(Testset, self).__init__(*args, **kwargs)
-    rime_out = os.path.join(self.problem.base_dir, consts.RIME_OUT_DIR)
+    rime_out = self.problem.out_dir
     self.aoj_pack_dir     = os.path.join(rime_out, 'aoj')
 
 class AOJPacker(plus_commands.PackerBase):
@@ -58,9 +51,11 @@ class AOJPacker(plus_commands.PackerBase):
     except:
       ui.errors.Exception(testset)
       yield False
+    # Memoized outputs are restored to the emptied directory, so files of
+    # an earlier pack are not left.
+    yield taskgraph.Memoize(*self._GetMemoSpec(testset, testcases))
     for (i, testcase) in enumerate(testcases):
-      basename = os.path.splitext(testcase.infile)[0]
-      difffile = basename + consts.DIFF_EXT
+      difffile = testcase.difffile
       packed_infile = 'in' + str(i+1) + '.txt'
       packed_difffile = 'out' + str(i+1) + '.txt'
       try:
@@ -69,15 +64,15 @@ class AOJPacker(plus_commands.PackerBase):
           testset,
           '%s -> %s' % (os.path.basename(testcase.infile), packed_infile),
           progress=True)
-        files.CopyFile(os.path.join(testset.out_dir, testcase.infile),
-                       os.path.join(testset.aoj_pack_dir, packed_infile))
+        compression.ExpandFile(os.path.join(testset.out_dir, testcase.infile),
+                               os.path.join(testset.aoj_pack_dir, packed_infile))
         ui.console.PrintAction(
           'PACK',
           testset,
           '%s -> %s' % (os.path.basename(difffile), packed_difffile),
           progress=True)
-        files.CopyFile(os.path.join(testset.out_dir, difffile),
-                       os.path.join(testset.aoj_pack_dir, packed_difffile))
+        compression.ExpandFile(os.path.join(testset.out_dir, difffile),
+                               os.path.join(testset.aoj_pack_dir, packed_difffile))
       except:
         ui.errors.Exception(testset)
         yield False
@@ -141,6 +136,30 @@ PUBLICATION_DATE = datetime.datetime(*, *, *, *, *)
 
     yield True
 
+  def _GetMemoSpec(self, testset, testcases):
+    """Returns input files, parameters and output files of the pack."""
+    inputs = []
+    outputs = []
+    for (i, testcase) in enumerate(testcases):
+      inputs += [testcase.infile, testcase.difffile]
+      outputs += [
+        os.path.join(testset.aoj_pack_dir, 'in' + str(i+1) + '.txt'),
+        os.path.join(testset.aoj_pack_dir, 'out' + str(i+1) + '.txt')]
+    outputs += [os.path.join(testset.aoj_pack_dir, 'case.txt'),
+                os.path.join(testset.aoj_pack_dir, 'AOJCONF')]
+    checker = testset.judges[0]
+    params = [testset.problem.title, len(testset.judges),
+              checker.__class__.__name__]
+    if not isinstance(checker, basic_codes.InternalDiffCode):
+      inputs.append(os.path.join(testset.src_dir, checker.src_name))
+      outputs += [os.path.join(testset.aoj_pack_dir, 'checker.cpp'),
+                  os.path.join(testset.aoj_pack_dir, 'build.sh')]
+      for f in checker.dependency:
+        params.append(f)
+        inputs.append(os.path.join(testset.project.library_dir, f))
+        outputs.append(os.path.join(testset.aoj_pack_dir, f))
+    return (inputs, params, outputs)
+
 targets.registry.Override('Testset',  Testset)
 
 plus_commands.packer_registry.Add(AOJPacker)
@@ -21,16 +21,10 @@
 # THE SOFTWARE.
 #
 
-import itertools
 import os
 import os.path
-import subprocess
-import cookielib
 import re
-import sys
 import time
-import urllib
-import urllib2
 
 import rime.basic.targets.problem   # target dependency
 import rime.basic.targets.project   # target dependency
@@ -42,12 +36,22 @@ from rime.basic import codes as basic_codes
 from rime.core import commands
 from rime.core import targets
 from rime.core import taskgraph
+from rime.util import compression
 from rime.util import files
 from rime.plugins.plus import commands as plus_commands
 
-## opener with cookiejar
-cookiejar = cookielib.CookieJar()
-opener = urllib2.build_opener(urllib2.HTTPCookieProcessor(cookiejar))
+## opener with cookiejar, created on the first request
+opener = None
+
+def _GetOpener():
+  # Network modules are imported lazily to keep startup fast.
+  global opener
+  if opener is None:
+    import cookielib
+    import urllib2
+    cookiejar = cookielib.CookieJar()
+    opener = urllib2.build_opener(urllib2.HTTPCookieProcessor(cookiejar))
+  return opener
 
 class Project(targets.registry.Project):
   def PreLoad(self, ui):
@@ -72,10 +76,12 @@ class Project(targets.registry.Project):
     yield super(Project, self).Upload(ui)
 
   def _Request(self, path, data = None):
+    import urllib
+    import urllib2
     if type(data) == dict:
       data = urllib.urlencode(data)
     req = urllib2.Request(self.atcoder_contest_url + path, data)
-    return opener.open(req)
+    return _GetOpener().open(req)
 
   def _Login(self):
     if not self.atcoder_logined:
@@ -105,7 +111,7 @@ class Problem(targets.registry.Problem):
 class Testset(targets.registry.Testset):
   def __init__(self, *args, **kwargs):
     super(Testset, self).__init__(*args, **kwargs)
-    rime_out = os.path.join(self.problem.base_dir, consts.RIME_OUT_DIR)
+    rime_out = self.problem.out_dir
     self.atcoder_pack_dir = os.path.join(rime_out, 'atcoder')
 
 class AtCoderPacker(plus_commands.PackerBase):
@@ -121,9 +127,13 @@ class AtCoderPacker(plus_commands.PackerBase):
     except:
       ui.errors.Exception(testset)
       yield False
+    # Memoized outputs are restored to the emptied directory, so files of
+    # an earlier pack are not left.
+    yield taskgraph.Memoize(*self._GetMemoSpec(testset, testcases))
     for (i, testcase) in enumerate(testcases):
-      basename = os.path.splitext(testcase.infile)[0]
-      difffile = basename + consts.DIFF_EXT
+      basename = os.path.splitext(
+        compression.StripExtension(testcase.infile))[0]
+      difffile = testcase.difffile
       packed_infile = os.path.join('in', os.path.basename(basename))
       packed_difffile = os.path.join('out', os.path.basename(basename))
       try:
@@ -132,15 +142,15 @@ class AtCoderPacker(plus_commands.PackerBase):
           testset,
           '%s -> %s' % (os.path.basename(testcase.infile), packed_infile),
           progress=True)
-        files.CopyFile(os.path.join(testset.out_dir, testcase.infile),
-                       os.path.join(testset.atcoder_pack_dir, packed_infile))
+        compression.ExpandFile(os.path.join(testset.out_dir, testcase.infile),
+                               os.path.join(testset.atcoder_pack_dir, packed_infile))
         ui.console.PrintAction(
           'PACK',
           testset,
           '%s -> %s' % (os.path.basename(difffile), packed_difffile),
           progress=True)
-        files.CopyFile(os.path.join(testset.out_dir, difffile),
-                       os.path.join(testset.atcoder_pack_dir, packed_difffile))
+        compression.ExpandFile(os.path.join(testset.out_dir, difffile),
+                               os.path.join(testset.atcoder_pack_dir, packed_difffile))
       except:
         ui.errors.Exception(testset)
         yield False
@@ -171,6 +181,32 @@ class AtCoderPacker(plus_commands.PackerBase):
 
     yield True
 
+  def _GetMemoSpec(self, testset, testcases):
+    """Returns input files, parameters and output files of the pack."""
+    inputs = []
+    outputs = []
+    for testcase in testcases:
+      basename = os.path.splitext(
+        compression.StripExtension(testcase.infile))[0]
+      inputs += [testcase.infile, testcase.difffile]
+      outputs += [
+        os.path.join(testset.atcoder_pack_dir, 'in', os.path.basename(basename)),
+        os.path.join(testset.atcoder_pack_dir, 'out', os.path.basename(basename))]
+    outputs.append(os.path.join(testset.atcoder_pack_dir, 'etc', 'score.txt'))
+    checker = testset.judges[0]
+    params = [len(testset.judges), checker.__class__.__name__]
+    params += [(s.name, s.score, s.input_patterns)
+               for s in testset.subtask_testcases]
+    if not isinstance(checker, basic_codes.InternalDiffCode):
+      inputs.append(os.path.join(testset.src_dir, checker.src_name))
+      outputs.append(os.path.join(
+        testset.atcoder_pack_dir, 'etc', 'output_checker.cpp'))
+      for f in checker.dependency:
+        params.append(f)
+        inputs.append(os.path.join(testset.project.library_dir, f))
+        outputs.append(os.path.join(testset.atcoder_pack_dir, 'etc', f))
+    return (inputs, params, outputs)
+
 class AtCoderUploader(plus_commands.UploaderBase):
   @taskgraph.task_method
   def Upload(self, ui, problem, dryrun):
@@ -196,8 +232,8 @@ class AtCoderUploader(plus_commands.UploaderBase):
       ui.errors.Error(problem, script + ' is not an upload script.')
       yield False
 
-    target_dir = os.path.join(problem.name, consts.RIME_OUT_DIR, 'atcoder')
-    log = os.path.join(problem.base_dir, consts.RIME_OUT_DIR, 'upload_log')
+    target_dir = os.path.join(problem.out_dir, 'atcoder')
+    log = os.path.join(problem.out_dir, 'upload_log')
 
     if not dryrun:
       args = ('php', script, str(problem.atcoder_task_id), target_dir)
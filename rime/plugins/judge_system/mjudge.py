@@ -21,16 +21,8 @@
 # THE SOFTWARE.
 #
 
-import itertools
 import os
 import os.path
-import subprocess
-import cookielib
-import re
-import sys
-import time
-import urllib
-import urllib2
 
 import rime.basic.targets.testset   # target dependency
 from rime.basic import consts
@@ -39,28 +31,38 @@ from rime.basic import codes as basic_codes
 from rime.core import commands
 from rime.core import targets
 from rime.core import taskgraph
+from rime.util import compression
 from rime.util import files
 from rime.plugins.plus import commands as plus_commands
 
 class Testset(targets.registry.Testset):
   def __init__(self, *args, **kwargs):
     super(Testset, self).__init__(*args, **kwargs)
-    rime_out = os.path.join(self.problem.base_dir, consts.RIME_OUT_DIR)
+    rime_out = self.problem.out_dir
     self.mjudge_pack_dir  = os.path.join(rime_out, 'mjudge')
 
 class MJudgePacker(plus_commands.PackerBase):
   @taskgraph.task_method
   def Pack(self, ui, testset):
     testcases = testset.ListTestCases()
+    inputs = []
+    outputs = []
+    for (i, testcase) in enumerate(testcases):
+      inputs += [testcase.infile, testcase.difffile]
+      outputs += [
+        os.path.join(testset.mjudge_pack_dir, str(i+1) + consts.IN_EXT),
+        os.path.join(testset.mjudge_pack_dir, str(i+1) + consts.DIFF_EXT)]
     try:
       files.RemoveTree(testset.mjudge_pack_dir)
       files.MakeDir(testset.mjudge_pack_dir)
     except:
       ui.errors.Exception(testset)
       yield False
+    # Memoized outputs are restored to the emptied directory, so files of
+    # an earlier pack are not left.
+    yield taskgraph.Memoize(inputs=inputs, outputs=outputs)
     for (i, testcase) in enumerate(testcases):
-      basename = os.path.splitext(testcase.infile)[0]
-      difffile = basename + consts.DIFF_EXT
+      difffile = testcase.difffile
       packed_infile = str(i+1) + consts.IN_EXT
       packed_difffile = str(i+1) + consts.DIFF_EXT
       try:
@@ -69,15 +71,15 @@ class MJudgePacker(plus_commands.PackerBase):
           testset,
           '%s -> %s' % (os.path.basename(testcase.infile), packed_infile),
           progress=True)
-        files.CopyFile(os.path.join(testset.out_dir, testcase.infile),
-                       os.path.join(testset.mjudge_pack_dir, packed_infile))
+        compression.ExpandFile(os.path.join(testset.out_dir, testcase.infile),
+                               os.path.join(testset.mjudge_pack_dir, packed_infile))
         ui.console.PrintAction(
           'PACK',
           testset,
           '%s -> %s' % (os.path.basename(difffile), packed_difffile),
           progress=True)
-        files.CopyFile(os.path.join(testset.out_dir, difffile),
-                       os.path.join(testset.mjudge_pack_dir, packed_difffile))
+        compression.ExpandFile(os.path.join(testset.out_dir, difffile),
+                               os.path.join(testset.mjudge_pack_dir, packed_difffile))
       except:
         ui.errors.Exception(testset)
         yield False
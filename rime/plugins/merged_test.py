@@ -72,6 +72,7 @@ class TestMerger(object):
           f.write(separator)
         f.write(files.ReadFile(src))
       f.write(terminator)
+    files.InvalidatePath(dst)
 
 
 class MergedTestCase(test.TestCase):
@@ -32,6 +32,7 @@ from rime.basic import consts
 from rime.core import commands
 from rime.core import targets
 from rime.core import taskgraph
+from rime.util import compression
 from rime.util import files
 
 
@@ -72,8 +73,7 @@ class Testset(targets.registry.Testset):
       ui.errors.Exception(self)
       yield False
     for (i, testcase) in enumerate(testcases):
-      basename = os.path.splitext(testcase.infile)[0]
-      difffile = basename + consts.DIFF_EXT
+      difffile = testcase.difffile
       packed_infile = str(i+1) + consts.IN_EXT
       packed_difffile = str(i+1) + consts.DIFF_EXT
       try:
@@ -82,15 +82,15 @@ class Testset(targets.registry.Testset):
           self,
           '%s -> %s' % (testcase.infile, packed_infile),
           progress=True)
-        files.CopyFile(os.path.join(self.out_dir, testcase.infile),
-                       os.path.join(self.pack_dir, packed_infile))
+        compression.ExpandFile(os.path.join(self.out_dir, testcase.infile),
+                               os.path.join(self.pack_dir, packed_infile))
         ui.console.PrintAction(
           'PACK',
           self,
           '%s -> %s' % (difffile, packed_difffile),
           progress=True)
-        files.CopyFile(os.path.join(self.out_dir, difffile),
-                       os.path.join(self.pack_dir, packed_difffile))
+        compression.ExpandFile(os.path.join(self.out_dir, difffile),
+                               os.path.join(self.pack_dir, packed_difffile))
       except:
         ui.errors.Exception(self)
         yield False
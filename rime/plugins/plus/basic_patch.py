@@ -22,8 +22,6 @@
 #
 
 import fnmatch
-import hashlib
-import json
 import os.path
 import signal
 import subprocess
@@ -34,19 +32,40 @@ from rime.basic import test
 from rime.basic.util import test_summary
 import rime.basic.targets.project  # target dependency
 import rime.basic.targets.problem  # target dependency
+import rime.basic.targets.solution  # target dependency
 import rime.basic.targets.testset  # target dependency
 from rime.core import codes
 from rime.core import commands
 from rime.core import targets
 from rime.core import taskgraph
+from rime.util import cache_store
+from rime.util import cas
+from rime.util import compression
 from rime.util import files
+from rime.util import includes
+from rime.util import log_store
+from rime.util import scratch
 from rime.plugins.plus import rime_plus_version
 
+consts.CACHE_DIR = 'cache'
+consts.CACHE_DB_FILE = 'cache.db'
+consts.CACHE_OBJECTS_DIR = 'objects'
+consts.RUN_DIR = 'run'
+consts.LOG_STORE_FILE = '.logs'
+
+TEST_RESULT_NAMESPACE = 'test_result'
+
 libdir = None
 
 def parseVersion(v):
   return [int(d) for d in v.split('.')]
 
+_CACHEABLE_VERDICTS = (test.TestCaseResult.AC,
+                       test.TestCaseResult.WA,
+                       test.TestCaseResult.TLE,
+                       test.TestCaseResult.OLE,
+                       test.TestCaseResult.RE)
+
 class Project(targets.registry.Project):
   def __init__(self, *args, **kwargs):
     super(Project, self).__init__(*args, **kwargs)
@@ -54,8 +73,21 @@ class Project(targets.registry.Project):
   def PreLoad(self, ui):
     super(Project, self).PreLoad(ui)
     self.library_dir = None
+    self.out_root = None
+    self.cache_dir = os.path.join(
+      self.base_dir, consts.RIME_OUT_DIR, consts.CACHE_DIR)
+    self.cache_size_limit = None
+    self.remote_cache_url = os.environ.get('RIME_REMOTE_CACHE')
+    self.scratch_dir = os.environ.get('RIME_SCRATCH_DIR')
+    self._cache_store = None
+    self._content_store = None
+    self._remote_cache = None
+    self._scratch_space = None
+    self.output_compression = None
     self.project_defined = False
-    def _project(library_dir=None, required_rime_plus_version=rime_plus_version):
+    def _project(library_dir=None, required_rime_plus_version=rime_plus_version,
+                 cache_dir=None, cache_size_limit=None, remote_cache=None,
+                 output_compression=None, out_dir=None, scratch_dir=None):
       if self.project_defined:
         # ui.errors.Error(self, 'project() is already defined.')
         raise RuntimeError('project() is already defined.')
@@ -67,12 +99,98 @@ class Project(targets.registry.Project):
         self.base_dir,
         library_dir)
       self.library_dir = libdir
+      if out_dir is not None:
+        self.out_root = os.path.join(self.base_dir, out_dir)
+        self.cache_dir = os.path.join(self.out_root, consts.CACHE_DIR)
+      if cache_dir is not None:
+        self.cache_dir = os.path.join(self.base_dir, cache_dir)
+      self.cache_size_limit = cache_size_limit
+      if remote_cache is not None:
+        self.remote_cache_url = remote_cache
+      if output_compression is not None:
+        ext = '.' + output_compression.lstrip('.')
+        if ext not in compression.EXTENSIONS:
+          raise RuntimeError('unknown output_compression: %s' %
+                             output_compression)
+        self.output_compression = ext
+      if scratch_dir is not None and 'RIME_SCRATCH_DIR' not in os.environ:
+        self.scratch_dir = scratch_dir
       self.project_defined = True
     self.exports['project'] = _project
 
+  def GetOutDir(self, base_dir):
+    """Returns the output directory for a directory in the project."""
+    if self.out_root is None:
+      return os.path.join(base_dir, consts.RIME_OUT_DIR)
+    return os.path.normpath(
+      os.path.join(self.out_root, os.path.relpath(base_dir, self.base_dir)))
+
+  def GetScratchSpace(self):
+    """Returns the space for private working directories of runs."""
+    if self._scratch_space is None:
+      self._scratch_space = scratch.ScratchSpace(
+        self.scratch_dir,
+        os.path.join(self.GetOutDir(self.base_dir), consts.RUN_DIR))
+    return self._scratch_space
+
+  def GetCacheStore(self):
+    """Returns the persistent key-value store shared by the project."""
+    if self._cache_store is None:
+      files.MakeDir(self.cache_dir)
+      self._cache_store = cache_store.CacheStore(
+        os.path.join(self.cache_dir, consts.CACHE_DB_FILE),
+        remote=self.GetRemoteCache())
+    return self._cache_store
+
+  def GetContentStore(self):
+    """Returns the content-addressed blob store shared by the project."""
+    if self._content_store is None:
+      self._content_store = cas.ContentStore(
+        os.path.join(self.cache_dir, consts.CACHE_OBJECTS_DIR),
+        remote=self.GetRemoteCache(), cache_store=self.GetCacheStore())
+    return self._content_store
+
+  def GetRemoteCache(self):
+    """Returns the remote cache shared by the team, or None if not set."""
+    if self._remote_cache is None and self.remote_cache_url:
+      # Network modules are imported only when the remote cache is used.
+      from rime.util import remote_cache
+      self._remote_cache = remote_cache.RemoteCache(self.remote_cache_url)
+    return self._remote_cache
+
+  def CloseCaches(self):
+    """Closes the caches, e.g. before the project is loaded again."""
+    if self._cache_store is not None:
+      self._cache_store.Close()
+      self._cache_store = None
+    # The content store records blob usage in the closed cache store.
+    self._content_store = None
+    if self._remote_cache is not None:
+      self._remote_cache.Flush()
+    if self._scratch_space is not None:
+      self._scratch_space.Close()
+      self._scratch_space = None
+
+class Problem(targets.registry.Problem):
+  def __init__(self, *args, **kwargs):
+    super(Problem, self).__init__(*args, **kwargs)
+    self.out_dir = self.project.GetOutDir(self.base_dir)
+
+  def PreLoad(self, ui):
+    super(Problem, self).PreLoad(ui)
+    self.output_limit = None
+    base_problem = self.exports['problem']
+    def _problem(output_limit=None, **kwargs):
+      self.output_limit = output_limit
+      return base_problem(**kwargs)
+    self.exports['problem'] = _problem
+
 class Testset(targets.registry.Testset):
   def __init__(self, *args, **kwargs):
     super(Testset, self).__init__(*args, **kwargs)
+    self._test_cases = None
+    self._test_case_names = None
+    self._test_case_index = {}
 
   # dependency
   def PreLoad(self, ui):
@@ -99,12 +217,17 @@ class Testset(targets.registry.Testset):
                                   out_dir=self.out_dir,
                                   wrapper=self._WrapDependency))
 
+  def ListCodes(self):
+    return self.generators + self.validators + self.judges + self.reactives
+
   def _WrapDependency(self, code_class):
     def Wrapped(src_name, src_dir, out_dir, dependency=[], variant=None,
-                *args, **kwargs):
+                copy_src_dir=False, output_limit=None, *args, **kwargs):
       code = code_class(src_name, src_dir, out_dir, *args, **kwargs)
       code.dependency = dependency
       code.variant = variant
+      code.copy_src_dir = copy_src_dir
+      code.output_limit = output_limit
       return code
     return Wrapped
 
@@ -112,13 +235,10 @@ class Testset(targets.registry.Testset):
   @taskgraph.task_method
   def _TestSolutionWithChallengeCases(self, solution, ui):
     """Test a wrong solution which has explicitly-specified challenge cases."""
-    all_testcases = self.ListTestCases()
     challenge_infiles = solution.challenge_cases
     testcases = []
     for infile in challenge_infiles:
-      matched_testcases = [testcase for testcase in all_testcases
-                           if fnmatch.fnmatch(os.path.basename(testcase.infile),
-                                  infile)]
+      matched_testcases = self.FindTestCases(infile)
 
       if not matched_testcases:
         ui.errors.Error(solution,
@@ -128,7 +248,8 @@ class Testset(targets.registry.Testset):
                         'Challenge case not found: %s' % infile)
         yield result
 
-      testcases.extend([t for t in matched_testcases if t.infile not in testcases])
+      testcases.extend([t for t in matched_testcases if t not in testcases])
+    self._PrefetchTestResults(solution, testcases, ui)
     # Try challenge cases.
     result = test.TestsetResult(self, solution, testcases)
     yield taskgraph.TaskBranch([
@@ -154,6 +275,7 @@ class Testset(targets.registry.Testset):
       yield False
     elif case_result.verdict not in (test.TestCaseResult.WA,
                                      test.TestCaseResult.TLE,
+                                     test.TestCaseResult.OLE,
                                      test.TestCaseResult.RE):
       result.Finalize(False,
                       '%s: Judge Error' % os.path.basename(testcase.infile),
@@ -180,6 +302,7 @@ class Testset(targets.registry.Testset):
     The solution can be marked as wrong but without challenge cases.
     """
     testcases = self.ListTestCases()
+    self._PrefetchTestResults(solution, testcases, ui)
     result = test.TestsetResult(self, solution, testcases)
     # Try all cases.
     yield taskgraph.TaskBranch([
@@ -206,6 +329,7 @@ class Testset(targets.registry.Testset):
     if case_result.verdict not in (test.TestCaseResult.AC,
                                    test.TestCaseResult.WA,
                                    test.TestCaseResult.TLE,
+                                   test.TestCaseResult.OLE,
                                    test.TestCaseResult.RE):
       result.Finalize(False,
                       '%s: Judge Error' %
@@ -254,42 +378,128 @@ class Testset(targets.registry.Testset):
     Cache results if option is set.
     Returns TestCaseResult.
     """
-    cache_file_name = os.path.join(solution.out_dir,
-                   os.path.splitext(os.path.basename(testcase.infile))[0] + consts.CACHE_EXT)
-    solution_file_name = os.path.join(solution.src_dir, solution.code.src_name)
-
-    cache_flag = (
-      ui.options.cache_tests and
-      files.GetModified(solution_file_name) < files.GetModified(cache_file_name) and
-      files.GetModified(testcase.infile) < files.GetModified(cache_file_name))
-
-    if cache_flag:
-      case_result_cache = files.ReadFile(cache_file_name)
-      if case_result_cache is not None:
-        j = json.loads(case_result_cache)
-        if j['time'] is not None:
-          j['time'] = float(j['time'])
-        if j['verdict'] is not None:
-          j['verdict'] = j['verdict'].encode('ascii')
-
-        case_result = test.TestCaseResult(solution, testcase, None, None, True)
-        case_result.time = j['time']
-        case_result.verdict = [
-          verdict for verdict in test.TestCaseResult.__dict__.values()
-          if isinstance(verdict, test.TestVerdict) and verdict.msg == j['verdict']][0]
-
-      yield case_result
+    key = self._GetTestResultKey(solution, testcase, ui)
+
+    if ui.options.cache_tests:
+      prefetched = self._GetPrefetchedTestResults(solution)
+      if key in prefetched:
+        cached = prefetched[key]
+      else:
+        cached = self.project.GetCacheStore().Get(TEST_RESULT_NAMESPACE, key)
+      if cached is not None:
+        yield test.TestCaseResult(solution, testcase,
+                                  test.LookupVerdict(cached['verdict']),
+                                  time=cached['time'], cached=True,
+                                  memory=cached.get('memory'))
 
     case_result = yield self._TestOneCaseNoCache(solution, testcase, ui)
 
-    # always cache in json
-    files.WriteFile(json.dumps({
-      'verdict' : case_result.verdict.msg,
-      'time'    : case_result.time
-      }),cache_file_name)
+    # always cache results
+    if case_result.verdict in _CACHEABLE_VERDICTS:
+      self.project.GetCacheStore().Put(TEST_RESULT_NAMESPACE, key, {
+        'verdict': case_result.verdict.msg,
+        'time': case_result.time,
+        'memory': case_result.memory,
+        })
 
     yield case_result
 
+  def _PrefetchTestResults(self, solution, testcases, ui):
+    """Looks up cached results of the test cases in a single query."""
+    if not ui.options.cache_tests:
+      return
+    keys = [self._GetTestResultKey(solution, testcase, ui)
+            for testcase in testcases]
+    found = self.project.GetCacheStore().GetMany(TEST_RESULT_NAMESPACE, keys)
+    # Misses are remembered as well so that they are not looked up again.
+    prefetched = self._GetPrefetchedTestResults(solution)
+    for key in keys:
+      prefetched[key] = found.get(key)
+
+  def _GetPrefetchedTestResults(self, solution):
+    if not hasattr(self, '_prefetched_test_results'):
+      self._prefetched_test_results = {}
+    return self._prefetched_test_results.setdefault(solution, {})
+
+  def _GetTestResultKey(self, solution, testcase, ui):
+    """Returns the key identifying a test result in the cache store.
+
+    The key covers everything the verdict depends on: the solution binary,
+    the input, the reference output, judges, the time and output limits and
+    whether timing was measured precisely.
+    """
+    store = self.project.GetCacheStore()
+    precise = (ui.options.precise or ui.options.parallelism <= 1)
+    parts = [solution.code.GetBinaryHash(store.GetFileHash),
+             store.GetFileHash(testcase.infile)]
+    if os.path.isfile(testcase.difffile):
+      parts.append(store.GetFileHash(testcase.difffile))
+    else:
+      parts.append('')
+    for code in self.judges + getattr(self, 'reactives', []):
+      parts.append(code.GetBinaryHash(store.GetFileHash))
+      if code.variant:
+        parts.append(code.variant.__class__.__name__)
+    parts += [testcase.timeout, precise]
+    if solution.code.output_limit is not None:
+      parts.append(solution.code.output_limit)
+    return files.GetDataHash(*parts)
+
+  # compressed test data
+  def ListTestCases(self):
+    """Enumerate test cases.
+
+    Inputs and reference outputs may be compressed, e.g. 01.in.gz.
+
+    The list is kept until files in the output directory are added or
+    removed, so that test cases are the same objects across calls.
+    """
+    names = frozenset(files.ListDir(self.out_dir, False))
+    if self._test_cases is None or self._test_case_names != names:
+      testcases = []
+      for name in names:
+        if not compression.StripExtension(name).endswith(consts.IN_EXT):
+          continue
+        infile = os.path.join(self.out_dir, name)
+        if not os.path.isfile(infile):
+          continue
+        testcases.append(
+          test.TestCase(self, infile, self._FindDiffFile(name, names)))
+      self._SortTestCases(testcases)
+      self._test_cases = testcases
+      self._test_case_names = names
+      self._test_case_index = {}
+    return list(self._test_cases)
+
+  def FindTestCases(self, pattern):
+    """Returns test cases whose input file names match a glob pattern.
+
+    Results are indexed by patterns, which are shared by challenge cases,
+    subtasks and merged tests.
+    """
+    testcases = self.ListTestCases()
+    if pattern not in self._test_case_index:
+      names = [os.path.basename(testcase.infile) for testcase in testcases]
+      matched = set(fnmatch.filter(names, pattern))
+      self._test_case_index[pattern] = [
+        testcase for testcase, name in zip(testcases, names)
+        if name in matched]
+    return list(self._test_case_index[pattern])
+
+  def _FindDiffFile(self, inname, names):
+    """Returns the reference output of the input, compressed or not.
+
+    If missing, it is named to be generated with the output compression of
+    the project.
+    """
+    diffname = (os.path.splitext(compression.StripExtension(inname))[0] +
+                consts.DIFF_EXT)
+    for ext in [''] + compression.EXTENSIONS:
+      if diffname + ext in names:
+        return os.path.join(self.out_dir, diffname + ext)
+    return os.path.join(self.out_dir,
+                        diffname + (self.project.output_compression or ''))
+
   consts.INVALID_EXT = '.invalid'
   consts.INVALIDATION_EXT = '.invalidation'
 
@@ -334,58 +544,136 @@ class Testset(targets.registry.Testset):
     ui.console.PrintAction('VALIDATE', self, 'OK')
     yield True
 
+  # log store
+  @taskgraph.task_method
+  def _RunValidatorOne(self, validator, testcase, ui):
+    """
+    Run an input validator against a single input file.
+    """
+    res = yield self._RunValidatorWithLog(validator, testcase)
+    if res.status == codes.RunResult.NG:
+      ui.errors.Error(self,
+                      '%s: Validation Failed' % os.path.basename(testcase.infile))
+      self._MaterializeValidationLog(testcase)
+      ui.console.PrintLog(
+        self.GetLogStore().Get(self._GetValidationLogKey(testcase)))
+      raise taskgraph.Bailout([False])
+    elif res.status != codes.RunResult.OK:
+      ui.errors.Error(self,
+                      '%s: Validator Failed: %s' %
+                      (os.path.basename(testcase.infile), res.status))
+      self._MaterializeValidationLog(testcase)
+      raise taskgraph.Bailout([False])
+    ui.console.PrintAction('VALIDATE', self,
+                           '%s: PASSED' % os.path.basename(testcase.infile),
+                           progress=True)
+    yield True
+
   @taskgraph.task_method
   def _RunValidatorForInvalidCasesOne(self, validator, testcase, ui):
     """
     Run an input validator against a single input file.
     """
-    validationfile = (
-      os.path.splitext(testcase.infile)[0] + consts.VALIDATION_EXT)
-    res = yield validator.Run(
-      args=(), cwd=self.out_dir,
-      input=testcase.infile,
-      output=validationfile,
-      timeout=None, precise=False,
-      redirect_error=True)
+    res = yield self._RunValidatorWithLog(validator, testcase)
     if res.status == codes.RunResult.OK:
       ui.errors.Error(self,
                       '%s: Unexpectedly Validator Accepted: %s' %
                       (os.path.basename(testcase.infile), res.status))
+      self._MaterializeValidationLog(testcase)
       raise taskgraph.Bailout([False])
     ui.console.PrintAction('VALIDATE', self,
                            '%s: Expectedly Failed' % os.path.basename(testcase.infile),
                            progress=True)
     yield True
 
+  @taskgraph.task_method
+  def _RunValidatorWithLog(self, validator, testcase):
+    """Runs a validator and keeps its messages in the log store."""
+    run_dir, _ = self.project.GetScratchSpace().CreateRunDir()
+    try:
+      logfile = os.path.join(run_dir, self._GetValidationLogKey(testcase))
+      res = yield validator.Run(
+        args=(), cwd=self.out_dir,
+        input=testcase.infile,
+        output=logfile,
+        timeout=None, precise=False,
+        redirect_error=True)
+      self.GetLogStore().Put(self._GetValidationLogKey(testcase),
+                             files.ReadFile(logfile) or '')
+    finally:
+      files.RemoveTree(run_dir)
+    stale_file = os.path.join(self.out_dir, self._GetValidationLogKey(testcase))
+    if os.path.lexists(stale_file):
+      # Only logs of failures are written out, by the caller.
+      os.remove(stale_file)
+      files.InvalidatePath(stale_file)
+    yield res
+
+  def _GetValidationLogKey(self, testcase):
+    return (os.path.splitext(os.path.basename(testcase.infile))[0] +
+            consts.VALIDATION_EXT)
+
+  def _MaterializeValidationLog(self, testcase):
+    # Logs are written out as files only for failures.
+    key = self._GetValidationLogKey(testcase)
+    self.GetLogStore().Materialize(key, os.path.join(self.out_dir, key))
+
+  def _ReadJudgeLog(self, solution, testcase):
+    return solution.GetLogStore().Get(
+      os.path.splitext(os.path.basename(testcase.infile))[0] +
+      consts.JUDGE_EXT)
+
+# copy_src_dir
+class Solution(targets.registry.Solution):
+  def _WrapSolution(self, code_class):
+    wrapped = super(Solution, self)._WrapSolution(code_class)
+    def Wrapped(src_name, src_dir, out_dir, copy_src_dir=False,
+                *args, **kwargs):
+      code = wrapped(src_name, src_dir, out_dir, *args, **kwargs)
+      code.copy_src_dir = copy_src_dir
+      code.output_limit = self.problem.output_limit
+      return code
+    return Wrapped
+
+  def ListCodes(self):
+    return [self.code]
+
 targets.registry.Override('Project', Project)
+targets.registry.Override('Problem', Problem)
 targets.registry.Override('Testset', Testset)
+targets.registry.Override('Solution', Solution)
 
 # fast_test
 @taskgraph.task_method
 def _ExecInternal(self, args, cwd, stdin, stdout, stderr,
-                  timeout=None, precise=False):
+                  timeout=None, precise=False, output_limit=None):
   task = taskgraph.ExternalProcessTask(
     args, cwd=cwd, stdin=stdin, stdout=stdout, stderr=stderr, timeout=timeout,
-    exclusive=precise)
+    exclusive=precise, output_limit=output_limit)
   proc = yield task
   code = proc.returncode
+  first_time = None
   # Retry if TLE.
   if not precise and code == -(signal.SIGXCPU):
+    first_time = task.time
     self._ResetIO(stdin, stdout, stderr)
     task = taskgraph.ExternalProcessTask(
       args, cwd=cwd, stdin=stdin, stdout=stdout, stderr=stderr, timeout=timeout,
-      exclusive=precise)
+      exclusive=precise, output_limit=output_limit)
     proc = yield task
     code = proc.returncode
+  self._InvalidateOutputs(cwd, stdout)
   if code == 0:
     status = codes.RunResult.OK
   elif code == -(signal.SIGXCPU):
     status = codes.RunResult.TLE
+  elif self._IsOutputLimitExceeded(code, stdout, output_limit):
+    status = codes.RunResult.OLE
   elif code < 0:
     status = codes.RunResult.RE
   else:
     status = codes.RunResult.NG
-  yield codes.RunResult(status, task.time)
+  yield codes.RunResult(status, task.time, task.memory, first_time=first_time)
 
 def IsTimingValid(self, ui):
   """Checks if timing stats are valid."""
@@ -396,17 +684,34 @@ def IsTimingValid(self, ui):
 basic_codes.CodeBase._ExecInternal = _ExecInternal
 test.TestsetResult.IsTimingValid = IsTimingValid
 
+# log store
+
+def GetLogStore(self):
+  """Returns the store of per-case logs, e.g. of judges and validators."""
+  if getattr(self, '_log_store', None) is None:
+    self._log_store = log_store.LogStore(
+      os.path.join(self.out_dir, consts.LOG_STORE_FILE))
+  return self._log_store
+
+rime.basic.targets.problem.ProblemComponentMixin.GetLogStore = GetLogStore
+
 # code compile
 
 @taskgraph.task_method
 def _ExecForCompile(self, args):
-  for f in files.ListDir(self.src_dir):
-    srcpath = os.path.join(self.src_dir, f)
-    dstpath = os.path.join(self.out_dir, f)
-    if os.path.isdir(srcpath):
-      files.CopyTree(srcpath, dstpath)
-    else:
-      files.CopyFile(srcpath, dstpath)
+  if self.copy_src_dir:
+    for f in files.ListDir(self.src_dir):
+      srcpath = os.path.join(self.src_dir, f)
+      dstpath = os.path.join(self.out_dir, f)
+      if os.path.isdir(srcpath):
+        files.CopyTree(srcpath, dstpath)
+      else:
+        files.CopyFile(srcpath, dstpath)
+  else:
+    for f in self._ListCompileInputs():
+      dstpath = os.path.join(self.out_dir, f)
+      files.MakeDir(os.path.dirname(dstpath))
+      files.LinkFile(os.path.join(self.src_dir, f), dstpath)
 
   if len(self.dependency) > 0:
     if libdir is None:
@@ -415,7 +720,7 @@ def _ExecForCompile(self, args):
       for f in self.dependency:
         if not os.path.exists(os.path.join(libdir, f)):
           raise IOError('%s is not found in %s.' % (f, libdir))
-        files.CopyFile(
+        files.LinkFile(
           os.path.join(libdir, f),
           self.out_dir)
 
@@ -424,17 +729,77 @@ def _ExecForCompile(self, args):
         args=args, cwd=self.out_dir,
         stdin=files.OpenNull(), stdout=outfile, stderr=subprocess.STDOUT))
 
+def _ListCompileInputs(self):
+  """Returns names of files in src_dir needed to compile this code.
+
+  They are the source file, other sources of the same language in src_dir,
+  e.g. classes referred from a Java source, and files in src_dir included
+  from them by #include.
+  """
+  exts = set(self.EXTENSIONS or [])
+  names = set([self.src_name])
+  for name in files.ListDir(self.src_dir):
+    if (os.path.splitext(name)[1][1:] in exts and
+        os.path.isfile(os.path.join(self.src_dir, name))):
+      names.add(name)
+  prefix = os.path.join(os.path.abspath(self.src_dir), '')
+  for path in includes.GetIncludeClosure(
+      [os.path.join(os.path.abspath(self.src_dir), name) for name in names],
+      []):
+    if path.startswith(prefix):
+      names.add(path[len(prefix):])
+  return sorted(names)
+
 def GetLastModified(self):
-  """Get timestamp of this target."""
+  """Get timestamp of this target.
+
+  Only library files used by the target are taken into account.
+  """
   stamp = files.GetLastModifiedUnder(self.src_dir)
-  if self.project.library_dir is not None:
-    stamp = max(stamp, files.GetLastModifiedUnder(self.project.library_dir))
+  for path in self.GetLibraryDependencies():
+    stamp = max(stamp, files.GetModified(path))
   return stamp
 
+def GetLibraryDependencies(self):
+  """Returns paths of library files used by this target.
+
+  They are files declared by dependency=[...] of the codes, and files
+  included from the sources and the declared files by #include. If a
+  declared file is missing, the library directory itself is returned as
+  well so that adding the file is noticed.
+  """
+  library_dir = self.project.library_dir
+  if library_dir is None or not os.path.isdir(library_dir):
+    return []
+  library_dir = os.path.normpath(library_dir)
+  declared = set()
+  for code in self.ListCodes():
+    declared.update(os.path.normpath(os.path.join(library_dir, f))
+                    for f in code.dependency)
+  sources = [os.path.join(self.src_dir, name)
+             for name in files.ListDir(self.src_dir, True)]
+  deps = set(includes.GetIncludeClosure(sources + sorted(declared),
+                                        [library_dir]))
+  library_prefix = os.path.join(library_dir, '')
+  deps = set(path for path in deps if path.startswith(library_prefix))
+  deps.update(declared)
+  if not all(os.path.isfile(path) for path in declared):
+    deps.add(library_dir)
+  return sorted(deps)
+
 basic_codes.CodeBase._ExecForCompile = _ExecForCompile
+basic_codes.CodeBase._ListCompileInputs = _ListCompileInputs
+basic_codes.CodeBase.copy_src_dir = False
 basic_codes.CodeBase.dependency = []
 basic_codes.CodeBase.variant = None
+def ListCodes(self):
+  """Returns codes of this target."""
+  return []
+
+rime.basic.targets.problem.ProblemComponentMixin.ListCodes = ListCodes
 rime.basic.targets.problem.ProblemComponentMixin.GetLastModified = GetLastModified
+rime.basic.targets.problem.ProblemComponentMixin.GetLibraryDependencies = (
+  GetLibraryDependencies)
 
 # -O2
 class CCode(codes.registry.CCode):
@@ -626,33 +991,30 @@ def PrintBuildSummary(results, ui):
     ui.console.Print(*status_row)
 
 def _TestsetHash(result):
-  try:
-    md5 = hashlib.md5()
-    for t in result.problem.testset.ListTestCases():
-      md5.update(files.ReadFile(t.infile))
-    return md5.hexdigest()
-  except:
+  # The md5 of the inputs is computed at build time.
+  manifest = result.problem.testset.GetManifest()
+  if manifest is None:
     return '-'
+  return manifest['in_md5']
 
 def _TestsetInSize(result):
-  try:
-    size = 0
-    for t in result.problem.testset.ListTestCases():
-      size += len(files.ReadFile(t.infile))
-    return _SmartFileSize(size)
-  except:
-    return '-'
+  return _TestsetSize(result, 'in')
 
 def _TestsetDiffSize(result):
-  try:
-    size = 0
-    for t in result.problem.testset.ListTestCases():
-      out_file = os.path.join(result.problem.testset.out_dir,
-                     os.path.splitext(os.path.basename(t.infile))[0] + consts.DIFF_EXT)
-      size += len(files.ReadFile(out_file))
-    return _SmartFileSize(size)
-  except:
+  return _TestsetSize(result, 'diff')
+
+def _TestsetSize(result, key):
+  testset = result.problem.testset
+  if testset.GetManifest() is None:
     return '-'
+  size = sum(testset.GetManifestEntry(case[key])['size']
+             for case in _ListManifestCases(result) if case[key])
+  return _SmartFileSize(size)
+
+def _ListManifestCases(result):
+  # Sizes and hashes are read from the manifest, not from test data.
+  return [case for case in result.problem.testset.GetManifest()['cases']
+          if case['in_origin'] != 'merged']
 
 def _SolutionSize(solution):
   try:
@@ -0,0 +1,160 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import os.path
+
+from rime.basic import consts
+import rime.basic.targets.project  # target dependency
+import rime.basic.targets.testset  # target dependency
+from rime.core import targets
+from rime.core import taskgraph
+from rime.util import compression
+from rime.util import files
+
+# Namespaces in the project cache store.
+VALIDATION_NAMESPACE = 'validation'
+REFERENCE_OUTPUT_NAMESPACE = 'reference_output'
+TASK_NAMESPACE = 'task'
+
+
+class MemoStore(taskgraph.MemoStore):
+  """Stores memoized task results in the project caches."""
+
+  def __init__(self, project):
+    self.project = project
+
+  def Lookup(self, key):
+    return self.project.GetCacheStore().Get(TASK_NAMESPACE, key)
+
+  def Save(self, key, record):
+    self.project.GetCacheStore().Put(TASK_NAMESPACE, key, record)
+
+  def GetFileHash(self, path):
+    return self.project.GetCacheStore().GetFileHash(path)
+
+  def PutFile(self, path):
+    return self.project.GetContentStore().Put(
+      path, digest=self.GetFileHash(path), link=True)
+
+  def HasFile(self, digest):
+    return self.project.GetContentStore().Prefetch([digest])
+
+  def GetFile(self, digest, path):
+    files.MakeDir(os.path.dirname(path))
+    return self.project.GetContentStore().Get(digest, path)
+
+
+class Project(targets.registry.Project):
+  def PostLoad(self, ui):
+    super(Project, self).PostLoad(ui)
+    taskgraph.SetMemoStore(MemoStore(self))
+
+
+class Testset(targets.registry.Testset):
+  """Memoizes validator verdicts and reference outputs by content hash."""
+
+  def _GetCodeHash(self, code):
+    return code.GetBinaryHash(self.project.GetCacheStore().GetFileHash)
+
+  @taskgraph.task_method
+  def _RunValidators(self, ui):
+    if self.project.GetRemoteCache():
+      # Fetch remote entries at once rather than one by one.
+      self.project.GetCacheStore().Prefetch(
+        VALIDATION_NAMESPACE,
+        [self._GetValidationKey(validator, testcase)
+         for validator in self.validators
+         for testcase in self.ListTestCases()])
+    yield (yield super(Testset, self)._RunValidators(ui))
+
+  @taskgraph.task_method
+  def _RunValidatorOne(self, validator, testcase, ui):
+    store = self.project.GetCacheStore()
+    key = self._GetValidationKey(validator, testcase)
+    if store.Get(VALIDATION_NAMESPACE, key):
+      ui.console.PrintAction('VALIDATE', self,
+                             '%s: PASSED (cached)' %
+                             os.path.basename(testcase.infile),
+                             progress=True)
+      yield True
+    if not (yield super(Testset, self)._RunValidatorOne(
+        validator, testcase, ui)):
+      yield False
+    store.Put(VALIDATION_NAMESPACE, key, True)
+    yield True
+
+  def _GetValidationKey(self, validator, testcase):
+    store = self.project.GetCacheStore()
+    parts = [self._GetCodeHash(validator), store.GetFileHash(testcase.infile)]
+    if validator.output_limit is not None:
+      parts.append(validator.output_limit)
+    return files.GetDataHash(*parts)
+
+  @taskgraph.task_method
+  def _RunReferenceSolution(self, ui):
+    reference_solution = self.problem.reference_solution
+    if reference_solution is not None and self.project.GetRemoteCache():
+      # Fetch remote entries and outputs at once rather than one by one.
+      digests = self.project.GetCacheStore().Prefetch(
+        REFERENCE_OUTPUT_NAMESPACE,
+        [self._GetReferenceOutputKey(reference_solution, testcase)
+         for testcase in self.ListTestCases()
+         if not os.path.isfile(testcase.difffile)])
+      self.project.GetContentStore().Prefetch(digests.values())
+    yield (yield super(Testset, self)._RunReferenceSolution(ui))
+
+  @taskgraph.task_method
+  def _RunReferenceSolutionOne(self, reference_solution, testcase, ui):
+    # Reference outputs given statically or by generators are never replaced.
+    if os.path.isfile(testcase.difffile):
+      yield True
+    store = self.project.GetCacheStore()
+    content_store = self.project.GetContentStore()
+    key = self._GetReferenceOutputKey(reference_solution, testcase)
+    digest = store.Get(REFERENCE_OUTPUT_NAMESPACE, key)
+    if digest is not None and content_store.Get(digest, testcase.difffile):
+      ui.console.PrintAction('REFRUN', reference_solution,
+                             '%s: DONE (cached)' %
+                             os.path.basename(testcase.infile),
+                             progress=True)
+      yield True
+    if not (yield super(Testset, self)._RunReferenceSolutionOne(
+        reference_solution, testcase, ui)):
+      yield False
+    digest = content_store.Dedup(testcase.difffile)
+    store.Put(REFERENCE_OUTPUT_NAMESPACE, key, digest)
+    yield True
+
+  def _GetReferenceOutputKey(self, reference_solution, testcase):
+    store = self.project.GetCacheStore()
+    parts = [self._GetCodeHash(reference_solution.code),
+             store.GetFileHash(testcase.infile),
+             compression.GetExtension(testcase.difffile)]
+    # Reactive programs take part in producing reference outputs.
+    for reactive in getattr(self, 'reactives', []):
+      parts.append(self._GetCodeHash(reactive))
+    return files.GetDataHash(*parts)
+
+
+targets.registry.Override('Project', Project)
+targets.registry.Override('Testset', Testset)
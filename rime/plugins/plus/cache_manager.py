@@ -0,0 +1,393 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import datetime
+import os
+import os.path
+import time
+
+from rime.basic import consts
+import rime.basic.targets.project  # target dependency
+import rime.basic.targets.solution  # target dependency
+import rime.basic.targets.testset  # target dependency
+from rime.core import commands
+from rime.core import hooks
+from rime.core import targets
+from rime.core import taskgraph
+from rime.plugins.plus import build_cache
+from rime.util import files
+
+# Categories of cache items other than cache store namespaces.
+OBJECTS_CATEGORY = 'objects'
+BUILD_CATEGORY = 'build'
+
+CACHE_HELP = """\
+Manages caches of the project.
+
+stats:  Shows hit rates of the last run and disk usage of caches per
+        category and per problem.
+gc:     Evicts least recently used cache items until the total size fits
+        in the budget given by project(cache_size_limit=<bytes>).
+verify: Checks cache entries and blobs, and removes corrupted ones.
+clear:  Removes all cache entries and blobs.
+
+If no subcommand is given, stats is assumed.
+
+Cache items are test results, reference outputs, validation results and
+build outputs of solutions and testsets under rime-out. If a cache size
+limit is set, garbage collection also runs automatically after each
+command.
+"""
+
+# Projects which opened their caches in this process.
+_active_projects = []
+_command_start_time = None
+
+
+class CacheItem(object):
+  """An evictable unit of caches."""
+
+  def __init__(self, category, owner, size, last_used, key):
+    self.category = category
+    self.owner = owner
+    self.size = size
+    self.last_used = last_used
+    self.key = key
+
+
+class CacheManager(object):
+  """Keeps caches of a project within the size budget."""
+
+  def __init__(self, project):
+    self.project = project
+    self.store = project.GetCacheStore()
+    self.content_store = project.GetContentStore()
+
+  def ListItems(self):
+    """Returns a list of all cache items."""
+    items = []
+    for namespace, key, size, last_used in self.store.ListEntries():
+      items.append(CacheItem(namespace, None, size, last_used,
+                             (namespace, key)))
+    # Files deduplicated into blobs are hard links to them, so they are
+    # counted only once, as blobs.
+    counted = set()
+    for digest, path, size, last_used in self.content_store.ListBlobs():
+      items.append(CacheItem(OBJECTS_CATEGORY, None, size, last_used, digest))
+      _AddInode(path, counted)
+    for problem in self.project.problems:
+      for component in problem.solutions + problem.testsets:
+        if not os.path.isdir(component.out_dir):
+          continue
+        stamp = component.stamp_file
+        if os.path.isfile(stamp):
+          last_used = os.path.getmtime(stamp)
+        else:
+          last_used = os.path.getmtime(component.out_dir)
+        items.append(CacheItem(BUILD_CATEGORY, problem.name,
+                               GetDirSize(component.out_dir, counted),
+                               last_used,
+                               component.out_dir))
+    return items
+
+  def GetTotalSize(self, items=None):
+    if items is None:
+      items = self.ListItems()
+    return sum(item.size for item in items)
+
+  def Collect(self, limit, keep_since=None):
+    """Evicts least recently used items until the total size fits in limit.
+
+    Items used at or after keep_since are never evicted.
+    Returns a list of evicted items.
+    """
+    items = self.ListItems()
+    total = self.GetTotalSize(items)
+    evicted = []
+    for item in sorted(items, key=lambda item: item.last_used):
+      if total <= limit:
+        break
+      if keep_since is not None and item.last_used >= keep_since:
+        continue
+      evicted.append(item)
+      total -= item.size
+    self._Remove(evicted)
+    return evicted
+
+  def Verify(self):
+    """Checks caches and removes corrupted items.
+
+    Returns a list of messages describing problems found.
+    """
+    problems = ['cache.db: %s' % msg for msg in self.store.CheckIntegrity()]
+    broken_entries = []
+    for namespace in sorted(set(
+        entry[0] for entry in self.store.ListEntries())):
+      for key, value in self.store.Items(namespace):
+        if value is None:
+          problems.append('%s/%s: undecodable entry' % (namespace, key))
+          broken_entries.append((namespace, key))
+    for digest, path, size, last_used in self.content_store.ListBlobs():
+      if not self.content_store.Verify(digest):
+        problems.append('%s: corrupted blob' % digest)
+        self.content_store.Remove(digest)
+    for namespace, key in self._ListDanglingEntries():
+      problems.append('%s/%s: missing blob' % (namespace, key))
+      broken_entries.append((namespace, key))
+    self.store.DeleteEntries(broken_entries)
+    return problems
+
+  def Clear(self):
+    """Removes all cache entries and blobs."""
+    self.store.Clear()
+    files.RemoveTree(self.content_store.root)
+
+  def _Remove(self, items):
+    entries = [item.key for item in items
+               if item.category not in (OBJECTS_CATEGORY, BUILD_CATEGORY)]
+    for item in items:
+      if item.category == OBJECTS_CATEGORY:
+        self.content_store.Remove(item.key)
+      elif item.category == BUILD_CATEGORY:
+        files.RemoveTree(item.key)
+    if any(item.category == OBJECTS_CATEGORY for item in items):
+      entries.extend(self._ListDanglingEntries())
+    if entries:
+      self.store.DeleteEntries(entries)
+      self.store.Vacuum()
+
+  def _ListDanglingEntries(self):
+    namespace = build_cache.REFERENCE_OUTPUT_NAMESPACE
+    return [(namespace, key)
+            for key, digest in self.store.Items(namespace)
+            if digest is not None and not self.content_store.Has(digest)]
+
+
+def GetDirSize(dir, counted=None):
+  """Returns the total size of files under the directory.
+
+  Files with inodes in the set counted are skipped, and others are added to
+  it, so that hard links are counted once.
+  """
+  if counted is None:
+    counted = set()
+  size = 0
+  for root, dirs, filenames in os.walk(dir):
+    for filename in filenames:
+      try:
+        st = os.lstat(os.path.join(root, filename))
+      except OSError:
+        continue
+      inode = (st.st_dev, st.st_ino)
+      if inode in counted:
+        continue
+      counted.add(inode)
+      size += st.st_size
+  return size
+
+
+def _AddInode(path, counted):
+  try:
+    st = os.lstat(path)
+  except OSError:
+    return
+  counted.add((st.st_dev, st.st_ino))
+
+
+def FormatSize(size):
+  for unit in ('B', 'KiB', 'MiB', 'GiB'):
+    if size < 1024 or unit == 'GiB':
+      break
+    size /= 1024.0
+  if unit == 'B':
+    return '%d %s' % (size, unit)
+  return '%.1f %s' % (size, unit)
+
+
+class Project(targets.registry.Project):
+  def GetCacheStore(self):
+    if self not in _active_projects:
+      _active_projects.append(self)
+    return super(Project, self).GetCacheStore()
+
+  def CloseCaches(self):
+    if self in _active_projects:
+      _active_projects.remove(self)
+    super(Project, self).CloseCaches()
+
+
+class Solution(targets.registry.Solution):
+  @taskgraph.task_method
+  def Build(self, ui):
+    if not (yield super(Solution, self).Build(ui)):
+      yield False
+    _TouchStamp(self)
+    yield True
+
+
+class Testset(targets.registry.Testset):
+  @taskgraph.task_method
+  def Build(self, ui):
+    if not (yield super(Testset, self).Build(ui)):
+      yield False
+    _TouchStamp(self)
+    yield True
+
+
+def _TouchStamp(component):
+  # Stamps tell when build outputs were last used.
+  try:
+    os.utime(component.stamp_file, None)
+  except OSError:
+    pass
+
+
+targets.registry.Override('Project', Project)
+targets.registry.Override('Solution', Solution)
+targets.registry.Override('Testset', Testset)
+
+
+@hooks.pre_command.Register
+def _RecordCommandStart(ui):
+  global _command_start_time
+  _command_start_time = time.time()
+
+
+@hooks.post_command.Register
+def _FlushCaches(ui):
+  # Long-running processes should not hold the database locked.
+  for project in _active_projects:
+    project.GetCacheStore().Flush()
+
+
+@hooks.post_command.Register
+def _CollectGarbage(ui):
+  for project in _active_projects:
+    if project.cache_size_limit is None:
+      continue
+    evicted = CacheManager(project).Collect(
+      project.cache_size_limit, keep_since=_command_start_time)
+    if evicted:
+      ui.console.PrintAction(
+        'CACHE', None, 'evicted %d items (%s)' %
+        (len(evicted), FormatSize(sum(item.size for item in evicted))))
+
+
+class Cache(commands.CommandBase):
+  def __init__(self, parent):
+    super(Cache, self).__init__(
+      'cache',
+      '[stats|gc|verify|clear]',
+      'Manage caches of the project.',
+      CACHE_HELP,
+      parent)
+
+  def Run(self, project, args, ui):
+    if len(args) > 1:
+      ui.errors.Error(None, 'Extra argument passed to cache command!')
+      return None
+    action = args and args[0] or 'stats'
+    actions = {
+      'stats': self._RunStats,
+      'gc': self._RunGc,
+      'verify': self._RunVerify,
+      'clear': self._RunClear,
+      }
+    if action not in actions:
+      ui.errors.Error(None, 'Unknown cache command: %s' % action)
+      return None
+    actions[action](CacheManager(project), ui)
+    return None
+
+  def _RunStats(self, manager, ui):
+    ui.console.Print('Cache directory: %s' % manager.project.cache_dir)
+    ui.console.Print()
+    stats = manager.store.GetLastRunStats()
+    if stats:
+      timestamp = max(stat[2] for stat in stats.values())
+      ui.console.Print(ui.console.BOLD, 'Last run', ui.console.NORMAL,
+                       ' (%s):' % datetime.datetime.fromtimestamp(
+                         timestamp).strftime('%Y-%m-%d %H:%M:%S'))
+      for namespace in sorted(stats):
+        hits, misses = stats[namespace][:2]
+        lookups = hits + misses
+        ui.console.Print(
+          '  %-20s %6d / %6d hits (%5.1f%%)' %
+          (namespace, hits, lookups,
+           lookups and 100.0 * hits / lookups or 0.0))
+    else:
+      ui.console.Print('No statistics of the last run.')
+    ui.console.Print()
+
+    items = manager.ListItems()
+    by_category = {}
+    by_problem = {}
+    for item in items:
+      count, size = by_category.get(item.category, (0, 0))
+      by_category[item.category] = (count + 1, size + item.size)
+      if item.owner is not None:
+        by_problem[item.owner] = by_problem.get(item.owner, 0) + item.size
+    ui.console.Print(ui.console.BOLD, 'Disk usage:', ui.console.NORMAL)
+    for category in sorted(by_category):
+      count, size = by_category[category]
+      ui.console.Print('  %-20s %12s (%d items)' %
+                       (category, FormatSize(size), count))
+    total = manager.GetTotalSize(items)
+    limit = manager.project.cache_size_limit
+    ui.console.Print('  %-20s %12s%s' %
+                     ('total', FormatSize(total),
+                      limit is not None and
+                      ' (limit: %s)' % FormatSize(limit) or ''))
+    if by_problem:
+      ui.console.Print()
+      ui.console.Print(ui.console.BOLD, 'Build outputs per problem:',
+                       ui.console.NORMAL)
+      for name in sorted(by_problem):
+        ui.console.Print('  %-20s %12s' % (name, FormatSize(by_problem[name])))
+
+  def _RunGc(self, manager, ui):
+    limit = manager.project.cache_size_limit
+    if limit is None:
+      ui.errors.Error(None, 'Cache size limit is not set in PROJECT. '
+                      'Use project(cache_size_limit=<bytes>).')
+      return
+    evicted = manager.Collect(limit)
+    ui.console.PrintAction(
+      'CACHE', None, 'evicted %d items (%s), %s in use' %
+      (len(evicted), FormatSize(sum(item.size for item in evicted)),
+       FormatSize(manager.GetTotalSize())))
+
+  def _RunVerify(self, manager, ui):
+    problems = manager.Verify()
+    for msg in problems:
+      ui.errors.Warning(None, msg)
+    ui.console.PrintAction(
+      'CACHE', None, '%d problems found' %
+      len(problems))
+
+  def _RunClear(self, manager, ui):
+    manager.Clear()
+    ui.console.PrintAction('CACHE', None, 'cleared')
+
+
+commands.registry.Add(Cache)
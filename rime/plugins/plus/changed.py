@@ -0,0 +1,174 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import os
+import os.path
+
+from rime.basic import commands as basic_commands
+from rime.basic import test
+from rime.basic.util import test_summary
+import rime.basic.targets.testset  # target dependency
+from rime.core import commands
+from rime.core import targets
+from rime.core import taskgraph
+from rime.util import files
+from rime.util import vcs
+from rime.plugins.plus import impact
+
+# Namespace in the project cache store.
+TEST_SUMMARY_NAMESPACE = 'test_summary'
+
+
+class Testset(targets.registry.Testset):
+  """Remembers test results to show them for tests which are not run."""
+
+  @taskgraph.task_method
+  def TestSolution(self, solution, ui):
+    results = yield super(Testset, self).TestSolution(solution, ui)
+    for result in results:
+      SaveSummary(result)
+    yield results
+
+
+class CachedTestsetResult(test.TestsetResult):
+  """Testset result restored from a summary saved by a previous run."""
+
+  def IsCached(self):
+    return True
+
+
+def SaveSummary(result):
+  """Saves a summary of the result for the current sources."""
+  store = result.testset.project.GetCacheStore()
+  store.Put(TEST_SUMMARY_NAMESPACE,
+            _GetFingerprint(result.testset, result.solution), {
+              'expected': bool(result.expected),
+              'detail': result.detail,
+              'cases': [
+                [os.path.basename(testcase.infile), case.verdict.msg,
+                 case.time, case.memory]
+                for testcase, case in [(testcase, result.results[testcase])
+                                       for testcase in result.testcases]],
+              })
+
+
+def LoadSummary(testset, solution):
+  """Returns the saved result for the current sources, or None."""
+  store = testset.project.GetCacheStore()
+  summary = store.Get(TEST_SUMMARY_NAMESPACE,
+                      _GetFingerprint(testset, solution))
+  if summary is None:
+    return None
+  testcases = [test.TestCase(testset, os.path.join(testset.out_dir, name))
+               for name, _, _, _ in summary['cases']]
+  result = CachedTestsetResult(testset, solution, testcases)
+  for testcase, (_, verdict, time, memory) in zip(testcases,
+                                                  summary['cases']):
+    result.results[testcase] = test.TestCaseResult(
+      solution, testcase, test.LookupVerdict(verdict), time=time,
+      cached=True, memory=memory)
+  result.Finalize(summary['expected'], summary['detail'])
+  return result
+
+
+def _GetFingerprint(testset, solution):
+  """Returns a hash of the sources which affect the test results."""
+  project = testset.project
+  problem = testset.problem
+  components = [testset, solution]
+  if problem.reference_solution not in (None, solution):
+    components.append(problem.reference_solution)
+  paths = set([project.config_file, problem.config_file])
+  for component in components:
+    for name in files.ListDir(component.src_dir, True):
+      path = os.path.join(component.src_dir, name)
+      if os.path.isfile(path):
+        paths.add(path)
+    paths.update(component.GetLibraryDependencies())
+  store = project.GetCacheStore()
+  args = []
+  for path in sorted(paths):
+    args.append(os.path.relpath(path, project.base_dir))
+    args.append(store.GetFileHash(path) if os.path.isfile(path) else '')
+  return files.GetDataHash(*args)
+
+
+class Test(commands.registry.Test):
+  def __init__(self, parent):
+    super(Test, self).__init__(parent)
+    self.AddOptionEntry(commands.OptionEntry(
+        None, 'changed', 'changed', str, '', 'rev',
+        'Only test what changed since a git revision (HEAD by default).\n'
+        'Other tests show results saved by previous runs.',
+        implicit='HEAD'))
+
+  def Run(self, project, args, ui):
+    if not ui.options.changed:
+      return super(Test, self).Run(project, args, ui)
+    if len(args) > 1:
+      ui.errors.Error(None, 'Extra argument passed to test command!')
+      return None
+    if args:
+      base_dir = os.path.abspath(args[0])
+    else:
+      base_dir = os.getcwd()
+    target = project.FindByBaseDir(base_dir)
+    if not target or not basic_commands.IsBasicTarget(target):
+      ui.errors.Error(None,
+                      'Target directory is missing or not managed by Rime.')
+      return None
+    try:
+      changed = vcs.GetChangedFiles(project.base_dir, ui.options.changed)
+    except vcs.VcsError as e:
+      ui.errors.Error(None, str(e))
+      return None
+    affected = impact.FindAffected(project, target, changed)
+    tasks = impact.CreateTestTasks(affected, ui)
+    num_affected = 0
+    cached_results = []
+    for testset, solution in impact.ListPairs(target):
+      if impact.IsAffected(affected, testset, solution):
+        num_affected += 1
+        continue
+      result = LoadSummary(testset, solution)
+      if result is None:
+        tasks.append(testset.TestSolution(solution, ui))
+      else:
+        cached_results.append(result)
+    ui.console.PrintAction(
+      'TEST', None,
+      '%d files changed since %s: %d tests affected, %d tests reused' %
+      (len(changed), ui.options.changed, num_affected, len(cached_results)))
+    return _RunAndSummarize(tuple(tasks), tuple(cached_results), ui)
+
+
+@taskgraph.task_method
+def _RunAndSummarize(tasks, cached_results, ui):
+  results = yield impact.RunAll(tasks)
+  results += cached_results
+  test_summary.PrintTestSummary(results, ui)
+  yield results
+
+
+targets.registry.Override('Testset', Testset)
+commands.registry.Override('Test', Test)
@@ -21,6 +21,7 @@
 # THE SOFTWARE.
 #
 
+import fnmatch
 import itertools
 import os
 import os.path
@@ -169,6 +170,7 @@ class Problem(targets.registry.Problem):
 #js_solution(src='main.js') # javascript (nodejs) 
 #hs_solution(src='main.hs') # haskell (stack + ghc)
 #cs_solution(src='main.cs') # C# (mono)
+#cxx_solution(src='main.cc', copy_src_dir=True) # compile with all files in this directory
 
 ## Score
 #expected_score(100)
@@ -189,6 +191,7 @@ class Problem(targets.registry.Problem):
 #cxx_generator(src='generator.cc', dependency=['testlib.h'])
 #java_generator(src='Generator.java', encoding='UTF-8', mainclass='Generator')
 #script_generator(src='generator.pl')
+#cxx_generator(src='generator.cc', copy_src_dir=True) # compile with all files in this directory
 
 ## Input validators.
 #c_validator(src='validator.c')
@@ -355,4 +358,50 @@ class Add(commands.CommandBase):
   def Run(self, project, args, ui):
     return Run('Add', project, args, ui)
 
-commands.registry.Add(Add)
\ No newline at end of file
+commands.registry.Add(Add)
+
+
+@taskgraph.task_method
+def ShowLogs(self, args, ui):
+  """Prints logs kept in the log store, optionally writing them out."""
+  if len(args) > 1:
+    ui.errors.Error(None, 'Extra argument passed to log command!')
+    yield None
+  pattern = args and args[0] or '*'
+  store = self.GetLogStore()
+  keys = fnmatch.filter(store.Keys(), pattern)
+  if not keys:
+    ui.console.PrintAction('LOG', self, 'no logs matching %s' % pattern)
+  for key in keys:
+    if ui.options.write:
+      store.Materialize(key, os.path.join(self.out_dir, key))
+    ui.console.PrintAction('LOG', self, key)
+    ui.console.PrintLog(store.Get(key))
+  yield None
+
+rime.basic.targets.solution.Solution.ShowLogs = ShowLogs
+rime.basic.targets.testset.Testset.ShowLogs = ShowLogs
+
+class Log(commands.CommandBase):
+  def __init__(self, parent):
+    super(Log, self).__init__(
+      'log',
+      '[<target> [<pattern>]]',
+      'Show logs of judges and validators.',
+      '',
+      parent)
+
+    self.AddOptionEntry(commands.OptionEntry(
+        'w', 'write', 'write', bool, False, None,
+        'Write out the logs to the output directory.'))
+
+  def Run(self, project, args, ui):
+    obj = project.FindByBaseDir(
+      os.path.abspath(args and args[0] or os.getcwd()))
+    if not hasattr(obj, 'ShowLogs'):
+      ui.errors.Error(None,
+                      'log is not supported for the specified target.')
+      return None
+    return obj.ShowLogs(args[1:], ui)
+
+commands.registry.Add(Log)
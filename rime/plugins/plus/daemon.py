@@ -0,0 +1,251 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import os
+import os.path
+import socket
+import sys
+import threading
+import traceback
+
+from rime.basic import consts
+import rime.basic.targets.project  # target dependency
+from rime.core import commands
+from rime.core import main
+from rime.core import targets
+from rime.util import console as console_mod
+from rime.util import daemon
+from rime.util import files
+from rime.util import struct
+from rime.util import watcher as watcher_mod
+
+DAEMON_HELP = """\
+Runs a daemon which serves Rime commands of the project.
+
+(no subcommand): Starts the daemon in the foreground.
+stop:            Stops the daemon.
+status:          Shows whether the daemon is running.
+
+While the daemon is running, rime commands run in the project are
+forwarded to it, and their output is streamed back. The daemon keeps the
+loaded project, directory listings and caches in memory, and watches the
+project to reload configs and forget listings when files change.
+
+Set RIME_NO_DAEMON=1 to run a command without the daemon.
+"""
+
+# Seconds to wait for output of processes left running after a command.
+_DRAIN_TIMEOUT = 5.0
+
+
+class OutputRedirector(object):
+  """Sends output written to fd 1 and 2 to a client while active.
+
+  Output of child processes and of code writing to the file descriptors
+  directly is read from a pipe by a thread. Writes to the client from the
+  thread and from the console are serialized.
+  """
+
+  def __init__(self, writer):
+    self.writer = writer
+    self._lock = threading.Lock()
+    self._saved_fds = None
+    self._thread = None
+
+  def write(self, data):
+    with self._lock:
+      self.writer.write(data)
+
+  def flush(self):
+    pass
+
+  def isatty(self):
+    return self.writer.isatty()
+
+  def __enter__(self):
+    sys.__stdout__.flush()
+    sys.__stderr__.flush()
+    read_fd, write_fd = os.pipe()
+    self._saved_fds = [os.dup(1), os.dup(2)]
+    os.dup2(write_fd, 1)
+    os.dup2(write_fd, 2)
+    os.close(write_fd)
+    self._thread = threading.Thread(target=self._Copy, args=(read_fd,))
+    self._thread.daemon = True
+    self._thread.start()
+    return self
+
+  def __exit__(self, exc_type, exc_value, tb):
+    sys.__stdout__.flush()
+    sys.__stderr__.flush()
+    for fd, saved_fd in zip((1, 2), self._saved_fds):
+      os.dup2(saved_fd, fd)
+      os.close(saved_fd)
+    # The pipe is closed when no process writes to it any longer.
+    self._thread.join(_DRAIN_TIMEOUT)
+
+  def _Copy(self, read_fd):
+    try:
+      while True:
+        data = os.read(read_fd, 4096)
+        if not data:
+          break
+        try:
+          self.write(data)
+        except socket.error:
+          # The client has gone away; keep reading not to block writers.
+          pass
+    finally:
+      os.close(read_fd)
+
+
+class DaemonSession(object):
+  """Runs commands forwarded from clients in the loaded project."""
+
+  def __init__(self, project, ui):
+    self.project = project
+    self.project_dir = project.base_dir
+    self.ui = ui
+    self.server = None
+    self.watcher = watcher_mod.CreateWatcher(ignore=self._IsIgnoredDir)
+    self.watcher.AddTree(self.project_dir)
+    library_dir = project.library_dir
+    if (library_dir and os.path.isdir(library_dir) and
+        not library_dir.startswith(os.path.join(self.project_dir, ''))):
+      self.watcher.AddTree(library_dir)
+
+  def HandleRequest(self, request, writer):
+    if request.get('command') == 'stop':
+      self.server.Stop()
+      return 0
+    self._ProcessChanges()
+    out = OutputRedirector(writer)
+    caps = struct.Struct(color=out.isatty(), overwrite=out.isatty())
+    console = console_mod.ConsoleBase(out, caps)
+    saved_cwd = os.getcwd()
+    saved_stdout = sys.stdout
+    try:
+      os.chdir(request['cwd'])
+      sys.stdout = out
+      with out:
+        return main.RunCommand(
+          request['argv'], console, self._GetProject, ui=self.ui)
+    except socket.error:
+      raise
+    except Exception:
+      console.PrintLog(traceback.format_exc())
+      return 1
+    finally:
+      sys.stdout = saved_stdout
+      os.chdir(saved_cwd)
+
+  def _GetProject(self, ui):
+    if self.project is None:
+      self.project = main.LoadProject(self.project_dir, ui)
+    return self.project
+
+  def _ProcessChanges(self):
+    changed = self.watcher.Wait(timeout=0)
+    for path in changed:
+      files.InvalidatePath(path)
+    config_names = set(
+      cls.CONFIG_FILENAME for cls in (targets.registry.Project,
+                                      targets.registry.Problem,
+                                      targets.registry.Solution,
+                                      targets.registry.Testset))
+    if (self.project is not None and
+        any(os.path.basename(path) in config_names for path in changed)):
+      # Load the project again at the next command which needs it.
+      self.project.CloseCaches()
+      self.project = None
+    # Output directories are not watched, but files there may be changed
+    # outside Rime, e.g. removed by hand.
+    if self.project is None:
+      files.InvalidatePath()
+    else:
+      for path in self._ListOutputDirs():
+        files.InvalidatePath(path)
+
+  def _ListOutputDirs(self):
+    if self.project.out_root is not None:
+      return [self.project.out_root]
+    dirs = [name for name in files.ListDir(self.project_dir)
+            if os.path.isdir(os.path.join(self.project_dir, name))]
+    return [os.path.join(self.project_dir, name, consts.RIME_OUT_DIR)
+            for name in [''] + dirs]
+
+  def _IsIgnoredDir(self, path):
+    return (os.path.basename(path) == consts.RIME_OUT_DIR or
+            (self.project is not None and path == self.project.out_root))
+
+
+class Daemon(commands.CommandBase):
+  def __init__(self, parent):
+    super(Daemon, self).__init__(
+      'daemon',
+      '[stop|status]',
+      'Serve commands of the project from a daemon.',
+      DAEMON_HELP,
+      parent)
+
+  def Run(self, project, args, ui):
+    socket_path = daemon.GetSocketPath(project.base_dir)
+    if args == ('stop',):
+      if daemon.SendRequest(socket_path, {'command': 'stop'},
+                            sys.stdout) is None:
+        ui.errors.Error(None, 'Daemon is not running.')
+      else:
+        ui.console.PrintAction('DAEMON', None, 'stopped')
+      return None
+    if args == ('status',):
+      server = daemon.DaemonServer(socket_path, None)
+      if server.IsAlive():
+        ui.console.PrintAction('DAEMON', None, 'running on %s' % socket_path)
+      else:
+        ui.console.PrintAction('DAEMON', None, 'not running')
+      return None
+    if args:
+      ui.errors.Error(None, 'Unknown subcommand: %s' % ' '.join(args))
+      return None
+    session = DaemonSession(project, ui)
+    server = daemon.DaemonServer(socket_path, session.HandleRequest)
+    session.server = server
+    try:
+      server.Bind()
+    except socket.error as e:
+      ui.errors.Error(None, 'Cannot start the daemon: %s' % e)
+      return None
+    ui.console.PrintAction(
+      'DAEMON', None, 'serving %s on %s (press Ctrl-C to stop)' %
+      (project.base_dir, socket_path))
+    try:
+      server.Serve()
+    except KeyboardInterrupt:
+      pass
+    finally:
+      server.Close()
+      session.watcher.Close()
+    return None
+
+
+commands.registry.Add(Daemon)
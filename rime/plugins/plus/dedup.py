@@ -0,0 +1,204 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import os.path
+
+from rime.basic import consts
+from rime.basic import test
+import rime.basic.targets.testset  # target dependency
+from rime.core import targets
+from rime.core import taskgraph
+from rime.util import compression
+from rime.util import files
+
+
+# Extensions of files which are materialized from the content store.
+_SHARED_EXTS = (consts.IN_EXT, consts.DIFF_EXT)
+
+
+def _IsShared(name):
+  return (os.path.splitext(compression.StripExtension(name))[1] in
+          _SHARED_EXTS)
+
+
+class Testset(targets.registry.Testset):
+  """Shares identical files in rime-out and judges duplicate cases once.
+
+  Test inputs and reference outputs, and outputs of accepted runs, are
+  stored in the content store of the project and linked from there, so
+  identical files take the space only once. Test cases whose input and
+  reference output are identical to an earlier case are not run again;
+  the result of the earlier case is reported for them as an alias.
+  """
+
+  @taskgraph.task_method
+  def _InitOutputDir(self, ui):
+    """Initialize output directory."""
+    try:
+      files.RemoveTree(self.out_dir)
+      files.MakeDir(self.out_dir)
+      store = self.project.GetCacheStore()
+      content_store = self.project.GetContentStore()
+      for name in files.ListDir(self.src_dir, True):
+        src = os.path.join(self.src_dir, name)
+        dst = os.path.join(self.out_dir, name)
+        if os.path.isdir(src):
+          files.MakeDir(dst)
+        elif _IsShared(name):
+          # Source files are copied into the store, never linked, since
+          # they may be edited in place.
+          digest = content_store.Put(
+            src, digest=store.GetFileHash(src), upload=False)
+          content_store.Get(digest, dst)
+        else:
+          files.CopyFile(src, dst)
+    except:
+      ui.errors.Exception(self)
+      yield False
+    yield True
+
+  @taskgraph.task_method
+  def _RunGenerators(self, ui):
+    if not (yield super(Testset, self)._RunGenerators(ui)):
+      yield False
+    for name in files.ListDir(self.out_dir):
+      path = os.path.join(self.out_dir, name)
+      if (_IsShared(name) and
+          os.path.isfile(path) and os.stat(path).st_nlink == 1):
+        self._DedupFile(path)
+    yield True
+
+  @taskgraph.task_method
+  def _PostBuildHook(self, ui):
+    if not (yield super(Testset, self)._PostBuildHook(ui)):
+      yield False
+    for testcase, primary in self._FindDuplicateCases():
+      ui.console.PrintAction(
+        'BUILD', self, '%s: identical to %s, judged once' %
+        (os.path.basename(testcase.infile),
+         os.path.basename(primary.infile)))
+    yield True
+
+  @taskgraph.task_method
+  def _TestSolutionWithChallengeCases(self, solution, ui):
+    self._UpdateCasePrimaries()
+    yield (yield super(Testset, self)._TestSolutionWithChallengeCases(
+      solution, ui))
+
+  @taskgraph.task_method
+  def _TestSolutionWithAllCases(self, solution, ui):
+    self._UpdateCasePrimaries()
+    yield (yield super(Testset, self)._TestSolutionWithAllCases(
+      solution, ui))
+
+  @taskgraph.task_method
+  def _TestOneCase(self, solution, testcase, ui):
+    primary = getattr(self, '_case_primaries', {}).get(testcase.infile)
+    if primary is None:
+      case_result = yield super(Testset, self)._TestOneCase(
+        solution, testcase, ui)
+      self._DedupOutput(solution, testcase, case_result)
+      yield case_result
+    # Identical cases share the task, so they are run only once.
+    case_result = yield self._TestPrimaryCase(solution, primary.infile, ui)
+    if primary.infile == testcase.infile:
+      yield case_result
+    for ext in (consts.OUT_EXT + (self.project.output_compression or ''),
+                consts.JUDGE_EXT):
+      src, dst = [
+        os.path.join(solution.out_dir,
+                     os.path.splitext(os.path.basename(t.infile))[0] + ext)
+        for t in (primary, testcase)]
+      if ext == consts.JUDGE_EXT:
+        store = solution.GetLogStore()
+        log = store.Get(os.path.basename(src))
+        if log is not None:
+          store.Put(os.path.basename(dst), log)
+      if os.path.isfile(src):
+        files.LinkFile(src, dst)
+      elif os.path.lexists(dst):
+        # The primary's outputs may not be kept, e.g. on a scratch space.
+        os.remove(dst)
+        files.InvalidatePath(dst)
+    yield test.TestCaseResult(solution, testcase, case_result.verdict,
+                              time=case_result.time,
+                              cached=case_result.cached,
+                              memory=case_result.memory,
+                              alias_of=primary)
+
+  @taskgraph.task_method
+  def _TestPrimaryCase(self, solution, infile, ui):
+    testcase = self._case_primaries[infile]
+    case_result = yield super(Testset, self)._TestOneCase(
+      solution, testcase, ui)
+    self._DedupOutput(solution, testcase, case_result)
+    yield case_result
+
+  def _UpdateCasePrimaries(self):
+    """Maps infiles of test cases to their primary cases."""
+    primaries = {}
+    for testcase in self.ListTestCases():
+      primaries[testcase.infile] = testcase
+    for testcase, primary in self._FindDuplicateCases():
+      primaries[testcase.infile] = primary
+    self._case_primaries = primaries
+
+  def _FindDuplicateCases(self):
+    """Returns a list of (testcase, primary) of duplicate test cases.
+
+    A test case is a duplicate if its input and reference output are
+    identical to those of an earlier test case, the primary.
+    """
+    store = self.project.GetCacheStore()
+    primaries = {}
+    duplicates = []
+    for testcase in self.ListTestCases():
+      try:
+        key = (store.GetFileHash(testcase.infile),
+               store.GetFileHash(testcase.difffile)
+               if os.path.isfile(testcase.difffile) else None)
+      except (IOError, OSError):
+        continue
+      primary = primaries.setdefault(key, testcase)
+      if primary is not testcase:
+        duplicates.append((testcase, primary))
+    return duplicates
+
+  def _DedupOutput(self, solution, testcase, case_result):
+    # Outputs of accepted runs are often identical among solutions.
+    if case_result.verdict != test.TestCaseResult.AC or case_result.cached:
+      return
+    outfile = os.path.join(
+      solution.out_dir,
+      os.path.splitext(os.path.basename(testcase.infile))[0] +
+      consts.OUT_EXT + (self.project.output_compression or ''))
+    if os.path.isfile(outfile):
+      self._DedupFile(outfile)
+
+  def _DedupFile(self, path):
+    self.project.GetContentStore().Dedup(
+      path, digest=self.project.GetCacheStore().GetFileHash(path),
+      upload=False)
+
+
+targets.registry.Override('Testset', Testset)
@@ -32,6 +32,7 @@ from rime.core import commands
 from rime.core import targets
 from rime.core import taskgraph
 from rime.util import class_registry
+from rime.util import compression
 from rime.util import files
 
 
@@ -112,10 +113,59 @@ class Testset(targets.registry.Testset):
     Never cache results.
     Returns TestCaseResult.
     """
-    outfile, judgefile = [
+    out_files = self._GetCaseOutputFiles(solution, testcase)
+    space = self.project.GetScratchSpace()
+    while True:
+      run_dir, on_scratch = space.CreateRunDir()
+      try:
+        # Judge logs are written to the run directory and kept in the log
+        # store. Outputs are also kept on the scratch space while judging.
+        # Both are moved to the output directory only if needed later.
+        run_files = [os.path.join(run_dir, os.path.basename(path))
+                     for path in out_files]
+        if not on_scratch:
+          run_files[0] = out_files[0]
+        case_result = yield self._RunOneCase(
+          solution, testcase, run_files[0], run_files[1], run_dir, ui)
+        if on_scratch:
+          if (case_result.verdict != test.TestCaseResult.AC and
+              not space.HasFreeSpace()):
+            # The failure may be caused by the scratch space filled up, so
+            # run again on the disk.
+            continue
+        solution.GetLogStore().Put(os.path.basename(out_files[1]),
+                                   files.ReadFile(run_files[1]) or '')
+        self._PromoteCaseOutputs(solution, case_result, run_files, out_files)
+      finally:
+        files.RemoveTree(run_dir)
+      yield case_result
+
+  def _GetCaseOutputFiles(self, solution, testcase):
+    """Returns the paths of the output and the judge log of a case."""
+    return [
       os.path.join(solution.out_dir,
                    os.path.splitext(os.path.basename(testcase.infile))[0] + ext)
-      for ext in consts.OUT_EXT, consts.JUDGE_EXT]
+      for ext in (consts.OUT_EXT + (self.project.output_compression or ''),
+                  consts.JUDGE_EXT)]
+
+  def _NeedsCaseOutputs(self, solution, case_result):
+    """Returns True if outputs of a case should be kept after judging."""
+    return case_result.verdict != test.TestCaseResult.AC
+
+  def _PromoteCaseOutputs(self, solution, case_result, run_files, out_files):
+    keep = self._NeedsCaseOutputs(solution, case_result)
+    for run_file, out_file in zip(run_files, out_files):
+      if run_file == out_file:
+        continue
+      if keep and os.path.isfile(run_file):
+        files.MoveFile(run_file, out_file)
+      elif os.path.lexists(out_file):
+        # Outputs of an earlier run must not be taken for this run's.
+        os.remove(out_file)
+        files.InvalidatePath(out_file)
+
+  @taskgraph.task_method
+  def _RunOneCase(self, solution, testcase, outfile, judgefile, cwd, ui):
     precise = (ui.options.precise or ui.options.parallelism <= 1)
     # reactive
     if self.reactives:
@@ -127,34 +177,40 @@ class Testset(targets.registry.Testset):
         reactive.variant = KUPCJudgeRunner()
       res = yield reactive.variant.Run(
         reactive=reactive,
-        args=solution.code.run_args, cwd=solution.out_dir,
+        args=solution.code.run_args, cwd=cwd,
         input=testcase.infile,
         output=outfile,
         timeout=testcase.timeout, precise=precise)
     else:
       res = yield solution.Run(
-        args=(), cwd=solution.out_dir,
+        args=(), cwd=cwd,
         input=testcase.infile,
         output=outfile,
         timeout=testcase.timeout, precise=precise)
     if res.status == core_codes.RunResult.TLE:
       yield test.TestCaseResult(solution, testcase, test.TestCaseResult.TLE,
                                 time=None, cached=False)
+    if res.status == core_codes.RunResult.OLE:
+      yield test.TestCaseResult(solution, testcase, test.TestCaseResult.OLE,
+                                time=None, cached=False)
     if res.status != core_codes.RunResult.OK:
       yield test.TestCaseResult(solution, testcase, test.TestCaseResult.RE,
                                 time=None, cached=False)
 
-    time = res.time
+    time, memory, first_time = res.time, res.memory, res.first_time
     for judge in self.judges:
       if not judge.variant:
       	judge.variant = RimeJudgeRunner()
-      res = yield judge.variant.Run(
-      	judge=judge,
-      	infile=testcase.infile,
-      	difffile=testcase.difffile,
-      	outfile=outfile,
-        cwd=self.out_dir,
-        judgefile=judgefile)
+      # Compressed files are streamed to judges through named pipes.
+      with compression.NamedPipes(
+          [testcase.infile, testcase.difffile, outfile]) as paths:
+        res = yield judge.variant.Run(
+          judge=judge,
+          infile=paths[0],
+          difffile=paths[1],
+          outfile=paths[2],
+          cwd=self.out_dir,
+          judgefile=judgefile)
       if res.status == core_codes.RunResult.NG:
         yield test.TestCaseResult(solution, testcase, test.TestCaseResult.WA,
                                   time=None, cached=False)
@@ -163,7 +219,8 @@ class Testset(targets.registry.Testset):
                                   test.TestVerdict('Validator %s' % res.status),
                                   time=None, cached=False)
     yield test.TestCaseResult(solution, testcase, test.TestCaseResult.AC,
-                              time=time, cached=False)
+                              time=time, cached=False, memory=memory,
+                              first_time=first_time)
 
   @taskgraph.task_method
   def _RunReferenceSolutionOne(self, reference_solution, testcase, ui):
@@ -172,26 +229,31 @@ class Testset(targets.registry.Testset):
     """
     if os.path.isfile(testcase.difffile):
       yield True
-    # reactive
-    if self.reactives:
-      if len(self.reactives) > 1:
-        ui.errors.Error(testset, "Multiple reactive checkers registered.")
-        yield None
-      reactive = self.reactives[0]
-      if not reactive.variant:
-        reactive.variant = KUPCJudgeRunner()
-      res = yield reactive.variant.Run(
-        reactive=reactive,
-        args=reference_solution.code.run_args, cwd=reference_solution.out_dir,
-        input=testcase.infile,
-        output=testcase.difffile,
-        timeout=None, precise=False)
-    else:
-      res = yield reference_solution.Run(
-        args=(), cwd=reference_solution.out_dir,
-        input=testcase.infile,
-        output=testcase.difffile,
-        timeout=None, precise=False)
+    # Reference outputs are written directly since they are always kept.
+    run_dir, _ = self.project.GetScratchSpace().CreateRunDir()
+    try:
+      # reactive
+      if self.reactives:
+        if len(self.reactives) > 1:
+          ui.errors.Error(testset, "Multiple reactive checkers registered.")
+          yield None
+        reactive = self.reactives[0]
+        if not reactive.variant:
+          reactive.variant = KUPCJudgeRunner()
+        res = yield reactive.variant.Run(
+          reactive=reactive,
+          args=reference_solution.code.run_args, cwd=run_dir,
+          input=testcase.infile,
+          output=testcase.difffile,
+          timeout=None, precise=False)
+      else:
+        res = yield reference_solution.Run(
+          args=(), cwd=run_dir,
+          input=testcase.infile,
+          output=testcase.difffile,
+          timeout=None, precise=False)
+    finally:
+      files.RemoveTree(run_dir)
     if res.status != core_codes.RunResult.OK:
       ui.errors.Error(reference_solution, res.status)
       raise taskgraph.Bailout([False])
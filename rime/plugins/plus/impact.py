@@ -0,0 +1,170 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+"""Finds tests affected by changes to files."""
+
+import itertools
+import os.path
+
+import rime.basic.targets.project  # target dependency
+import rime.basic.targets.solution  # target dependency
+import rime.basic.targets.testset  # target dependency
+from rime.core import targets
+from rime.core import taskgraph
+
+
+def IsConfigFile(path):
+  return os.path.basename(path) in set(
+    cls.CONFIG_FILENAME for cls in (targets.registry.Project,
+                                    targets.registry.Problem,
+                                    targets.registry.Solution,
+                                    targets.registry.Testset))
+
+
+def ListPairs(target):
+  """Returns a list of (testset, solution) tested by testing the target."""
+  if isinstance(target, targets.registry.Project):
+    return list(itertools.chain(*[ListPairs(problem)
+                                  for problem in target.problems]))
+  if isinstance(target, targets.registry.Problem):
+    return [(testset, solution) for testset in target.testsets
+            for solution in target.solutions]
+  if isinstance(target, targets.registry.Testset):
+    return [(target, solution) for solution in target.problem.solutions]
+  if isinstance(target, targets.registry.Solution):
+    return [(testset, target) for testset in target.problem.testsets]
+  return []
+
+
+def FindAffected(project, target, paths):
+  """Returns tests under the target affected by changes to the paths.
+
+  The result is a map of testset -> set of solutions to test, or None to
+  test all solutions.
+  """
+  affected = {}
+  for path in paths:
+    for testset, solution in _FindAffectedByPath(project, target, path):
+      if solution is None:
+        affected[testset] = None
+      elif affected.get(testset, set()) is not None:
+        affected.setdefault(testset, set()).add(solution)
+  return affected
+
+
+def IsAffected(affected, testset, solution):
+  if testset not in affected:
+    return False
+  return affected[testset] is None or solution in affected[testset]
+
+
+def CreateTestTasks(affected, ui):
+  """Returns tasks to run the affected tests."""
+  tasks = []
+  for testset, solutions in sorted(affected.items(),
+                                   key=lambda item: item[0].fullname):
+    if solutions is None:
+      tasks.append(testset.Test(ui))
+    else:
+      tasks.extend(testset.TestSolution(solution, ui)
+                   for solution in sorted(solutions,
+                                          key=lambda s: s.fullname))
+  return tasks
+
+
+@taskgraph.task_method
+def RunAll(tasks):
+  """Runs tasks returning lists of results, and concatenates the lists."""
+  results = yield taskgraph.TaskBranch(tasks)
+  yield list(itertools.chain(*results))
+
+
+def _FindAffectedByPath(project, target, path):
+  """Returns a list of (testset, solution) to test for a changed path.
+
+  solution is None if all solutions should be tested.
+  """
+  if isinstance(target, targets.registry.Project):
+    problems = target.problems
+  else:
+    problems = [target.problem]
+  if path == project.config_file:
+    pairs = [(t, None) for problem in problems for t in problem.testsets]
+    return _NarrowToTarget(target, pairs)
+  library_dir = project.library_dir
+  if library_dir and _IsUnder(path, os.path.normpath(library_dir)):
+    return _FindLibraryUsers(project, target, path, problems)
+  pairs = []
+  for problem in problems:
+    if not _IsUnder(path, problem.base_dir):
+      continue
+    solution = _FindOwner(path, problem.solutions)
+    testset = _FindOwner(path, problem.testsets)
+    if solution and solution is not problem.reference_solution:
+      pairs += [(t, solution) for t in problem.testsets]
+    elif testset:
+      pairs += [(testset, None)]
+    else:
+      # The reference solution or other files of the problem.
+      pairs += [(t, None) for t in problem.testsets]
+  return _NarrowToTarget(target, pairs)
+
+
+def _FindLibraryUsers(project, target, path, problems):
+  """Returns a list of (testset, solution) which use a library file."""
+  library_dir = os.path.normpath(project.library_dir)
+  def Uses(component):
+    deps = component.GetLibraryDependencies()
+    # Files added to or removed from the library may be ones which were
+    # declared but missing.
+    return path in deps or library_dir in deps
+  pairs = []
+  for problem in problems:
+    for solution in problem.solutions:
+      if not Uses(solution):
+        continue
+      if solution is problem.reference_solution:
+        pairs += [(t, None) for t in problem.testsets]
+      else:
+        pairs += [(t, solution) for t in problem.testsets]
+    pairs += [(t, None) for t in problem.testsets if Uses(t)]
+  return _NarrowToTarget(target, pairs)
+
+
+def _NarrowToTarget(target, pairs):
+  if isinstance(target, targets.registry.Solution):
+    pairs = [(t, target) for t, s in pairs if s in (None, target)]
+  elif isinstance(target, targets.registry.Testset):
+    pairs = [(t, s) for t, s in pairs if t is target]
+  return pairs
+
+
+def _IsUnder(path, dir):
+  return path == dir or path.startswith(os.path.join(dir, ''))
+
+
+def _FindOwner(path, components):
+  for component in components:
+    if _IsUnder(path, component.base_dir):
+      return component
+  return None
@@ -0,0 +1,153 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import os.path
+
+from rime.basic import consts
+import rime.basic.targets.testset  # target dependency
+from rime.core import targets
+from rime.core import taskgraph
+from rime.util import compression
+from rime.util import manifest as manifest_mod
+
+consts.MANIFEST_FILE = 'manifest.json'
+
+
+class Testset(targets.registry.Testset):
+  """Describes built test cases in a manifest.
+
+  The manifest is written at the end of a build, and lists for each case
+  the size, hashes and line count of its input and reference output, and
+  where they came from: 'static' files, a 'generator', the 'reference'
+  solution, or 'merged' cases. in_md5 is the md5 of all inputs but merged
+  ones concatenated. Summaries, reports and packers read it instead of
+  reading test data again.
+  """
+
+  def __init__(self, *args, **kwargs):
+    super(Testset, self).__init__(*args, **kwargs)
+    self._manifest = None
+
+  @taskgraph.task_method
+  def _PostBuildHook(self, ui):
+    if not (yield super(Testset, self)._PostBuildHook(ui)):
+      yield False
+    try:
+      self._WriteManifest(ui)
+    except (IOError, OSError):
+      ui.errors.Exception(self)
+      yield False
+    yield True
+
+  def IsBuildCached(self):
+    # Rebuild to write the manifest if it is missing or of an old version.
+    return (super(Testset, self).IsBuildCached() and
+            self.GetManifest() is not None)
+
+  def GetManifest(self):
+    """Returns the manifest written at the last build, or None."""
+    if self._manifest is None:
+      self._manifest = manifest_mod.Load(
+        os.path.join(self.out_dir, consts.MANIFEST_FILE))
+    return self._manifest
+
+  def GetManifestEntry(self, path):
+    """Returns the manifest entry of a test data file, or None."""
+    manifest = self.GetManifest()
+    if manifest is None:
+      return None
+    return manifest['files'].get(os.path.basename(path))
+
+  def _WriteManifest(self, ui):
+    merged = getattr(self, 'GetMergedTestCases', lambda: [])()
+    testcases = ([(testcase, False) for testcase in self.ListTestCases()] +
+                 [(testcase, True) for testcase in merged])
+    paths = []
+    for testcase, _ in testcases:
+      paths.append(testcase.infile)
+      if os.path.isfile(testcase.difffile):
+        paths.append(testcase.difffile)
+    # Entries are reused for files unchanged since the last build, e.g.
+    # linked from the content store.
+    previous = self.GetManifest()
+    previous_entries = {}
+    if previous is not None:
+      previous_entries = dict(
+        (os.path.join(self.out_dir, name), entry)
+        for name, entry in previous['files'].items())
+    entries = manifest_mod.ScanFiles(
+      paths, parallelism=ui.options.parallelism, previous=previous_entries)
+    cases = []
+    for testcase, is_merged in testcases:
+      infile = os.path.basename(testcase.infile)
+      difffile = os.path.basename(testcase.difffile)
+      if testcase.difffile not in entries:
+        difffile = None
+      if is_merged:
+        origins = ('merged', 'merged')
+      else:
+        origins = (self._GetOrigin(infile, 'generator'),
+                   difffile and self._GetOrigin(difffile, 'reference'))
+      cases.append({
+        'name': os.path.splitext(compression.StripExtension(infile))[0],
+        'in': infile,
+        'diff': difffile,
+        'in_origin': origins[0],
+        'diff_origin': origins[1],
+        })
+    self._manifest = {
+      'cases': cases,
+      'in_md5': self._HashInputs(testcases, entries, previous),
+      'files': dict((os.path.basename(path), entry)
+                    for path, entry in entries.items()),
+      }
+    manifest_mod.Save(
+      self._manifest, os.path.join(self.out_dir, consts.MANIFEST_FILE))
+    # Hashes are shared with caches, so they do not read the files again.
+    store = self.project.GetCacheStore()
+    for path, entry in entries.items():
+      if entry['mtime'] is not None:
+        store.SetFileHash(path, entry['size'], entry['mtime'], entry['sha1'])
+
+  def _HashInputs(self, testcases, entries, previous):
+    infiles = [testcase.infile for testcase, is_merged in testcases
+               if not is_merged]
+    # The hash is reused if no input is changed since the last build.
+    if previous is not None:
+      previous_infiles = [os.path.join(self.out_dir, case['in'])
+                          for case in previous['cases']
+                          if case['in_origin'] != 'merged']
+      if (previous_infiles == infiles and
+          all(entries[path]['sha1'] ==
+              previous['files'][os.path.basename(path)]['sha1']
+              for path in infiles)):
+        return previous['in_md5']
+    return manifest_mod.HashContents(infiles)
+
+  def _GetOrigin(self, name, built_origin):
+    if os.path.isfile(os.path.join(self.src_dir, name)):
+      return 'static'
+    return built_origin
+
+
+targets.registry.Override('Testset', Testset)
@@ -21,8 +21,8 @@
 # THE SOFTWARE.
 #
 
-import fnmatch
 import os.path
+import shutil
 
 from rime.basic import consts
 from rime.basic import test
@@ -30,10 +30,14 @@ import rime.basic.targets.testset  # target dependency
 from rime.core import targets
 from rime.core import taskgraph
 from rime.util import class_registry
+from rime.util import compression
 from rime.util import files
 
 consts.IN_ORIGINAL_EXT = '.in_orig'
 
+# Size of chunks to copy test data in.
+_CHUNK_SIZE = 1 << 20
+
 class TestMerger(object):
   def __init__(self, output_replace=None):
     self.output_replace = output_replace
@@ -54,18 +58,53 @@ class TestMerger(object):
       progress=True)
     self._ConcatenateDiff(difffiles, merged_testcase.difffile)
 
+  def Convert(self, testcase, ui):
+    """Converts the input of a single case into the merged format.
+
+    The original input is kept with IN_ORIGINAL_EXT.
+    """
+    src = os.path.splitext(testcase.infile)[0] + consts.IN_ORIGINAL_EXT
+    ui.console.PrintAction(
+      'MERGE', testcase.testset,
+      'Converting %s' % os.path.basename(testcase.infile),
+      progress=True)
+    files.LinkFile(testcase.infile, src)
+    self._ConcatenateIn([src], testcase.infile)
+
+  def GetMemoParams(self):
+    """Returns parameters identifying the merged outputs.
+
+    Returns None if outputs cannot be memoized.
+    """
+    if self.output_replace is None:
+      return [self.PREFIX, None]
+    if isinstance(self.output_replace, CaseNumReplace):
+      return [self.PREFIX, self.output_replace.pattern,
+              self.output_replace.replace]
+    return None
+
   def _ConcatenateIn(self, srcs, dst):
     raise NotImplementedError()
 
   def _ConcatenateDiff(self, srcs, dst):
     # avoid overwriting
     if any([os.path.exists(src) and src != dst for src in srcs]):
+      files.Unshare(dst)
       with open(dst, 'w') as f:
         for i, src in enumerate(srcs):
-          if self.output_replace:
-            f.write(self.output_replace(i + 1, files.ReadFile(src)))
-          else:
-            f.write(files.ReadFile(src))
+          with open(src) as srcfile:
+            if not self.output_replace:
+              shutil.copyfileobj(srcfile, f, _CHUNK_SIZE)
+            elif isinstance(self.output_replace, CaseNumReplace):
+              self.output_replace.Copy(i + 1, srcfile, f)
+            else:
+              # Other replacers take whole outputs.
+              f.write(self.output_replace(i + 1, srcfile.read()))
+      files.InvalidatePath(dst)
+
+  def _CopyIn(self, src, f):
+    with open(src) as srcfile:
+      shutil.copyfileobj(srcfile, f, _CHUNK_SIZE)
 
 class ICPCMerger(TestMerger):
   PREFIX = 'icpc'
@@ -76,11 +115,17 @@ class ICPCMerger(TestMerger):
     if self.input_terminator and not self.input_terminator.endswith('\n'):
       raise RuntimeError('icpc_merger(): input_terminator is not ending with \\n.')
 
+  def GetMemoParams(self):
+    params = super(ICPCMerger, self).GetMemoParams()
+    return params and params + [self.input_terminator]
+
   def _ConcatenateIn(self, srcs, dst):
+    files.Unshare(dst)
     with open(dst, 'w') as f:
-      for i, src in enumerate(srcs):
-        f.write(files.ReadFile(src))
+      for src in srcs:
+        self._CopyIn(src, f)
       f.write(self.input_terminator)
+    files.InvalidatePath(dst)
 
 class GCJMerger(TestMerger):
   PREFIX = 'gcj'
@@ -89,26 +134,76 @@ class GCJMerger(TestMerger):
     super(GCJMerger, self).__init__(output_replace)
 
   def _ConcatenateIn(self, srcs, dst):
+    files.Unshare(dst)
     with open(dst, 'w') as f:
       f.write(str(len(srcs)) + '\n')
-      for i, src in enumerate(srcs):
-        f.write(files.ReadFile(src))
+      for src in srcs:
+        self._CopyIn(src, f)
+    files.InvalidatePath(dst)
 
 test_merger_registry = class_registry.ClassRegistry(TestMerger)
 test_merger_registry.Add(ICPCMerger)
 test_merger_registry.Add(GCJMerger)
 
 
+class CaseNumReplace(object):
+  """Output replacer substituting the case number into a pattern."""
+
+  # case_pattern and case_replace are the names used by older configs.
+  def __init__(self, pattern=None, replace=None,
+               case_pattern=None, case_replace=None):
+    if pattern is None:
+      pattern = case_pattern
+    if replace is None:
+      replace = case_replace
+    if pattern is None or replace is None:
+      raise TypeError('casenum_replace() takes pattern and replace')
+    self.pattern = pattern
+    self.replace = replace
+
+  def __call__(self, i, src):
+    return src.replace(self.pattern, self.replace.format(i))
+
+  def Copy(self, i, srcfile, dstfile):
+    """Copies a file with replacement in chunks."""
+    replace = self.replace.format(i)
+    # The end of a chunk may be the beginning of the pattern.
+    keep = len(self.pattern) - 1
+    pending = ''
+    while True:
+      chunk = srcfile.read(_CHUNK_SIZE)
+      if not chunk:
+        break
+      parts = (pending + chunk).split(self.pattern)
+      last = parts.pop()
+      cut = max(0, len(last) - keep)
+      for part in parts:
+        dstfile.write(part)
+        dstfile.write(replace)
+      dstfile.write(last[:cut])
+      pending = last[cut:]
+    dstfile.write(pending)
+
+
 class MergedTestCase(test.TestCase):
-  def __init__(self, testset, name, input_pattern):
+  def __init__(self, testset, name, input_pattern, time_limit=None):
     super(MergedTestCase, self).__init__(
       testset,
       os.path.join(testset.out_dir, '{0}{1}'.format(name, consts.IN_EXT)))
     self.input_pattern = input_pattern
+    self.time_limit = time_limit
 
   @property
   def timeout(self):
-    return None
+    # Unless specified, merged cases are limited by the total of time limits
+    # of their members.
+    if self.time_limit is not None:
+      return self.time_limit
+    return sum(t.timeout for t in self.GetMembers())
+
+  def GetMembers(self):
+    """Returns test cases merged into this case."""
+    return self.testset.FindTestCases(self.input_pattern)
 
 
 class Testset(targets.registry.Testset):
@@ -131,12 +226,11 @@ class Testset(targets.registry.Testset):
       Closure(test_merger)
 
 
-    def casenum_replace(case_pattern, case_replace):
-      return lambda i, src: src.replace(pattern, replace.format(i))
-    self.exports['casenum_replace'] = casenum_replace
+    self.exports['casenum_replace'] = CaseNumReplace
 
-    def merged_testset(name, input_pattern):
-      self.merged_testcases.append(MergedTestCase(self, name, input_pattern))
+    def merged_testset(name, input_pattern, time_limit=None):
+      self.merged_testcases.append(
+        MergedTestCase(self, name, input_pattern, time_limit))
     self.exports['merged_testset'] = merged_testset
 
   @taskgraph.task_method
@@ -147,10 +241,11 @@ class Testset(targets.registry.Testset):
     # convert to merged case
     if self.test_merger:
       for testcase in self.ListTestCases():
-        src = testcase.infile
-        dst = os.path.splitext(src)[0] + consts.IN_ORIGINAL_EXT
-        files.CopyFile(src, dst)
-        self.test_merger.Run([testcase], testcase, ui)
+        if compression.IsCompressed(testcase.infile):
+          ui.errors.Error(self, 'Compressed test cases cannot be merged: %s' %
+                          os.path.basename(testcase.infile))
+          yield False
+        self.test_merger.Convert(testcase, ui)
 
     yield True
 
@@ -160,51 +255,66 @@ class Testset(targets.registry.Testset):
     if not (yield super(Testset, self)._PostBuildHook(ui)):
       yield False
     if not all((yield taskgraph.TaskBranch([
-            self._GenerateMergedTest(testcase, ui)
+            self._BuildMergedTest(testcase, ui)
             for testcase in self.GetMergedTestCases()]))):
       yield False
+    if self.validators and self.GetMergedTestCases():
+      ui.console.PrintAction('VALIDATE', self, 'OK Merged Cases')
+    yield True
 
-    if not all((yield taskgraph.TaskBranch([
-            self._ValidateMergedTest(testcase, ui)
-            for testcase in self.GetMergedTestCases()]))):
+  @taskgraph.task_method
+  def _BuildMergedTest(self, merged_testcase, ui):
+    if not (yield self._GenerateMergedTest(merged_testcase, ui)):
       yield False
-
-    yield True
+    yield (yield self._ValidateMergedTest(merged_testcase, ui))
 
   @taskgraph.task_method
   def _GenerateMergedTest(self, merged_testcase, ui):
     if not self.test_merger:
-      ui.errors.Error(testset, "No merger registered!")
+      ui.errors.Error(self, "No merger registered!")
       yield False
 
-    testcases = [t for t in self.ListTestCases()
-               if fnmatch.fnmatch(os.path.basename(t.infile),
-                                  merged_testcase.input_pattern)]
+    testcases = merged_testcase.GetMembers()
+    compressed = [t for t in testcases if compression.IsCompressed(t.infile)]
+    if compressed:
+      ui.errors.Error(self, 'Compressed test cases cannot be merged: %s' %
+                      os.path.basename(compressed[0].infile))
+      yield False
+    params = self.test_merger.GetMemoParams()
+    if params is not None:
+      inputs = []
+      for t in testcases:
+        basename = os.path.splitext(t.infile)[0]
+        inputs.append(basename + consts.IN_ORIGINAL_EXT)
+        if os.path.isfile(basename + consts.DIFF_EXT):
+          inputs.append(basename + consts.DIFF_EXT)
+      yield taskgraph.Memoize(
+        inputs=inputs,
+        params=params + [os.path.basename(path) for path in inputs],
+        outputs=[merged_testcase.infile, merged_testcase.difffile])
     self.test_merger.Run(testcases, merged_testcase, ui)
     yield True
 
   @taskgraph.task_method
   def _ValidateMergedTest(self, merged_testcase, ui):
-    if not self.validators:
-      if self.base_dir:
-        ui.errors.Warning(self, 'Validator unavailable')
-      yield True
-    testcases = self.GetMergedTestCases()
+    # Missing validators are reported for the other cases.
     results = yield taskgraph.TaskBranch([
-        self._RunValidatorOne(validator, testcase, ui)
-        for validator in self.validators
-        for testcase in testcases])
-    if not all(results):
-      yield False
-    ui.console.PrintAction('VALIDATE', self, 'OK Merged Cases')
-    yield True
+        self._RunValidatorOne(validator, merged_testcase, ui)
+        for validator in self.validators])
+    yield all(results)
 
   @taskgraph.task_method
   def _TestSolutionWithAllCases(self, solution, ui):
-    original_result = (
-      yield super(Testset, self)._TestSolutionWithAllCases(solution, ui))
-    if original_result.expected and solution.IsCorrect() and self.merged_testcases:
-      merged_result = (yield self._TestSolutionWithMergedTests(solution, ui))
+    if not (solution.IsCorrect() and self.merged_testcases):
+      yield (yield super(Testset, self)._TestSolutionWithAllCases(
+        solution, ui))
+    # Merged cases are run together with the other cases, so they are run
+    # even if the other cases fail. Their results are discarded then, but
+    # errors in running them are still reported.
+    original_result, merged_result = yield taskgraph.TaskBranch([
+        super(Testset, self)._TestSolutionWithAllCases(solution, ui),
+        self._TestSolutionWithMergedTests(solution, ui)])
+    if original_result.expected:
       original_result.results.update(merged_result.results)
       if not merged_result.expected:
         original_result.Finalize(
@@ -0,0 +1,81 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import os.path
+
+import rime.basic.targets.testset  # target dependency
+from rime.core import targets
+from rime.core import taskgraph
+from rime.util import readahead
+
+
+class Testset(targets.registry.Testset):
+  """Reads test cases into the page cache before they are run.
+
+  Otherwise a solution which reads an input first after it is generated or
+  checked out is timed with the disk reads, and may exceed the time limit.
+  Cases whose first run was slow but whose rerun was not are reported, so
+  that such noise is visible.
+  """
+
+  def __init__(self, *args, **kwargs):
+    super(Testset, self).__init__(*args, **kwargs)
+    self._prefetcher = None
+
+  @taskgraph.task_method
+  def _TestSolutionWithChallengeCases(self, solution, ui):
+    self._UpdatePrefetcher()
+    yield (yield super(Testset, self)._TestSolutionWithChallengeCases(
+      solution, ui))
+
+  @taskgraph.task_method
+  def _TestSolutionWithAllCases(self, solution, ui):
+    self._UpdatePrefetcher()
+    yield (yield super(Testset, self)._TestSolutionWithAllCases(
+      solution, ui))
+
+  @taskgraph.task_method
+  def _TestOneCaseNoCache(self, solution, testcase, ui):
+    if self._prefetcher is not None:
+      self._prefetcher.Touch(testcase.infile)
+    case_result = yield super(Testset, self)._TestOneCaseNoCache(
+      solution, testcase, ui)
+    if case_result.first_time is not None:
+      ui.errors.Warning(
+        solution, '%s: first run took %.2fs but rerun took %.2fs, '
+        'maybe slowed down by I/O' %
+        (os.path.basename(testcase.infile), case_result.first_time,
+         case_result.time))
+    yield case_result
+
+  def _UpdatePrefetcher(self):
+    # Inputs and reference outputs are read in the order of test cases.
+    paths = []
+    for testcase in self.ListTestCases():
+      paths.append(testcase.infile)
+      paths.append(testcase.difffile)
+    if self._prefetcher is None or self._prefetcher.paths != paths:
+      self._prefetcher = readahead.Prefetcher(paths)
+
+
+targets.registry.Override('Testset', Testset)
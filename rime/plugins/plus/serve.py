@@ -0,0 +1,266 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import hashlib
+import os
+import os.path
+import socket
+import threading
+
+from rime.basic import consts
+import rime.basic.targets.problem  # target dependency
+import rime.basic.targets.solution  # target dependency
+from rime.core import codes
+from rime.core import commands
+from rime.core import main
+from rime.core import targets
+from rime.core import taskgraph
+from rime.core import ui as ui_mod
+from rime.util import files
+from rime.util import struct
+
+SERVE_HELP = """\
+Runs a local judge service which grades submissions with the testsets and
+judges of the project.
+
+Submit a job by POST /submit with a JSON object:
+
+  {"problem": <problem dir>, "language": <code type>, "source": <code>}
+
+where the language is a code type such as cxx or script, or an extension
+such as cpp or py. Add ?wait=1 to the URL to wait for the result, or poll
+GET /jobs/<id>. GET /stats shows the queue depth and throughput.
+
+Queued jobs are judged together in batches of up to --batch_size jobs,
+running up to -j processes in parallel. Submissions with the same source
+are compiled only once.
+"""
+
+# Directory under the problem output directory to keep submissions.
+SUBMISSIONS_DIR = 'submissions'
+
+
+class SubmissionRunner(object):
+  """Judges submissions in the loaded project."""
+
+  def __init__(self, project, ui):
+    self.project = project
+    self.ui = ui
+    self._submissions = {}
+    self._compiles = 0
+    self._compile_hits = 0
+    self._lock = threading.Lock()
+
+  def Validate(self, request):
+    for key in ('problem', 'language', 'source'):
+      if not isinstance(request.get(key), basestring):
+        raise ValueError('%s must be a string' % key)
+    if request['language'] not in self._GetLanguages():
+      raise ValueError('Unknown language: %s (available: %s)' % (
+        request['language'], ', '.join(sorted(self._GetLanguages()))))
+
+  def RunBatch(self, jobs):
+    # Files may have changed since the last batch.
+    files.InvalidatePath()
+    graph = main.CreateTaskGraph(self.ui.options)
+    ui = self._CreateUi(graph)
+    prepared = []
+    for job in jobs:
+      problem = self._FindProblem(job.request['problem'])
+      if problem is None:
+        job.result = {'verdict': 'Unknown problem',
+                      'errors': ['Unknown problem: %s' %
+                                 job.request['problem']]}
+        continue
+      prepared.append((job, problem, self._GetSubmission(problem, job.request)))
+    if prepared:
+      graph.Run(self._JudgeBatch(tuple(prepared), ui))
+
+  def GetStats(self):
+    with self._lock:
+      return {
+        'compiles': self._compiles,
+        'compile_cache_hits': self._compile_hits,
+        }
+
+  @taskgraph.task_method
+  def _JudgeBatch(self, prepared, ui):
+    # Build testsets and compile submissions once for all jobs first, so
+    # that jobs sharing them do not race.
+    testsets = []
+    solutions = []
+    for job, problem, solution in prepared:
+      for testset in problem.testsets:
+        if testset not in testsets:
+          testsets.append(testset)
+      if solution not in solutions:
+        solutions.append(solution)
+    results = yield taskgraph.TaskBranch(
+      [testset.Build(ui) for testset in testsets] +
+      [solution.Build(ui) for solution in solutions])
+    compiled = dict(zip(solutions, results[len(testsets):]))
+    # Each job has its own UI context to collect its errors.
+    yield taskgraph.TaskBranch(
+      [self._JudgeOne(job, problem, solution, compiled[solution],
+                      self._CreateUi(ui.graph))
+       for job, problem, solution in prepared])
+    yield True
+
+  @taskgraph.task_method
+  def _JudgeOne(self, job, problem, solution, compiled, ui):
+    result = {
+      'problem': problem.name,
+      'language': job.request['language'],
+      'submission': solution.name,
+      'compile_log': solution.code.ReadCompileLog() or None,
+      }
+    if not compiled:
+      result['verdict'] = 'Compile Error'
+      result['testsets'] = []
+    else:
+      testset_results = yield problem.TestSolution(solution, ui)
+      result['verdict'] = _GetVerdict(testset_results)
+      result['testsets'] = [r.ToDict() for r in testset_results]
+    result['errors'] = ui.errors.errors
+    job.result = result
+    yield True
+
+  def _CreateUi(self, graph):
+    # Run all cases even after failures to report verdicts of every case.
+    options = struct.Struct(self.ui.options)
+    options['keep_going'] = True
+    return ui_mod.UiContext(options, self.ui.console, self.ui.commands, graph)
+
+  def _FindProblem(self, name):
+    base_dir = os.path.normpath(os.path.join(self.project.base_dir, name))
+    obj = self.project.FindByBaseDir(base_dir)
+    if not isinstance(obj, targets.registry.Problem):
+      return None
+    return obj
+
+  def _GetSubmission(self, problem, request):
+    """Returns the solution of the submission, reused for the same source."""
+    code_class = self._GetLanguages()[request['language']]
+    source = request['source'].encode('utf-8')
+    digest = hashlib.sha1(
+      '%s\0%s' % (code_class.PREFIX, source)).hexdigest()
+    submission_dir = os.path.join(problem.out_dir, SUBMISSIONS_DIR, digest)
+    src_dir = os.path.join(submission_dir, 'src')
+    src_name = 'Main.%s' % code_class.EXTENSIONS[0]
+    src_file = os.path.join(src_dir, src_name)
+    # The source may have been removed by clean.
+    if not os.path.isfile(src_file):
+      files.MakeDir(src_dir)
+      files.WriteFile(source, src_file)
+      if source.startswith('#!'):
+        os.chmod(src_file, 0755)
+    key = (problem.name, digest)
+    with self._lock:
+      if key in self._submissions:
+        self._compile_hits += 1
+        return self._submissions[key]
+      self._compiles += 1
+    solution = targets.registry.Solution('submission-%s' % digest[:12],
+                                         src_dir, problem)
+    solution.out_dir = os.path.join(submission_dir, 'out')
+    solution.stamp_file = os.path.join(solution.out_dir, consts.STAMP_FILE)
+    # The code is made as in SOLUTION to apply problem settings, e.g. the
+    # output limit.
+    solution.code = solution._WrapSolution(code_class)(
+      src_name, src_dir, solution.out_dir)
+    with self._lock:
+      self._submissions[key] = solution
+    return solution
+
+  def _GetLanguages(self):
+    languages = {}
+    for code_class in codes.registry.classes.values():
+      if code_class.PREFIX == codes.AutoCode.PREFIX or not code_class.EXTENSIONS:
+        continue
+      for name in [code_class.PREFIX] + code_class.EXTENSIONS:
+        languages.setdefault(name, code_class)
+    return languages
+
+
+def _GetVerdict(testset_results):
+  """Returns the verdict of the first failed case, or Accepted."""
+  for testset_result in testset_results:
+    for testcase in testset_result.testcases:
+      verdict = testset_result.results[testcase].verdict.msg
+      if verdict != 'Accepted':
+        return verdict
+    if not testset_result.testcases and not testset_result.expected:
+      return testset_result.detail
+  return 'Accepted'
+
+
+class Serve(commands.CommandBase):
+  def __init__(self, parent):
+    super(Serve, self).__init__(
+      'serve',
+      '',
+      'Run a local judge service for the project.',
+      SERVE_HELP,
+      parent)
+    self.AddOptionEntry(commands.OptionEntry(
+        None, 'host', 'host', str, 'localhost', 'host',
+        'Address to listen on.'))
+    self.AddOptionEntry(commands.OptionEntry(
+        None, 'port', 'port', int, 8421, 'port',
+        'Port to listen on.'))
+    self.AddOptionEntry(commands.OptionEntry(
+        None, 'batch_size', 'batch_size', int, 8, 'n',
+        'Maximum number of jobs judged together.'))
+
+  def Run(self, project, args, ui):
+    if args:
+      ui.errors.Error(None, 'Extra argument passed to serve command!')
+      return None
+    # HTTP server modules are loaded only when serving.
+    from rime.util import judge_server
+    runner = SubmissionRunner(project, ui)
+    queue = judge_server.JobQueue(runner, ui.options.batch_size)
+    try:
+      server = judge_server.JudgeServer(
+        (ui.options.host, ui.options.port), queue,
+        verbose=bool(ui.options.debug))
+    except socket.error as e:
+      ui.errors.Error(None, 'Cannot start the server: %s' % e)
+      return None
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    ui.console.PrintAction(
+      'SERVE', None, 'judging %s at http://%s:%d/ (press Ctrl-C to stop)' %
+      (project.base_dir, ui.options.host, server.server_address[1]))
+    try:
+      queue.Serve()
+    except KeyboardInterrupt:
+      pass
+    finally:
+      server.shutdown()
+      server.server_close()
+    return None
+
+
+commands.registry.Add(Serve)
@@ -0,0 +1,197 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import cPickle as pickle
+import cStringIO
+import os
+import os.path
+import sys
+
+from rime.basic import consts
+import rime.basic.targets.problem  # target dependency
+from rime.core import targets
+from rime.util import files
+
+consts.SNAPSHOT_FILE = 'snapshot.pickle'
+
+# Bump this when the snapshot layout changes.
+_SNAPSHOT_FORMAT = 1
+
+# Persistent ids of objects which are not part of a snapshot.
+_PROJECT_ID = 'project'
+_PROBLEM_ID = 'problem'
+
+_modules_key = None
+
+
+class Problem(targets.registry.Problem):
+  """Reuses the loaded subtree of the problem while its configs are unchanged.
+
+  A snapshot of the problem, its solutions and testsets is saved after each
+  load. It is keyed by contents of config files, listings of target
+  directories, source files of codes and versions of loaded modules.
+  """
+
+  def Load(self, ui):
+    path = os.path.join(self.out_dir, consts.SNAPSHOT_FILE)
+    if self._RestoreSnapshot(path):
+      return
+    num_messages = len(ui.errors.errors) + len(ui.errors.warnings)
+    super(Problem, self).Load(ui)
+    if len(ui.errors.errors) + len(ui.errors.warnings) == num_messages:
+      self._SaveSnapshot(path)
+    else:
+      # Load again next time so that messages are shown again.
+      try:
+        os.remove(path)
+      except OSError:
+        pass
+
+  def _RestoreSnapshot(self, path):
+    try:
+      with open(path, 'rb') as f:
+        snapshot = pickle.load(f)
+      if (snapshot['format'] != _SNAPSHOT_FORMAT or
+          snapshot['key'] != self._GetSnapshotKey() or
+          snapshot['deps'] != _GetDependencies(*[
+            [path for path, _ in deps] for deps in snapshot['deps']])):
+        return False
+      unpickler = pickle.Unpickler(cStringIO.StringIO(snapshot['state']))
+      unpickler.persistent_load = self._GetPersistentObject
+      state = unpickler.load()
+    except Exception:
+      return False
+    self.__dict__.update(state)
+    return True
+
+  def _SaveSnapshot(self, path):
+    subtree = _ListTargets(self)
+    deps = _GetDependencies(
+      [target.config_file for target in subtree],
+      [target.base_dir for target in subtree],
+      sorted(set(os.path.join(code.src_dir, code.src_name)
+                 for target in subtree for code in _ListCodes(target))))
+    try:
+      buf = cStringIO.StringIO()
+      pickler = pickle.Pickler(buf, pickle.HIGHEST_PROTOCOL)
+      pickler.persistent_id = self._GetPersistentId
+      pickler.dump(self.__getstate__())
+      snapshot = {'format': _SNAPSHOT_FORMAT,
+                  'key': self._GetSnapshotKey(),
+                  'deps': deps,
+                  'state': buf.getvalue()}
+      files.MakeDir(self.out_dir)
+      tmp_path = '%s.%d' % (path, os.getpid())
+      with open(tmp_path, 'wb') as f:
+        pickle.dump(snapshot, f, pickle.HIGHEST_PROTOCOL)
+      os.rename(tmp_path, path)
+    except Exception:
+      # Targets holding unpicklable values, e.g. functions defined in
+      # configs, are simply loaded every time.
+      pass
+
+  def _GetSnapshotKey(self):
+    return (_GetModulesKey(), files.GetFileHash(self.project.config_file),
+            self.base_dir)
+
+  def _GetPersistentId(self, obj):
+    if obj is self:
+      return _PROBLEM_ID
+    if obj is self.project:
+      return _PROJECT_ID
+    return None
+
+  def _GetPersistentObject(self, pid):
+    if pid == _PROBLEM_ID:
+      return self
+    if pid == _PROJECT_ID:
+      return self.project
+    raise pickle.UnpicklingError('unknown persistent id: %s' % pid)
+
+
+def _ListTargets(root):
+  """Returns targets in the subtree including the root."""
+  found = [root]
+  visited = set([id(root), id(root.parent)])
+  for target in found:
+    for value in _IterValues(target):
+      if isinstance(value, targets.TargetBase) and id(value) not in visited:
+        visited.add(id(value))
+        found.append(value)
+  return found
+
+
+def _ListCodes(target):
+  if isinstance(target, rime.basic.targets.problem.ProblemComponentMixin):
+    return target.ListCodes()
+  return []
+
+
+def _IterValues(target):
+  for value in target.__dict__.values():
+    if isinstance(value, (list, tuple)):
+      for item in value:
+        yield item
+    else:
+      yield value
+
+
+def _GetDependencies(config_files, dirs, src_files):
+  """Returns the state of files which affects loading of targets."""
+  return (
+    [(path, files.GetFileHash(path) if os.path.isfile(path) else None)
+     for path in config_files],
+    # Output directories are made by saving snapshots, and are not targets.
+    [(path, sorted(name for name in files.ListDir(path)
+                   if name != consts.RIME_OUT_DIR))
+     for path in dirs],
+    [(path, _GetFileStat(path)) for path in src_files])
+
+
+def _GetFileStat(path):
+  try:
+    st = os.stat(path)
+  except OSError:
+    return None
+  return (st.st_size, st.st_mtime)
+
+
+def _GetModulesKey():
+  """Returns versions of Rime modules and plugins currently loaded."""
+  global _modules_key
+  if _modules_key is None:
+    key = []
+    for name, module in sorted(sys.modules.items()):
+      if module is None or not name.startswith('rime.'):
+        continue
+      path = getattr(module, '__file__', None)
+      if path is None:
+        continue
+      if path.endswith('.pyc') or path.endswith('.pyo'):
+        path = path[:-1]
+      key.append((name, _GetFileStat(path)))
+    _modules_key = key
+  return _modules_key
+
+
+targets.registry.Override('Problem', Problem)
@@ -21,7 +21,6 @@
 # THE SOFTWARE.
 #
 
-import fnmatch
 import os.path
 import re
 
@@ -32,7 +31,6 @@ import rime.basic.targets.testset  # target dependency
 from rime.core import targets
 from rime.core import taskgraph
 from rime.util import class_registry
-from rime.util import files
 
 
 class SubtaskTestCase(test.TestCase):
@@ -77,9 +75,11 @@ class Testset(targets.registry.Testset):
       min_score = 0
 
       for subtask in self.subtask_testcases:
+        subtask_infiles = set(
+          t.infile for input_pattern in subtask.input_patterns
+          for t in self.FindTestCases(input_pattern))
         subtask_results = [r for (t, r) in original_result.results.items()
-               if any([fnmatch.fnmatch(os.path.basename(t.infile),
-                                  input_pattern) for input_pattern in subtask.input_patterns])]
+               if t.infile in subtask_infiles]
         accepted = all([result.verdict == test.TestCaseResult.AC for result in subtask_results
           if result.verdict != test.TestCaseResult.NA])
         unknown = any([result.verdict == test.TestCaseResult.NA for result in subtask_results])
@@ -115,9 +115,8 @@ class Testset(targets.registry.Testset):
       score = 0
       p = re.compile("IMOJUDGE<<<(\\d+)>>>")
       for (testcase, result) in original_result.results.items():
-        judge_detail = files.ReadFile(
-          os.path.join(solution.out_dir, 
-            os.path.splitext(os.path.basename(testcase.infile))[0] + consts.JUDGE_EXT))
+        judge_detail = solution.GetLogStore().Get(
+          os.path.splitext(os.path.basename(testcase.infile))[0] + consts.JUDGE_EXT)
         if judge_detail:
           judge_detail = judge_detail.strip()
           if judge_detail.isdigit():
@@ -0,0 +1,206 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import os
+import os.path
+
+from rime.basic import consts
+from rime.basic.util import test_summary
+import rime.basic.targets.project  # target dependency
+import rime.basic.targets.solution  # target dependency
+import rime.basic.targets.testset  # target dependency
+from rime.core import commands
+from rime.core import main
+from rime.core import targets
+from rime.core import ui as ui_mod
+from rime.util import files
+from rime.util import watcher as watcher_mod
+from rime.plugins.plus import impact
+
+WATCH_HELP = """\
+Watches source files under the target and reruns tests on changes.
+
+Changes to a solution retest the solution, and changes to a testset or the
+reference solution rebuild the testset and retest all solutions. Changes
+to library_dir retest the solutions and testsets which use the changed
+files, and changes to config files reload the project.
+
+After each run, only verdicts which changed since the previous run are
+shown. Press Ctrl-C to stop watching.
+"""
+
+
+class WatchSession(object):
+  """Keeps the project loaded and reruns tests affected by changes."""
+
+  def __init__(self, project, base_dir, ui):
+    self.project = project
+    self.base_dir = base_dir
+    self.ui = ui
+    self.target = None
+    self.verdicts = {}
+    self.watcher = None
+    self.watched_dirs = []
+
+  def Loop(self):
+    self.target = self.project.FindByBaseDir(self.base_dir)
+    if not self.target:
+      self.ui.errors.Error(
+        None, 'Target directory is missing or not managed by Rime.')
+      return
+    self.watcher = watcher_mod.CreateWatcher(ignore=self._IsIgnoredDir)
+    self._UpdateWatchedDirs()
+    try:
+      self._RunTests([self.target.Test(self.ui)])
+      while True:
+        self.ui.console.PrintAction(
+          'WATCH', None, 'waiting for changes (press Ctrl-C to stop)')
+        changed = self.watcher.Wait()
+        for path in changed:
+          files.InvalidatePath(path)
+        tasks = self._GetAffectedTasks(changed)
+        if tasks:
+          self._RunTests(tasks)
+    except KeyboardInterrupt:
+      self.ui.console.Print()
+    finally:
+      self.watcher.Close()
+
+  def _GetWatchedDirs(self):
+    if isinstance(self.target, targets.registry.Project):
+      dirs = [self.project.base_dir]
+    else:
+      dirs = [self.target.problem.base_dir]
+    if self.project.library_dir and os.path.isdir(self.project.library_dir):
+      dirs.append(self.project.library_dir)
+    return dirs
+
+  def _UpdateWatchedDirs(self):
+    dirs = self._GetWatchedDirs()
+    for dir in self.watched_dirs:
+      if dir not in dirs:
+        self.watcher.RemoveTree(dir)
+    for dir in dirs:
+      if dir not in self.watched_dirs:
+        self.watcher.AddTree(dir)
+    self.watched_dirs = dirs
+
+  def _IsIgnoredDir(self, path):
+    return (os.path.basename(path) == consts.RIME_OUT_DIR or
+            path in (self.project.cache_dir, self.project.out_root))
+
+  def _GetAffectedTasks(self, changed):
+    if any(impact.IsConfigFile(path) for path in changed):
+      if not self._Reload():
+        return []
+      return [self.target.Test(self.ui)]
+    affected = impact.FindAffected(self.project, self.target, changed)
+    return impact.CreateTestTasks(affected, self.ui)
+
+  def _Reload(self):
+    self.ui.console.PrintAction('WATCH', None, 'reloading configs')
+    files.InvalidatePath()
+    # Release the cache database for the new project.
+    self.project.CloseCaches()
+    project = main.LoadProject(self.project.base_dir, self.ui)
+    target = project and project.FindByBaseDir(self.base_dir)
+    if not target:
+      self.ui.errors.PrintSummary()
+      self.ui.errors = ui_mod.ErrorRecorder(self.ui)
+      return False
+    self.project = project
+    self.target = target
+    # library_dir may have been changed.
+    self._UpdateWatchedDirs()
+    return True
+
+  def _RunTests(self, tasks):
+    # Tasks are memoized in a graph, so each run needs a fresh one.
+    self.ui.graph = main.CreateTaskGraph(self.ui.options)
+    self.ui.errors = ui_mod.ErrorRecorder(self.ui)
+    results = self.ui.graph.Run(impact.RunAll(tuple(tasks)))
+    if not self.verdicts:
+      test_summary.PrintTestSummary(results, self.ui)
+    else:
+      self._PrintVerdictChanges(results)
+    for result in results:
+      self.verdicts[self._GetResultKey(result)] = self._GetVerdict(result)
+    if self.ui.errors.HasError() or self.ui.errors.HasWarning():
+      self.ui.console.Print()
+      self.ui.errors.PrintSummary()
+
+  def _PrintVerdictChanges(self, results):
+    console = self.ui.console
+    console.Print()
+    console.Print(console.BOLD, 'Verdict Changes:', console.NORMAL)
+    num_changes = 0
+    for result in sorted(results,
+                         test_summary.CompareTestResultForListing):
+      old = self.verdicts.get(self._GetResultKey(result))
+      new = self._GetVerdict(result)
+      if old == new:
+        continue
+      num_changes += 1
+      row = ['  ', result.solution.fullname, ' ']
+      if len(result.problem.testsets) > 1:
+        row += ['(', result.testset.name, ') ']
+      if old is not None:
+        row += [old[0] and 'OK' or 'FAIL', ' -> ']
+      row += [new[0] and console.GREEN or console.RED,
+              new[0] and 'OK' or 'FAIL', console.NORMAL, ' ', result.detail]
+      console.Print(*row)
+    if num_changes == 0:
+      console.Print('  No changes in %d results' % len(results))
+
+  def _GetResultKey(self, result):
+    return (result.testset.fullname, result.solution.fullname)
+
+  def _GetVerdict(self, result):
+    # Timings of accepted solutions vary between runs and are not changes.
+    if result.expected and result.IsAccepted():
+      return (True, None)
+    return (bool(result.expected), result.detail)
+
+
+class Watch(commands.CommandBase):
+  def __init__(self, parent):
+    super(Watch, self).__init__(
+      'watch',
+      '[<target>]',
+      'Rerun tests in a target on changes.',
+      WATCH_HELP,
+      parent)
+
+  def Run(self, project, args, ui):
+    if len(args) > 1:
+      ui.errors.Error(None, 'Extra argument passed to watch command!')
+      return None
+    if args:
+      base_dir = os.path.abspath(args[0])
+    else:
+      base_dir = os.getcwd()
+    WatchSession(project, base_dir, ui).Loop()
+    return None
+
+
+commands.registry.Add(Watch)
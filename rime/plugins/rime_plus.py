@@ -25,5 +25,15 @@
 import rime.plugins.plus.basic_patch
 import rime.plugins.plus.commands
 import rime.plugins.plus.flexible_judge
+import rime.plugins.plus.build_cache
+import rime.plugins.plus.cache_manager
+import rime.plugins.plus.daemon
+import rime.plugins.plus.snapshot
 import rime.plugins.plus.merged_test
+import rime.plugins.plus.dedup
+import rime.plugins.plus.prefetch
+import rime.plugins.plus.manifest
+import rime.plugins.plus.serve
 import rime.plugins.plus.subtask
+import rime.plugins.plus.changed
+import rime.plugins.plus.watch
@@ -27,9 +27,6 @@ import getpass
 import re
 import socket
 import subprocess
-import urllib
-import urllib2
-import urlparse
 
 import rime.basic.targets.problem  # target dependency
 import rime.basic.targets.project  # target dependency
@@ -163,6 +160,11 @@ class Project(targets.registry.Project):
             '%(cell_validator)s|%(cell_judge)s|\n') % locals())
 
   def _UploadWiki(self, wiki, ui):
+    # Network modules are imported lazily to keep startup fast.
+    import urllib
+    import urllib2
+    import urlparse
+
     url = self.wikify_url
     page = SafeUnicode(self.wikify_page)
     encoding = self.wikify_encoding
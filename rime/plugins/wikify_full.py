@@ -30,9 +30,6 @@ import os.path
 import re
 import socket
 import subprocess
-import urllib
-import urllib2
-import urlparse
 
 from rime.basic.targets import problem
 import rime.basic.targets.project  # target dependency
@@ -0,0 +1,313 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import atexit
+import json
+import os
+import sqlite3
+import time
+
+from rime.util import files
+
+
+# Do not trust hashes of files modified within this many seconds, since
+# another write in the same timestamp granularity would go unnoticed.
+_RACY_MTIME_WINDOW = 2.0
+
+# Commit pending writes after this many updates.
+_AUTO_FLUSH_WRITES = 256
+
+# Maximum number of host parameters in a single sqlite statement.
+_MAX_QUERY_PARAMS = 500
+
+
+class CacheStore(object):
+  """Persistent key-value store backed by a sqlite database.
+
+  Entries are grouped into namespaces, and values are JSON-serializable
+  objects. Writes are batched into transactions which are committed
+  periodically and at exit.
+
+  The store also keeps the last use time of each entry and of each blob of
+  the content store for eviction, and hit/miss counts of lookups made in the
+  last run.
+
+  If remote is given, it is used as the second tier: missing entries are
+  looked up in the remote cache, and new entries are uploaded to it.
+  """
+
+  def __init__(self, path, remote=None):
+    self.path = path
+    self.remote = remote
+    self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+    self.conn.text_factory = str
+    self.conn.execute('PRAGMA synchronous=NORMAL')
+    self.conn.execute(
+      'CREATE TABLE IF NOT EXISTS entries ('
+      'namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, '
+      'last_used REAL NOT NULL DEFAULT 0, '
+      'PRIMARY KEY (namespace, key))')
+    columns = [row[1] for row in
+               self.conn.execute('PRAGMA table_info(entries)')]
+    if 'last_used' not in columns:
+      self.conn.execute(
+        'ALTER TABLE entries ADD COLUMN last_used REAL NOT NULL DEFAULT 0')
+    self.conn.execute(
+      'CREATE TABLE IF NOT EXISTS file_hashes ('
+      'path TEXT PRIMARY KEY, size INTEGER, mtime REAL, digest TEXT)')
+    self.conn.execute(
+      'CREATE TABLE IF NOT EXISTS blobs ('
+      'digest TEXT PRIMARY KEY, last_used REAL NOT NULL)')
+    self.conn.execute(
+      'CREATE TABLE IF NOT EXISTS last_run_stats ('
+      'namespace TEXT PRIMARY KEY, hits INTEGER, misses INTEGER, '
+      'timestamp REAL)')
+    self.conn.commit()
+    self._file_hashes = None
+    self._pending_writes = 0
+    self._used_keys = set()
+    self._used_blobs = set()
+    self._stats = {}
+    atexit.register(self.Close)
+
+  def Get(self, namespace, key, default=None):
+    """Returns the value stored for the key, or default if missing."""
+    values = self._Lookup(namespace, [key])
+    self._CountLookup(namespace, [key], values.keys())
+    return values.get(key, default)
+
+  def GetMany(self, namespace, keys):
+    """Looks up multiple keys at once.
+
+    Returns a dictionary containing only the keys found.
+    """
+    keys = list(set(keys))
+    values = self._Lookup(namespace, keys)
+    self._CountLookup(namespace, keys, values.keys())
+    return values
+
+  def Prefetch(self, namespace, keys):
+    """Makes entries available locally ahead of lookups.
+
+    Unlike GetMany, this does not count as lookups of the keys.
+    Returns a dictionary containing only the keys found.
+    """
+    return self._Lookup(namespace, list(set(keys)))
+
+  def Put(self, namespace, key, value):
+    """Stores a value for the key, replacing the old one."""
+    self._PutLocal(namespace, key, value)
+    if self.remote:
+      self.remote.PutEntry(namespace, key, value)
+
+  def Delete(self, namespace, key):
+    """Removes the entry if it exists."""
+    self.conn.execute(
+      'DELETE FROM entries WHERE namespace = ? AND key = ?',
+      (namespace, key))
+    self._MaybeFlush()
+
+  def Clear(self):
+    """Removes all entries and remembered file hashes."""
+    self.conn.execute('DELETE FROM entries')
+    self.conn.execute('DELETE FROM file_hashes')
+    self.conn.execute('DELETE FROM blobs')
+    self._file_hashes = None
+    self._used_keys.clear()
+    self._used_blobs.clear()
+    self.conn.commit()
+    self.Vacuum()
+
+  def ListEntries(self):
+    """Returns a list of (namespace, key, size, last_used) of all entries."""
+    self.Flush()
+    return [(namespace, key, size + len(key), last_used)
+            for namespace, key, size, last_used in self.conn.execute(
+              'SELECT namespace, key, LENGTH(value), last_used FROM entries')]
+
+  def Items(self, namespace):
+    """Returns a list of (key, value) in the namespace.
+
+    Values which cannot be decoded are returned as None.
+    """
+    self.Flush()
+    items = []
+    for key, value in self.conn.execute(
+        'SELECT key, value FROM entries WHERE namespace = ?', (namespace,)):
+      try:
+        items.append((key, json.loads(value)))
+      except ValueError:
+        items.append((key, None))
+    return items
+
+  def DeleteEntries(self, entries):
+    """Removes entries given as a list of (namespace, key)."""
+    self.conn.executemany(
+      'DELETE FROM entries WHERE namespace = ? AND key = ?', entries)
+    self.conn.commit()
+
+  def MarkBlobsUsed(self, digests):
+    """Records that blobs of the content store are used now."""
+    self._used_blobs.update(digests)
+
+  def GetBlobsLastUsed(self):
+    """Returns a dictionary of digest -> last use time of blobs."""
+    self.Flush()
+    return dict(self.conn.execute('SELECT digest, last_used FROM blobs'))
+
+  def DeleteBlobs(self, digests):
+    """Forgets the last use time of removed blobs."""
+    self.conn.executemany(
+      'DELETE FROM blobs WHERE digest = ?', [(digest,) for digest in digests])
+    self._used_blobs.difference_update(digests)
+    self._MaybeFlush()
+
+  def Vacuum(self):
+    """Shrinks the database file."""
+    self.Flush()
+    self.conn.execute('VACUUM')
+
+  def CheckIntegrity(self):
+    """Returns a list of problems found by sqlite, empty if healthy."""
+    rows = [row[0] for row in self.conn.execute('PRAGMA integrity_check')]
+    return [row for row in rows if row != 'ok']
+
+  def GetLastRunStats(self):
+    """Returns a dictionary of namespace -> (hits, misses, timestamp)."""
+    return dict(
+      (row[0], row[1:]) for row in self.conn.execute(
+        'SELECT namespace, hits, misses, timestamp FROM last_run_stats'))
+
+  def GetFileHash(self, path):
+    """Returns the content hash of a file.
+
+    Hashes are remembered across runs together with the size and modification
+    time of the file, so unchanged files are not read again.
+    """
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    cached = self._GetFileHashes().get(path)
+    if cached and cached[0] == st.st_size and cached[1] == st.st_mtime:
+      return cached[2]
+    digest = files.GetFileHash(path)
+    self.SetFileHash(path, st.st_size, st.st_mtime, digest)
+    return digest
+
+  def SetFileHash(self, path, size, mtime, digest):
+    """Remembers the content hash of a file computed elsewhere.
+
+    The hash is ignored if the file was modified too recently to trust it.
+    """
+    if time.time() - mtime <= _RACY_MTIME_WINDOW:
+      return
+    path = os.path.abspath(path)
+    if self._GetFileHashes().get(path) == (size, mtime, digest):
+      return
+    self._file_hashes[path] = (size, mtime, digest)
+    self.conn.execute(
+      'INSERT OR REPLACE INTO file_hashes (path, size, mtime, digest) '
+      'VALUES (?, ?, ?, ?)',
+      (path, size, mtime, digest))
+    self._MaybeFlush()
+
+  def Flush(self):
+    """Commits pending writes."""
+    if self.conn is None:
+      return
+    if self._used_keys:
+      now = time.time()
+      self.conn.executemany(
+        'UPDATE entries SET last_used = ? WHERE namespace = ? AND key = ?',
+        [(now, namespace, key) for namespace, key in self._used_keys])
+      self._used_keys.clear()
+      self._pending_writes += 1
+    if self._used_blobs:
+      now = time.time()
+      self.conn.executemany(
+        'INSERT OR REPLACE INTO blobs (digest, last_used) VALUES (?, ?)',
+        [(digest, now) for digest in self._used_blobs])
+      self._used_blobs.clear()
+      self._pending_writes += 1
+    if self._pending_writes > 0:
+      self.conn.commit()
+      self._pending_writes = 0
+
+  def Close(self):
+    """Commits pending writes and closes the database."""
+    if self.conn is None:
+      return
+    if self._stats:
+      now = time.time()
+      self.conn.execute('DELETE FROM last_run_stats')
+      self.conn.executemany(
+        'INSERT INTO last_run_stats (namespace, hits, misses, timestamp) '
+        'VALUES (?, ?, ?, ?)',
+        [(namespace, hits, misses, now)
+         for namespace, (hits, misses) in self._stats.items()])
+      self._pending_writes += 1
+    self.Flush()
+    self.conn.close()
+    self.conn = None
+
+  def _GetFileHashes(self):
+    if self._file_hashes is None:
+      self._file_hashes = dict(
+        (row[0], row[1:]) for row in
+        self.conn.execute('SELECT path, size, mtime, digest FROM file_hashes'))
+    return self._file_hashes
+
+  def _Lookup(self, namespace, keys):
+    values = {}
+    for i in xrange(0, len(keys), _MAX_QUERY_PARAMS):
+      chunk = keys[i:i+_MAX_QUERY_PARAMS]
+      rows = self.conn.execute(
+        'SELECT key, value FROM entries WHERE namespace = ? AND key IN (%s)' %
+        ','.join(['?'] * len(chunk)),
+        [namespace] + chunk)
+      for key, value in rows:
+        values[key] = json.loads(value)
+    missing_keys = [key for key in keys if key not in values]
+    if self.remote and missing_keys:
+      fetched = self.remote.GetEntries(namespace, missing_keys)
+      for key, value in fetched.items():
+        self._PutLocal(namespace, key, value)
+      values.update(fetched)
+    return values
+
+  def _PutLocal(self, namespace, key, value):
+    self.conn.execute(
+      'INSERT OR REPLACE INTO entries (namespace, key, value, last_used) '
+      'VALUES (?, ?, ?, ?)',
+      (namespace, key, json.dumps(value), time.time()))
+    self._MaybeFlush()
+
+  def _CountLookup(self, namespace, keys, found_keys):
+    hits, misses = self._stats.get(namespace, (0, 0))
+    self._stats[namespace] = (hits + len(found_keys),
+                              misses + len(keys) - len(found_keys))
+    self._used_keys.update((namespace, key) for key in found_keys)
+
+  def _MaybeFlush(self):
+    self._pending_writes += 1
+    if self._pending_writes >= _AUTO_FLUSH_WRITES:
+      self.Flush()
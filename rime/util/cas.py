@@ -0,0 +1,173 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import os
+import os.path
+import tempfile
+
+from rime.util import files
+
+
+class ContentStore(object):
+  """Content-addressed blob store.
+
+  Each blob is a plain file named after the SHA-1 digest of its content.
+  Blobs are never modified once written.
+
+  Blobs are materialized as hardlinks where possible, so the same content
+  stored under many paths takes the space only once. Such files must be
+  unshared by files.Unshare() before being written in place.
+
+  If remote is given, missing blobs are downloaded from the remote cache,
+  and new blobs are uploaded to it.
+
+  If cache_store is given, the last use time of blobs is recorded in it.
+  Modification times of blobs are left untouched, since they are shared
+  with the files linked to them.
+  """
+
+  def __init__(self, root, remote=None, cache_store=None):
+    self.root = root
+    self.remote = remote
+    self.cache_store = cache_store
+
+  def GetPath(self, digest):
+    """Returns the path where the blob is stored."""
+    return os.path.join(self.root, digest[:2], digest[2:])
+
+  def Has(self, digest):
+    return os.path.isfile(self.GetPath(digest))
+
+  def Put(self, src, digest=None, link=False, upload=True):
+    """Stores a copy of the file and returns its digest.
+
+    If digest is given, it is trusted as the hash of the file content.
+    If link is True, the file itself is hardlinked into the store if possible
+    rather than copied, and it must not be written in place afterwards.
+    If upload is False, the blob is not uploaded to the remote cache.
+    """
+    if digest is None:
+      digest = files.GetFileHash(src)
+    path = self.GetPath(digest)
+    if not os.path.isfile(path) and link:
+      files.MakeDir(os.path.dirname(path))
+      try:
+        os.link(src, path)
+        files.InvalidatePath(path)
+      except (OSError, AttributeError):
+        pass
+    if not os.path.isfile(path):
+      files.MakeDir(os.path.dirname(path))
+      fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp')
+      os.close(fd)
+      try:
+        files.CopyFile(src, tmp)
+        os.rename(tmp, path)
+        files.InvalidatePath(path)
+      except:
+        if os.path.exists(tmp):
+          os.remove(tmp)
+        raise
+    self._MarkUsed(digest)
+    if self.remote and upload:
+      self.remote.PutBlob(digest, path)
+    return digest
+
+  def Get(self, digest, dst):
+    """Materializes the blob at dst.
+
+    Returns False if the blob does not exist.
+    """
+    path = self.GetPath(digest)
+    if not os.path.isfile(path) and not self.Prefetch([digest]):
+      return False
+    files.LinkFile(path, dst)
+    self._MarkUsed(digest)
+    return True
+
+  def Dedup(self, path, digest=None, upload=True):
+    """Stores the file and replaces it with a link to the blob.
+
+    Files with the same content deduplicated this way share a single copy.
+    Returns the digest of the file.
+    """
+    digest = self.Put(path, digest=digest, link=True, upload=upload)
+    blob = self.GetPath(digest)
+    try:
+      st, blob_st = os.stat(path), os.stat(blob)
+    except OSError:
+      return digest
+    # Copying the blob back would gain nothing if it cannot be linked.
+    if st.st_ino != blob_st.st_ino and st.st_dev == blob_st.st_dev:
+      files.LinkFile(blob, path)
+    return digest
+
+  def Prefetch(self, digests):
+    """Downloads missing blobs from the remote cache concurrently.
+
+    Returns True if all blobs are available locally.
+    """
+    missing = [digest for digest in set(digests) if not self.Has(digest)]
+    if missing and self.remote:
+      missing = set(missing) - set(
+        self.remote.FetchBlobs(missing, self.GetPath))
+    return not missing
+
+  def Remove(self, digest):
+    """Removes the blob if it exists."""
+    path = self.GetPath(digest)
+    if os.path.isfile(path):
+      os.remove(path)
+    if self.cache_store:
+      self.cache_store.DeleteBlobs([digest])
+
+  def Verify(self, digest):
+    """Returns True if the blob content matches its digest."""
+    return files.GetFileHash(self.GetPath(digest)) == digest
+
+  def ListBlobs(self):
+    """Yields (digest, path, size, last_used) of all blobs.
+
+    Blobs not recorded as used are regarded as last used when written.
+    """
+    if not os.path.isdir(self.root):
+      return
+    last_used = {}
+    if self.cache_store:
+      last_used = self.cache_store.GetBlobsLastUsed()
+    for prefix in sorted(files.ListDir(self.root)):
+      subdir = os.path.join(self.root, prefix)
+      if len(prefix) != 2 or not os.path.isdir(subdir):
+        continue
+      for name in sorted(files.ListDir(subdir)):
+        path = os.path.join(subdir, name)
+        try:
+          st = os.stat(path)
+        except OSError:
+          continue
+        digest = prefix + name
+        yield (digest, path, st.st_size, last_used.get(digest, st.st_mtime))
+
+  def _MarkUsed(self, digest):
+    if self.cache_store:
+      self.cache_store.MarkBlobsUsed([digest])
@@ -0,0 +1,237 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+"""Transparent handling of compressed test data.
+
+Test inputs and outputs can be stored compressed by gzip (.gz) or Zstandard
+(.zst). They are streamed through external (de)compressors running as
+separate processes, so the data is never expanded on disk and the work is
+not accounted to the programs reading or writing them.
+"""
+
+import fcntl
+import os
+import os.path
+import shutil
+import signal
+import subprocess
+import tempfile
+
+from rime.util import files
+
+
+_DECOMPRESS_ARGS = {
+  '.gz': ['gzip', '-dc'],
+  '.zst': ['zstd', '-dcq'],
+  }
+
+_COMPRESS_ARGS = {
+  '.gz': ['gzip', '-c'],
+  '.zst': ['zstd', '-cq'],
+  }
+
+# Extensions of supported compressed files.
+EXTENSIONS = sorted(_DECOMPRESS_ARGS)
+
+
+def GetExtension(path):
+  """Returns the compression extension of the path, or '' if plain."""
+  ext = os.path.splitext(path)[1]
+  return ext if ext in _DECOMPRESS_ARGS else ''
+
+
+def IsCompressed(path):
+  return bool(GetExtension(path))
+
+
+def StripExtension(path):
+  """Returns the path without its compression extension."""
+  return path[:len(path) - len(GetExtension(path))]
+
+
+class _Stream(object):
+  """Pipe from a decompressor or to a compressor.
+
+  It can be passed as stdin or stdout of subprocesses like a file. Seeking to
+  the beginning restarts the stream, e.g. to run a program again.
+  """
+
+  def __init__(self, path, reading):
+    self.name = path
+    self.reading = reading
+    self.proc = None
+    self.pipe = None
+    self._Start()
+
+  def _Start(self):
+    ext = GetExtension(self.name)
+    if self.reading:
+      self.proc = subprocess.Popen(
+        _DECOMPRESS_ARGS[ext] + [self.name], stdin=files.OpenNull(),
+        stdout=subprocess.PIPE, stderr=files.OpenNull(), close_fds=True)
+      self.pipe = self.proc.stdout
+    else:
+      with open(self.name, 'wb') as outfile:
+        self.proc = subprocess.Popen(
+          _COMPRESS_ARGS[ext], stdin=subprocess.PIPE, stdout=outfile,
+          close_fds=True)
+      self.pipe = self.proc.stdin
+    # Other programs started meanwhile must not hold the pipe open.
+    flags = fcntl.fcntl(self.pipe.fileno(), fcntl.F_GETFD)
+    fcntl.fcntl(self.pipe.fileno(), fcntl.F_SETFD, flags | fcntl.FD_CLOEXEC)
+
+  def fileno(self):
+    return self.pipe.fileno()
+
+  def read(self, size=-1):
+    return self.pipe.read(size)
+
+  def seek(self, offset, whence=0):
+    if offset != 0 or whence != 0:
+      raise IOError('compressed streams can only be rewound')
+    self.close()
+    self._Start()
+
+  def truncate(self, size=None):
+    pass
+
+  def close(self):
+    """Closes the pipe and waits for the (de)compressor to finish."""
+    if self.proc is None:
+      return
+    self.pipe.close()
+    if self.reading:
+      # The reader may have stopped early; do not wait for the rest.
+      try:
+        os.kill(self.proc.pid, signal.SIGTERM)
+      except OSError:
+        pass
+    code = self.proc.wait()
+    self.proc = None
+    if not self.reading:
+      files.InvalidatePath(self.name)
+      if code != 0:
+        raise IOError('failed to compress %s' % self.name)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+
+def OpenInput(path):
+  """Opens a file to read as plain data."""
+  if IsCompressed(path):
+    return _Stream(path, reading=True)
+  return open(path, 'r')
+
+
+def OpenOutput(path):
+  """Opens a file to write plain data, compressed by its extension."""
+  if IsCompressed(path):
+    return _Stream(path, reading=False)
+  return open(path, 'w')
+
+
+def ReadFile(path):
+  """Reads the whole content of a file as plain data."""
+  with OpenInput(path) as f:
+    return f.read()
+
+
+def ExpandFile(src, dst):
+  """Makes a plain file at dst with the content of src.
+
+  The file is linked rather than copied if src is not compressed.
+  """
+  if not IsCompressed(src):
+    files.LinkFile(src, dst)
+    return
+  files.Unshare(dst)
+  with open(dst, 'wb') as outfile:
+    code = subprocess.call(
+      _DECOMPRESS_ARGS[GetExtension(src)] + [src], stdin=files.OpenNull(),
+      stdout=outfile, close_fds=True)
+  files.InvalidatePath(dst)
+  if code != 0:
+    raise IOError('failed to decompress %s' % src)
+
+
+def CompressFile(src, dst):
+  """Makes a compressed file at dst with the content of a plain file src."""
+  files.Unshare(dst)
+  with open(src, 'rb') as infile:
+    with open(dst, 'wb') as outfile:
+      code = subprocess.call(
+        _COMPRESS_ARGS[GetExtension(dst)], stdin=infile, stdout=outfile,
+        close_fds=True)
+  files.InvalidatePath(dst)
+  if code != 0:
+    raise IOError('failed to compress %s' % dst)
+
+
+class NamedPipes(object):
+  """Makes compressed files readable by path without expanding them on disk.
+
+  Paths of compressed files are replaced with named pipes fed by
+  decompressors while in the with block. Each pipe can be read only once.
+  """
+
+  def __init__(self, paths):
+    self.paths = list(paths)
+    self.tmpdir = None
+    self.procs = []
+
+  def __enter__(self):
+    result = []
+    for i, path in enumerate(self.paths):
+      if not IsCompressed(path):
+        result.append(path)
+        continue
+      if self.tmpdir is None:
+        self.tmpdir = tempfile.mkdtemp(prefix='rime-pipe')
+      fifo = os.path.join(
+        self.tmpdir, '%d-%s' % (i, os.path.basename(StripExtension(path))))
+      os.mkfifo(fifo)
+      # The shell blocks on opening the pipe until a reader comes.
+      self.procs.append(subprocess.Popen(
+        ['sh', '-c', 'exec "$@" > "$0"', fifo] +
+        _DECOMPRESS_ARGS[GetExtension(path)] + [path],
+        stdin=files.OpenNull(), stderr=files.OpenNull(), close_fds=True))
+      result.append(fifo)
+    return result
+
+  def __exit__(self, *exc_info):
+    # Decompressors whose pipes were not read to the end are still waiting.
+    for proc in self.procs:
+      if proc.poll() is None:
+        try:
+          os.kill(proc.pid, signal.SIGKILL)
+        except OSError:
+          pass
+      proc.wait()
+    self.procs = []
+    if self.tmpdir is not None:
+      shutil.rmtree(self.tmpdir, ignore_errors=True)
+      self.tmpdir = None
@@ -0,0 +1,234 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+"""Client and server of the Rime daemon protocol.
+
+A client sends a request as a line of JSON over a Unix socket. The server
+replies with lines of JSON: {"out": <text>} for each piece of console
+output, and finally {"exit": <status>}.
+
+This module is imported by the command line client before anything else,
+so it should stay cheap to import.
+"""
+
+import errno
+import hashlib
+import json
+import os
+import os.path
+import socket
+import tempfile
+
+
+def GetSocketPath(project_dir):
+  """Returns the socket path of the daemon serving the project."""
+  # Unix socket paths are limited to about 100 bytes, so they are not
+  # placed under the project.
+  digest = hashlib.sha1(os.path.abspath(project_dir)).hexdigest()[:16]
+  return os.path.join(tempfile.gettempdir(),
+                      'rime-%d-%s.sock' % (os.getuid(), digest))
+
+
+def FindSocket(cwd):
+  """Returns the socket path of a daemon serving cwd, or None."""
+  path = os.path.abspath(cwd)
+  while True:
+    socket_path = GetSocketPath(path)
+    if os.path.exists(socket_path):
+      return socket_path
+    head = os.path.dirname(path)
+    if head == path:
+      return None
+    path = head
+
+
+def SendRequest(socket_path, request, out):
+  """Sends a request to the daemon and copies its output to out.
+
+  Returns the exit status, or None if the daemon is not reachable.
+  """
+  sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  try:
+    try:
+      sock.connect(socket_path)
+    except socket.error:
+      return None
+    received = False
+    try:
+      sock.sendall(json.dumps(request) + '\n')
+      reader = sock.makefile('rb', 0)
+      # Iterating over the file would buffer output ahead.
+      for line in iter(reader.readline, ''):
+        received = True
+        message = json.loads(line)
+        if 'out' in message:
+          out.write(message['out'].encode('utf-8'))
+          out.flush()
+        elif 'exit' in message:
+          return message['exit']
+    except socket.error:
+      pass
+    if not received:
+      # The daemon is shutting down; run the command locally.
+      return None
+    # The daemon died while serving the request.
+    return 1
+  finally:
+    sock.close()
+
+
+def Forward(argv, cwd, out):
+  """Runs a command in the daemon if one is serving cwd.
+
+  Returns the exit status, or None if the command should be run locally.
+  """
+  if os.environ.get('RIME_NO_DAEMON'):
+    return None
+  # The daemon itself is controlled locally.
+  if [arg for arg in argv[1:] if not arg.startswith('-')][:1] == ['daemon']:
+    return None
+  socket_path = FindSocket(cwd)
+  if socket_path is None:
+    return None
+  isatty = out.isatty()
+  return SendRequest(socket_path,
+                     {'argv': list(argv), 'cwd': cwd, 'isatty': isatty},
+                     out)
+
+
+class ResponseWriter(object):
+  """File-like object which sends console output to a client."""
+
+  def __init__(self, conn, isatty=False):
+    self.conn = conn
+    self._isatty = isatty
+    self.closed = False
+
+  def write(self, data):
+    if isinstance(data, str):
+      data = data.decode('utf-8', 'replace')
+    self._Send({'out': data})
+
+  def flush(self):
+    pass
+
+  def isatty(self):
+    return self._isatty
+
+  def SendExit(self, status):
+    self._Send({'exit': status})
+
+  def _Send(self, message):
+    self.conn.sendall(json.dumps(message) + '\n')
+
+
+class DaemonServer(object):
+  """Serves requests one by one on a Unix socket.
+
+  handler is called with (request, writer) for each request, and returns
+  the exit status sent to the client.
+  """
+
+  def __init__(self, socket_path, handler):
+    self.socket_path = socket_path
+    self.handler = handler
+    self.running = False
+    self.sock = None
+
+  def Bind(self):
+    """Creates the socket. Raises socket.error if a daemon is running."""
+    if self.IsAlive():
+      raise socket.error(errno.EADDRINUSE, 'daemon is already running')
+    if os.path.exists(self.socket_path):
+      os.remove(self.socket_path)
+    self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0077)
+    try:
+      self.sock.bind(self.socket_path)
+    finally:
+      os.umask(old_umask)
+    self.sock.listen(16)
+    self.running = True
+
+  def Serve(self):
+    """Serves until Stop() is called."""
+    try:
+      while self.running:
+        try:
+          conn, _ = self.sock.accept()
+        except socket.error:
+          if not self.running:
+            break
+          raise
+        try:
+          self._HandleConnection(conn)
+        finally:
+          conn.close()
+    finally:
+      self.Close()
+
+  def Stop(self):
+    """Stops serving after the current request."""
+    self.running = False
+    if self.sock is not None:
+      # Wake up accept() waiting in another thread.
+      try:
+        self.sock.shutdown(socket.SHUT_RDWR)
+      except socket.error:
+        pass
+
+  def Close(self):
+    if self.sock is not None:
+      self.sock.close()
+      self.sock = None
+      try:
+        os.remove(self.socket_path)
+      except OSError:
+        pass
+
+  def _HandleConnection(self, conn):
+    reader = conn.makefile('rb')
+    try:
+      request = json.loads(reader.readline())
+    except (ValueError, socket.error):
+      return
+    writer = ResponseWriter(conn, isatty=bool(request.get('isatty')))
+    try:
+      status = self.handler(request, writer)
+      writer.SendExit(status)
+    except socket.error:
+      # The client has gone away.
+      pass
+
+  def IsAlive(self):
+    """Returns True if a daemon is serving on the socket."""
+    if not os.path.exists(self.socket_path):
+      return False
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+      sock.connect(self.socket_path)
+      return True
+    except socket.error:
+      return False
+    finally:
+      sock.close()
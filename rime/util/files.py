@@ -24,6 +24,7 @@
 
 from __future__ import with_statement
 import datetime
+import hashlib
 import shutil
 import os
 import os.path
@@ -31,19 +32,136 @@ import pickle
 import platform
 import subprocess
 
+try:
+  from os import scandir as _scandir
+except ImportError:
+  try:
+    from scandir import scandir as _scandir
+  except ImportError:
+    _scandir = None
+
 
 _devnull = open(os.devnull, 'r+')
 
+_HASH_CHUNK_SIZE = 1 << 20
+
+# Snapshot of directory listings: absolute path -> list of _Entry.
+# Listings are cached for the rest of the run once read, and dropped by
+# InvalidatePath() when Rime writes under them.
+_snapshot = {}
+
+
+class _Entry(object):
+  """A cached directory entry."""
+
+  __slots__ = ('name', 'path', 'is_dir', '_mtime')
+
+  def __init__(self, name, path, is_dir, mtime=None):
+    self.name = name
+    self.path = path
+    self.is_dir = is_dir
+    self._mtime = mtime
+
+  @property
+  def mtime(self):
+    if self._mtime is None:
+      try:
+        self._mtime = os.path.getmtime(self.path)
+      except OSError:
+        self._mtime = 0
+    return self._mtime
+
+
+def _ScanDir(dir):
+  """Returns cached entries of a directory, excluding hidden ones."""
+  dir = os.path.abspath(dir)
+  entries = _snapshot.get(dir)
+  if entries is None:
+    entries = []
+    try:
+      if _scandir is not None:
+        for entry in _scandir(dir):
+          if not entry.name.startswith('.'):
+            entries.append(_Entry(entry.name, entry.path, entry.is_dir()))
+      else:
+        for name in os.listdir(dir):
+          if not name.startswith('.'):
+            path = os.path.join(dir, name)
+            entries.append(_Entry(name, path, os.path.isdir(path)))
+    except OSError:
+      pass
+    _snapshot[dir] = entries
+  return entries
+
+def InvalidatePath(path=None):
+  """Drops cached listings affected by a write to the path.
+
+  Listings of the path, everything under it and its parent directory are
+  dropped. If path is None, all cached listings are dropped.
+  """
+  if path is None:
+    _snapshot.clear()
+    return
+  path = os.path.abspath(path)
+  prefix = os.path.join(path, '')
+  _snapshot.pop(path, None)
+  _snapshot.pop(os.path.dirname(path), None)
+  for dir in [dir for dir in _snapshot.keys() if dir.startswith(prefix)]:
+    _snapshot.pop(dir, None)
+
 
 def CopyFile(src, dst):
+  if os.path.isdir(dst):
+    dst = os.path.join(dst, os.path.basename(src))
+  Unshare(dst)
   shutil.copy(src, dst)
+  InvalidatePath(dst)
+
+def LinkFile(src, dst):
+  """Makes a file at dst with the same content as src.
+
+  A hardlink is made if possible, and otherwise the file is copied. dst must
+  be treated as read-only since it may share its content with src.
+  """
+  if os.path.isdir(dst):
+    dst = os.path.join(dst, os.path.basename(src))
+  if os.path.lexists(dst):
+    os.remove(dst)
+  try:
+    os.link(src, dst)
+  except (OSError, AttributeError):
+    shutil.copy2(src, dst)
+  InvalidatePath(dst)
+
+def MoveFile(src, dst):
+  """Moves a file, possibly across file systems."""
+  if os.path.lexists(dst):
+    os.remove(dst)
+  shutil.move(src, dst)
+  InvalidatePath(src)
+  InvalidatePath(dst)
+
+def Unshare(path):
+  """Removes the file if it shares its content with other files.
+
+  Files made by LinkFile must not be written in place, since the writes would
+  modify the source as well. Call this before opening such a file to write.
+  """
+  try:
+    st = os.lstat(path)
+  except OSError:
+    return
+  if os.path.islink(path) or st.st_nlink > 1:
+    os.remove(path)
 
 def MakeDir(dir):
   if not os.path.isdir(dir):
     os.makedirs(dir)
+    InvalidatePath(dir)
 
 def CopyTree(src, dst):
   MakeDir(dst)
+  InvalidatePath(dst)
   files = ListDir(src, True)
   for f in files:
     srcpath = os.path.join(src, f)
@@ -55,7 +173,10 @@ def CopyTree(src, dst):
 
 def RemoveTree(dir):
   if os.path.exists(dir):
-    shutil.rmtree(dir)
+    try:
+      shutil.rmtree(dir)
+    finally:
+      InvalidatePath(dir)
 
 def GetModified(file):
   try:
@@ -63,31 +184,64 @@ def GetModified(file):
   except:
     return datetime.datetime.min
 
+def GetFileHash(file):
+  """Returns the hex SHA-1 digest of the file content.
+
+  The file is read in chunks so that huge test data do not have to fit in
+  memory.
+  """
+  sha1 = hashlib.sha1()
+  with open(file, 'rb') as f:
+    while True:
+      chunk = f.read(_HASH_CHUNK_SIZE)
+      if not chunk:
+        break
+      sha1.update(chunk)
+  return sha1.hexdigest()
+
+def GetDataHash(*args):
+  """Returns the hex SHA-1 digest of the given strings."""
+  sha1 = hashlib.sha1()
+  for arg in args:
+    arg = str(arg)
+    sha1.update('%d:%s' % (len(arg), arg))
+  return sha1.hexdigest()
+
 def GetLastModifiedUnder(dir):
-  return max([GetModified(os.path.join(dir, name))
-              for name in (ListDir(dir, True) + [dir])])
+  mtime = _GetMaxModifiedUnder(dir)
+  try:
+    mtime = max(mtime, os.path.getmtime(dir))
+  except OSError:
+    pass
+  if mtime is None:
+    return datetime.datetime.min
+  return datetime.datetime.fromtimestamp(mtime)
+
+def _GetMaxModifiedUnder(dir):
+  mtime = None
+  for entry in _ScanDir(dir):
+    mtime = max(mtime, entry.mtime)
+    if entry.is_dir:
+      mtime = max(mtime, _GetMaxModifiedUnder(entry.path))
+  return mtime
 
 def CreateEmptyFile(file):
   open(file, 'w').close()
+  InvalidatePath(file)
 
 def ListDir(dir, recursive=False):
   files = []
-  try:
-    files = filter(lambda x: not x.startswith('.'),
-                   os.listdir(dir))
-    if recursive:
-      for subfile in files[:]:
-        subdir = os.path.join(dir, subfile)
-        if os.path.isdir(subdir):
-          files += [os.path.join(subfile, s)
-                    for s in ListDir(subdir, True)]
-  except:
-    pass
+  for entry in _ScanDir(dir):
+    files.append(entry.name)
+    if recursive and entry.is_dir:
+      files += [os.path.join(entry.name, s)
+                for s in ListDir(entry.path, True)]
   return files
 
 def PickleSave(obj, file):
   with open(file, 'w') as f:
     pickle.dump(obj, f)
+  InvalidatePath(file)
 
 def PickleLoad(file):
   with open(file, 'r') as f:
@@ -129,11 +283,14 @@ def ReadFile(name):
 
 def WriteFile(content, name):
   try:
+    Unshare(name)
     with open(name, 'w') as f:
       f.write(content)
     return True
   except:
     return False
+  finally:
+    InvalidatePath(name)
 
 def AppendFile(content, name):
   try:
@@ -142,3 +299,5 @@ def AppendFile(content, name):
       return True
   except:
     return False
+  finally:
+    InvalidatePath(name)
@@ -0,0 +1,95 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+"""Finds files included by C/C++ sources."""
+
+import os
+import os.path
+import re
+
+# Extensions of files scanned for #include directives.
+SOURCE_EXTENSIONS = frozenset(
+  ['c', 'cc', 'cpp', 'cxx', 'h', 'hh', 'hpp', 'hxx', 'inl', 'ipp', 'tcc'])
+
+_INCLUDE_RE = re.compile(r'^[ \t]*#[ \t]*include[ \t]*([<"])([^>"\n]+)[>"]',
+                         re.MULTILINE)
+
+# Map of path -> ((size, mtime), includes).
+_scan_cache = {}
+
+
+def IsSource(path):
+  return os.path.splitext(path)[1][1:].lower() in SOURCE_EXTENSIONS
+
+
+def ScanIncludes(path):
+  """Returns a list of (quoted, name) of #include directives in a file.
+
+  quoted is True for #include "name", and False for #include <name>.
+  Results are remembered while the file is unchanged.
+  """
+  try:
+    st = os.stat(path)
+  except OSError:
+    return []
+  stat = (st.st_size, st.st_mtime)
+  cached = _scan_cache.get(path)
+  if cached and cached[0] == stat:
+    return cached[1]
+  try:
+    with open(path) as f:
+      content = f.read()
+  except IOError:
+    return []
+  includes = [(quote == '"', name.strip())
+              for quote, name in _INCLUDE_RE.findall(content)]
+  _scan_cache[path] = (stat, includes)
+  return includes
+
+
+def GetIncludeClosure(paths, search_dirs):
+  """Returns files included from the files directly or indirectly.
+
+  #include "name" is looked up in the directory of the including file and
+  then in search_dirs, and #include <name> only in search_dirs. Names not
+  found there, e.g. system headers, are ignored. The given files are not
+  part of the result unless included.
+  """
+  found = set()
+  pending = [path for path in paths if IsSource(path)]
+  visited = set(pending)
+  while pending:
+    path = pending.pop()
+    for quoted, name in ScanIncludes(path):
+      dirs = list(search_dirs)
+      if quoted:
+        dirs.insert(0, os.path.dirname(path))
+      for dir in dirs:
+        included = os.path.normpath(os.path.join(dir, name))
+        if os.path.isfile(included):
+          found.add(included)
+          if included not in visited:
+            visited.add(included)
+            pending.append(included)
+          break
+  return sorted(found)
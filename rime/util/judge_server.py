@@ -0,0 +1,276 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+"""Job queue and HTTP front end of the local judge service.
+
+Jobs are submitted as JSON objects and processed in batches by a runner,
+which provides two methods:
+
+  Validate(request): raises ValueError if the request is malformed.
+  RunBatch(jobs): processes jobs and sets their results.
+
+The HTTP interface is:
+
+  POST /submit        submits a job; the body is the request in JSON.
+                      Add ?wait=1 to wait for the result.
+  GET  /jobs/<id>     shows the state and the result of a job.
+  GET  /stats         shows the queue depth and throughput.
+"""
+
+import BaseHTTPServer
+import Queue
+import SocketServer
+import collections
+import itertools
+import json
+import threading
+import time
+import traceback
+import urlparse
+
+# Jobs finished within this many seconds count for the recent throughput.
+_THROUGHPUT_WINDOW = 60.0
+
+# Finished jobs kept to answer queries.
+_MAX_FINISHED_JOBS = 1000
+
+# Maximum size of a request body.
+_MAX_REQUEST_SIZE = 16 << 20
+
+
+class Job(object):
+  """A submitted job."""
+
+  QUEUED = 'queued'
+  RUNNING = 'running'
+  DONE = 'done'
+
+  def __init__(self, id, request):
+    self.id = id
+    self.request = request
+    self.state = Job.QUEUED
+    self.result = None
+    self.submit_time = time.time()
+    self.start_time = None
+    self.finish_time = None
+    self.done = threading.Event()
+
+  def ToDict(self):
+    """Returns a JSON-serializable summary of this job."""
+    return {
+      'id': self.id,
+      'state': self.state,
+      'result': self.result,
+      'queued_time': ((self.start_time or time.time()) - self.submit_time),
+      'run_time': (self.finish_time - self.start_time
+                   if self.finish_time else None),
+      }
+
+
+class JobQueue(object):
+  """Queues jobs and runs them in batches of bounded size."""
+
+  def __init__(self, runner, max_batch):
+    self.runner = runner
+    self.max_batch = max(1, max_batch)
+    self.running = False
+    self._queue = Queue.Queue()
+    self._lock = threading.Lock()
+    self._ids = itertools.count(1)
+    self._jobs = collections.OrderedDict()
+    self._running_jobs = 0
+    self._finish_times = collections.deque()
+    self._submitted = 0
+    self._finished = 0
+    self._total_run_time = 0.0
+    self._start_time = time.time()
+
+  def Submit(self, request):
+    """Queues a request and returns its job.
+
+    Raises:
+      ValueError: the request is malformed.
+    """
+    self.runner.Validate(request)
+    with self._lock:
+      job = Job(str(next(self._ids)), request)
+      self._jobs[job.id] = job
+      self._submitted += 1
+    self._queue.put(job)
+    return job
+
+  def Get(self, job_id):
+    """Returns the job of the ID, or None if unknown."""
+    with self._lock:
+      return self._jobs.get(job_id)
+
+  def Serve(self):
+    """Runs queued jobs until Stop() is called."""
+    self.running = True
+    while self.running:
+      try:
+        job = self._queue.get(timeout=0.5)
+      except Queue.Empty:
+        continue
+      if job is None:
+        break
+      jobs = [job]
+      while len(jobs) < self.max_batch:
+        try:
+          job = self._queue.get_nowait()
+        except Queue.Empty:
+          break
+        if job is None:
+          self.running = False
+          break
+        jobs.append(job)
+      self._RunBatch(jobs)
+
+  def Stop(self):
+    self.running = False
+    self._queue.put(None)
+
+  def GetStats(self):
+    """Returns a dictionary of the queue statistics."""
+    now = time.time()
+    with self._lock:
+      while (self._finish_times and
+             self._finish_times[0] < now - _THROUGHPUT_WINDOW):
+        self._finish_times.popleft()
+      uptime = now - self._start_time
+      stats = {
+        'queued': self._queue.qsize(),
+        'running': self._running_jobs,
+        'submitted': self._submitted,
+        'finished': self._finished,
+        'uptime': uptime,
+        'throughput': self._finished / uptime if uptime > 0 else 0.0,
+        'recent_throughput': (len(self._finish_times) /
+                              min(uptime, _THROUGHPUT_WINDOW)
+                              if uptime > 0 else 0.0),
+        'average_run_time': (self._total_run_time / self._finished
+                             if self._finished else None),
+        }
+    if hasattr(self.runner, 'GetStats'):
+      stats.update(self.runner.GetStats())
+    return stats
+
+  def _RunBatch(self, jobs):
+    now = time.time()
+    with self._lock:
+      for job in jobs:
+        job.state = Job.RUNNING
+        job.start_time = now
+      self._running_jobs = len(jobs)
+    try:
+      self.runner.RunBatch(jobs)
+    except Exception:
+      error = traceback.format_exc()
+      for job in jobs:
+        if job.result is None:
+          job.result = {'error': error}
+    now = time.time()
+    with self._lock:
+      self._running_jobs = 0
+      for job in jobs:
+        job.state = Job.DONE
+        job.finish_time = now
+        self._finished += 1
+        self._total_run_time += now - job.start_time
+        self._finish_times.append(now)
+      self._ForgetOldJobs()
+    for job in jobs:
+      job.done.set()
+
+  def _ForgetOldJobs(self):
+    finished = [job_id for job_id, job in self._jobs.items()
+                if job.state == Job.DONE]
+    for job_id in finished[:max(0, len(finished) - _MAX_FINISHED_JOBS)]:
+      del self._jobs[job_id]
+
+
+class JudgeServerHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+  """Request handler of the judge service."""
+
+  def do_GET(self):
+    url = urlparse.urlparse(self.path)
+    parts = url.path.split('/')[1:]
+    if parts == ['stats']:
+      self._SendJson(200, self.server.queue.GetStats())
+    elif len(parts) == 2 and parts[0] == 'jobs':
+      job = self.server.queue.Get(parts[1])
+      if job is None:
+        self._SendJson(404, {'error': 'Unknown job: %s' % parts[1]})
+      else:
+        self._SendJson(200, job.ToDict())
+    else:
+      self._SendJson(404, {'error': 'Not found'})
+
+  def do_POST(self):
+    url = urlparse.urlparse(self.path)
+    if url.path != '/submit':
+      self._SendJson(404, {'error': 'Not found'})
+      return
+    try:
+      length = int(self.headers.get('Content-Length', ''))
+    except ValueError:
+      self._SendJson(411, {'error': 'Content-Length required'})
+      return
+    if length > _MAX_REQUEST_SIZE:
+      self._SendJson(413, {'error': 'Request too large'})
+      return
+    try:
+      request = json.loads(self.rfile.read(length))
+      if not isinstance(request, dict):
+        raise ValueError('Request must be a JSON object')
+      job = self.server.queue.Submit(request)
+    except ValueError as e:
+      self._SendJson(400, {'error': str(e)})
+      return
+    query = urlparse.parse_qs(url.query)
+    if query.get('wait', ['0'])[0] not in ('', '0'):
+      job.done.wait()
+    self._SendJson(200, job.ToDict())
+
+  def log_message(self, format, *args):
+    if self.server.verbose:
+      BaseHTTPServer.BaseHTTPRequestHandler.log_message(self, format, *args)
+
+  def _SendJson(self, code, obj):
+    body = json.dumps(obj)
+    self.send_response(code)
+    self.send_header('Content-Type', 'application/json')
+    self.send_header('Content-Length', str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+
+class JudgeServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+  """HTTP server accepting jobs into a queue."""
+
+  daemon_threads = True
+
+  def __init__(self, address, queue, verbose=False):
+    BaseHTTPServer.HTTPServer.__init__(self, address, JudgeServerHandler)
+    self.queue = queue
+    self.verbose = verbose
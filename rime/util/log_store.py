@@ -0,0 +1,156 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import json
+import os
+
+from rime.util import files
+
+
+# Rewrite the store when superseded records take more than this many bytes
+# and more than the live records.
+_COMPACT_MIN_GARBAGE = 1 << 20
+
+
+class LogStore(object):
+  """Append-only store of small logs in a single file.
+
+  Logs, e.g. messages of judges and validators, are stored as records of a
+  key and contents, and the last record of a key wins. This saves creating
+  and removing many tiny files for each run.
+
+  Each record is written with a single append, so records written by other
+  processes are picked up by the next access, and a partial record at the
+  end is ignored until completed.
+  """
+
+  def __init__(self, path):
+    self.path = path
+    self._index = {}
+    self._ino = None
+    self._end = 0
+    self._garbage = 0
+
+  def Put(self, key, data):
+    """Appends a record for the key."""
+    header = json.dumps([key, len(data)]) + '\n'
+    files.MakeDir(os.path.dirname(self.path))
+    fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0666)
+    try:
+      buf = header + data
+      while buf:
+        buf = buf[os.write(fd, buf):]
+    finally:
+      os.close(fd)
+    self._Refresh()
+
+  def Get(self, key, default=None):
+    """Returns the contents of the last record of the key."""
+    self._Refresh()
+    if key not in self._index:
+      return default
+    offset, size = self._index[key]
+    try:
+      with open(self.path, 'rb') as f:
+        f.seek(offset)
+        return f.read(size)
+    except IOError:
+      return default
+
+  def Keys(self):
+    """Returns a sorted list of keys stored."""
+    self._Refresh()
+    return sorted(self._index)
+
+  def Materialize(self, key, path):
+    """Writes the contents of the key to a file.
+
+    Returns False if the key is missing.
+    """
+    data = self.Get(key)
+    if data is None:
+      return False
+    files.WriteFile(data, path)
+    return True
+
+  def _Refresh(self):
+    try:
+      st = os.stat(self.path)
+    except OSError:
+      self._Reset(None)
+      return
+    if st.st_ino != self._ino or st.st_size < self._end:
+      # The store was removed or compacted, e.g. by cleaning.
+      self._Reset(st.st_ino)
+      self._Scan()
+      if (self._garbage > _COMPACT_MIN_GARBAGE and
+          self._garbage > self._end - self._garbage):
+        self._Compact()
+    elif st.st_size > self._end:
+      self._Scan()
+
+  def _Reset(self, ino):
+    self._index = {}
+    self._ino = ino
+    self._end = 0
+    self._garbage = 0
+
+  def _Scan(self):
+    with open(self.path, 'rb') as f:
+      size_limit = os.fstat(f.fileno()).st_size
+      f.seek(self._end)
+      while True:
+        header = f.readline()
+        if not header.endswith('\n'):
+          break
+        try:
+          key, size = json.loads(header)
+        except ValueError:
+          break
+        # Keys are file names given as byte strings.
+        key = key.encode('utf-8')
+        offset = f.tell()
+        if offset + size > size_limit:
+          break
+        f.seek(size, os.SEEK_CUR)
+        if key in self._index:
+          self._garbage += len(header) + self._index[key][1]
+        self._index[key] = (offset, size)
+        self._end = f.tell()
+
+  def _Compact(self):
+    tmp_path = '%s.%d' % (self.path, os.getpid())
+    index = {}
+    with open(self.path, 'rb') as src:
+      with open(tmp_path, 'wb') as dst:
+        for key in sorted(self._index):
+          offset, size = self._index[key]
+          src.seek(offset)
+          dst.write(json.dumps([key, size]) + '\n')
+          index[key] = (dst.tell(), size)
+          dst.write(src.read(size))
+    os.rename(tmp_path, self.path)
+    self._index = index
+    self._ino = os.stat(self.path).st_ino
+    self._end = os.path.getsize(self.path)
+    self._garbage = 0
@@ -0,0 +1,133 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import hashlib
+import json
+import os
+import time
+from multiprocessing import pool as mp_pool
+
+from rime.util import compression
+from rime.util import files
+
+
+# Bump this when the format changes, so that old manifests are ignored.
+VERSION = 2
+
+# Do not reuse entries of files modified within this many seconds, since
+# another write in the same timestamp granularity would go unnoticed.
+_RACY_MTIME_WINDOW = 2.0
+
+_CHUNK_SIZE = 1 << 20
+
+
+def ScanFile(path, previous=None):
+  """Returns an entry describing a file.
+
+  An entry is a dictionary of size, mtime, sha1, md5 and lines. Hashes are
+  of the file content as stored, and lines are counted after decompression.
+  If previous is an entry of the same size and mtime, it is returned as is.
+  """
+  st = os.stat(path)
+  if (previous and previous.get('size') == st.st_size and
+      previous.get('mtime') == st.st_mtime):
+    return previous
+  sha1 = hashlib.sha1()
+  md5 = hashlib.md5()
+  lines = 0
+  compressed = compression.IsCompressed(path)
+  with open(path, 'rb') as f:
+    while True:
+      chunk = f.read(_CHUNK_SIZE)
+      if not chunk:
+        break
+      sha1.update(chunk)
+      md5.update(chunk)
+      if not compressed:
+        lines += chunk.count('\n')
+  if compressed:
+    with compression.OpenInput(path) as f:
+      while True:
+        chunk = f.read(_CHUNK_SIZE)
+        if not chunk:
+          break
+        lines += chunk.count('\n')
+  stable = time.time() - st.st_mtime > _RACY_MTIME_WINDOW
+  return {
+    'size': st.st_size,
+    'mtime': st.st_mtime if stable else None,
+    'sha1': sha1.hexdigest(),
+    'md5': md5.hexdigest(),
+    'lines': lines,
+    }
+
+
+def HashContents(paths):
+  """Returns the md5 of the contents of files concatenated in order."""
+  md5 = hashlib.md5()
+  for path in paths:
+    with open(path, 'rb') as f:
+      while True:
+        chunk = f.read(_CHUNK_SIZE)
+        if not chunk:
+          break
+        md5.update(chunk)
+  return md5.hexdigest()
+
+
+def ScanFiles(paths, parallelism=1, previous=None):
+  """Scans files on a thread pool.
+
+  previous maps paths to entries of an earlier scan which may be reused.
+  Returns a dictionary of path -> entry.
+  """
+  previous = previous or {}
+  if not paths:
+    return {}
+  # Hashing releases the GIL, so threads read and hash files in parallel.
+  pool = mp_pool.ThreadPool(max(1, min(parallelism, len(paths))))
+  try:
+    entries = pool.map(lambda path: ScanFile(path, previous.get(path)), paths)
+  finally:
+    pool.close()
+    pool.join()
+  return dict(zip(paths, entries))
+
+
+def Load(path):
+  """Returns the manifest saved at path, or None if unavailable."""
+  content = files.ReadFile(path)
+  if content is None:
+    return None
+  try:
+    manifest = json.loads(content)
+  except ValueError:
+    return None
+  if not isinstance(manifest, dict) or manifest.get('version') != VERSION:
+    return None
+  return manifest
+
+
+def Save(manifest, path):
+  manifest = dict(manifest, version=VERSION)
+  files.WriteFile(json.dumps(manifest, indent=1, sort_keys=True), path)
@@ -0,0 +1,134 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import ctypes
+import ctypes.util
+import os
+
+
+# Upper bound of bytes prefetched ahead of reads.
+DEFAULT_BUDGET = 256 << 20
+
+_POSIX_FADV_WILLNEED = 3
+
+_libc = None
+
+
+class Prefetcher(object):
+  """Warms the page cache with files shortly before they are read.
+
+  Files are given in the order they will be read. Each time a file is about
+  to be read, the files following it are prefetched as long as the bytes
+  prefetched but not read yet are within the budget.
+  """
+
+  def __init__(self, paths, budget=None):
+    self.paths = list(paths)
+    self.budget = budget if budget is not None else GetDefaultBudget()
+    self._index = {}
+    for i, path in enumerate(self.paths):
+      self._index.setdefault(path, i)
+    self._sizes = {}
+    self._current = 0
+    self._next = 0
+
+  def Touch(self, path):
+    """Notifies that a file is about to be read.
+
+    Files are read in parallel, so notifications may come out of order; the
+    window follows the furthest file.
+    """
+    i = self._index.get(path)
+    if i is None or i < self._current:
+      return
+    self._current = i
+    self._next = max(self._next, i)
+    pending = sum(self._GetSize(j) for j in xrange(i, self._next))
+    while self._next < len(self.paths):
+      size = self._GetSize(self._next)
+      # The file to be read now is always prefetched.
+      if self._next > i and pending + size > self.budget:
+        break
+      Prefetch(self.paths[self._next])
+      pending += size
+      self._next += 1
+
+  def _GetSize(self, i):
+    if i not in self._sizes:
+      try:
+        self._sizes[i] = os.path.getsize(self.paths[i])
+      except OSError:
+        self._sizes[i] = 0
+    return self._sizes[i]
+
+
+def Prefetch(path):
+  """Starts reading a file into the page cache in background.
+
+  Returns False if it is not supported.
+  """
+  try:
+    fd = os.open(path, os.O_RDONLY)
+  except OSError:
+    return False
+  try:
+    return _Fadvise(fd, _POSIX_FADV_WILLNEED)
+  finally:
+    os.close(fd)
+
+
+def GetDefaultBudget():
+  """Returns the budget bounded by a quarter of available memory."""
+  try:
+    with open('/proc/meminfo') as f:
+      for line in f:
+        if line.startswith('MemAvailable:'):
+          return min(DEFAULT_BUDGET, int(line.split()[1]) * 1024 // 4)
+  except (IOError, ValueError, IndexError):
+    pass
+  return DEFAULT_BUDGET
+
+
+def _Fadvise(fd, advice):
+  if hasattr(os, 'posix_fadvise'):
+    os.posix_fadvise(fd, 0, 0, advice)
+    return True
+  global _libc
+  if _libc is None:
+    _libc = _LoadLibc() or False
+  if not _libc:
+    return False
+  return _libc.posix_fadvise(fd, ctypes.c_longlong(0), ctypes.c_longlong(0),
+                             advice) == 0
+
+
+def _LoadLibc():
+  path = ctypes.util.find_library('c')
+  if path is None:
+    return None
+  try:
+    libc = ctypes.CDLL(path, use_errno=True)
+    libc.posix_fadvise
+  except (OSError, AttributeError):
+    return None
+  return libc
@@ -0,0 +1,327 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import BaseHTTPServer
+import Queue
+import SocketServer
+import atexit
+import errno
+import hashlib
+import httplib
+import json
+import os
+import os.path
+import re
+import socket
+import tempfile
+import threading
+import urllib2
+
+from rime.util import files
+
+# Chunk size used to stream blobs.
+_CHUNK_SIZE = 1 << 16
+
+_NAME_RE = re.compile(r'^[0-9A-Za-z_][0-9A-Za-z_.-]*$')
+
+
+class RemoteCache(object):
+  """Client of a remote cache server.
+
+  The server speaks a simple HTTP protocol similar to the one of Bazel's
+  remote cache:
+
+    GET/PUT <url>/ac/<namespace>/<key>  JSON value of a cache entry
+    GET/PUT <url>/cas/<digest>          blob named by its SHA-1 digest
+
+  GET of a missing item returns 404. Lookups are issued concurrently, and
+  uploads are done in background threads so they never block builds.
+  Once the server becomes unreachable, the remote cache is disabled for the
+  rest of the process.
+  """
+
+  def __init__(self, url, parallelism=8, timeout=10):
+    self.url = url.rstrip('/')
+    self.parallelism = parallelism
+    self.timeout = timeout
+    self.last_error = None
+    self._uploads = Queue.Queue()
+    self._upload_threads = []
+    self._lock = threading.Lock()
+    atexit.register(self.Flush)
+
+  def IsAvailable(self):
+    return self.last_error is None
+
+  def GetEntries(self, namespace, keys):
+    """Fetches entries concurrently.
+
+    Returns a dictionary containing only the keys found.
+    """
+    def Fetch(key):
+      response = self._Open('GET', self._EntryUrl(namespace, key))
+      if response is None:
+        return None
+      try:
+        return json.loads(response.read())
+      except ValueError:
+        return None
+      finally:
+        response.close()
+    values = {}
+    for key, value in zip(keys, self._Map(Fetch, keys)):
+      if value is not None:
+        values[key] = value
+    return values
+
+  def PutEntry(self, namespace, key, value):
+    """Uploads an entry in background."""
+    self._Enqueue(self._Upload, self._EntryUrl(namespace, key),
+                  json.dumps(value))
+
+  def FetchBlobs(self, digests, get_path):
+    """Downloads blobs concurrently.
+
+    Each blob is written to get_path(digest) only if its content matches the
+    digest. Returns a list of digests downloaded.
+    """
+    def Fetch(digest):
+      response = self._Open('GET', self._BlobUrl(digest))
+      if response is None:
+        return False
+      path = get_path(digest)
+      files.MakeDir(os.path.dirname(path))
+      fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp')
+      try:
+        sha1 = hashlib.sha1()
+        with os.fdopen(fd, 'wb') as f:
+          while True:
+            chunk = response.read(_CHUNK_SIZE)
+            if not chunk:
+              break
+            sha1.update(chunk)
+            f.write(chunk)
+        if sha1.hexdigest() != digest:
+          return False
+        os.rename(tmp, path)
+        files.InvalidatePath(path)
+        return True
+      except (IOError, OSError, socket.error, httplib.HTTPException):
+        return False
+      finally:
+        response.close()
+        if os.path.exists(tmp):
+          os.remove(tmp)
+    return [digest for digest, ok in zip(digests, self._Map(Fetch, digests))
+            if ok]
+
+  def PutBlob(self, digest, path):
+    """Uploads a blob in background.
+
+    The file must not be modified until uploads are flushed.
+    """
+    self._Enqueue(self._UploadFile, self._BlobUrl(digest), path)
+
+  def Flush(self):
+    """Waits for background uploads to finish."""
+    self._uploads.join()
+
+  def _EntryUrl(self, namespace, key):
+    return '%s/ac/%s/%s' % (self.url, namespace, key)
+
+  def _BlobUrl(self, digest):
+    return '%s/cas/%s' % (self.url, digest)
+
+  def _Open(self, method, url, data=None, headers={}):
+    """Sends a request and returns the response, or None on failure."""
+    if not self.IsAvailable():
+      return None
+    request = urllib2.Request(url, data, headers)
+    request.get_method = lambda: method
+    try:
+      return urllib2.urlopen(request, timeout=self.timeout)
+    except urllib2.HTTPError as e:
+      e.close()
+      return None
+    except (urllib2.URLError, socket.error, httplib.HTTPException) as e:
+      self.last_error = str(e)
+      return None
+
+  def _Upload(self, url, data):
+    response = self._Open('PUT', url, data,
+                          {'Content-Type': 'application/octet-stream'})
+    if response is not None:
+      response.close()
+
+  def _UploadFile(self, url, path):
+    try:
+      f = open(path, 'rb')
+    except IOError:
+      return
+    with f:
+      response = self._Open('PUT', url, f,
+                            {'Content-Type': 'application/octet-stream',
+                             'Content-Length': str(os.fstat(f.fileno()).st_size)})
+    if response is not None:
+      response.close()
+
+  def _Map(self, func, items):
+    """Applies func to items concurrently and returns a list of results."""
+    items = list(items)
+    results = [None] * len(items)
+    if not items or not self.IsAvailable():
+      return results
+    indices = Queue.Queue()
+    for i in xrange(len(items)):
+      indices.put(i)
+    def Worker():
+      while True:
+        try:
+          i = indices.get_nowait()
+        except Queue.Empty:
+          return
+        results[i] = func(items[i])
+    threads = [threading.Thread(target=Worker)
+               for _ in xrange(min(self.parallelism, len(items)))]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    return results
+
+  def _Enqueue(self, func, *args):
+    if not self.IsAvailable():
+      return
+    with self._lock:
+      if not self._upload_threads:
+        for _ in xrange(self.parallelism):
+          thread = threading.Thread(target=self._UploadWorker)
+          thread.daemon = True
+          thread.start()
+          self._upload_threads.append(thread)
+    self._uploads.put((func, args))
+
+  def _UploadWorker(self):
+    while True:
+      func, args = self._uploads.get()
+      try:
+        func(*args)
+      except Exception:
+        pass
+      finally:
+        self._uploads.task_done()
+
+
+class CacheServerHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+  """Request handler of the reference cache server.
+
+  Items are stored as plain files under the root directory of the server.
+  """
+
+  def do_GET(self):
+    path = self._GetPath()
+    if path is None:
+      return
+    if not os.path.isfile(path):
+      self.send_error(404)
+      return
+    with open(path, 'rb') as f:
+      self.send_response(200)
+      self.send_header('Content-Type', 'application/octet-stream')
+      self.send_header('Content-Length', str(os.fstat(f.fileno()).st_size))
+      self.end_headers()
+      while True:
+        chunk = f.read(_CHUNK_SIZE)
+        if not chunk:
+          break
+        self.wfile.write(chunk)
+
+  def do_PUT(self):
+    path = self._GetPath()
+    if path is None:
+      return
+    try:
+      length = int(self.headers.get('Content-Length', ''))
+    except ValueError:
+      self.send_error(411)
+      return
+    try:
+      os.makedirs(os.path.dirname(path))
+    except OSError as e:
+      # Concurrent requests may create the directory at the same time.
+      if e.errno != errno.EEXIST:
+        raise
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp')
+    try:
+      sha1 = hashlib.sha1()
+      with os.fdopen(fd, 'wb') as f:
+        while length > 0:
+          chunk = self.rfile.read(min(length, _CHUNK_SIZE))
+          if not chunk:
+            break
+          sha1.update(chunk)
+          f.write(chunk)
+          length -= len(chunk)
+      if length > 0:
+        self.send_error(400, 'Truncated body')
+        return
+      if self._IsBlob() and sha1.hexdigest() != self._GetName():
+        self.send_error(400, 'Digest mismatch')
+        return
+      os.rename(tmp, path)
+    finally:
+      if os.path.exists(tmp):
+        os.remove(tmp)
+    self.send_response(200)
+    self.send_header('Content-Length', '0')
+    self.end_headers()
+
+  def log_message(self, format, *args):
+    if self.server.verbose:
+      BaseHTTPServer.BaseHTTPRequestHandler.log_message(self, format, *args)
+
+  def _IsBlob(self):
+    return self.path.split('/')[1] == 'cas'
+
+  def _GetName(self):
+    return self.path.split('/')[-1]
+
+  def _GetPath(self):
+    parts = self.path.split('/')[1:]
+    if not (len(parts) == 3 and parts[0] == 'ac' or
+            len(parts) == 2 and parts[0] == 'cas') or \
+        not all(_NAME_RE.match(part) for part in parts[1:]):
+      self.send_error(400, 'Malformed path')
+      return None
+    return os.path.join(self.server.root, *parts)
+
+
+class CacheServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+  """Reference implementation of a remote cache server."""
+
+  daemon_threads = True
+
+  def __init__(self, address, root, verbose=False):
+    BaseHTTPServer.HTTPServer.__init__(self, address, CacheServerHandler)
+    self.root = os.path.abspath(root)
+    self.verbose = verbose
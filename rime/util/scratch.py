@@ -0,0 +1,81 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import atexit
+import os
+import tempfile
+
+from rime.util import files
+
+
+# Runs are moved back to disk when the scratch root has less free space.
+_MIN_FREE_BYTES = 64 << 20
+
+
+class ScratchSpace(object):
+  """Private working directories for runs.
+
+  Directories are made under root, typically a tmpfs like /dev/shm, so that
+  hot files of runs never touch the disk. When root is not set or it runs
+  low on free space, directories are made under fallback_dir instead.
+  """
+
+  def __init__(self, root, fallback_dir):
+    self.root = root
+    self.fallback_dir = fallback_dir
+    self._base_dirs = {}
+    atexit.register(self.Close)
+
+  def CreateRunDir(self):
+    """Makes a new private directory.
+
+    Returns a tuple of the path and whether it is on the scratch root.
+    """
+    on_scratch = self.HasFreeSpace()
+    base_dir = self._GetBaseDir(self.root if on_scratch else self.fallback_dir)
+    return (tempfile.mkdtemp(prefix='run-', dir=base_dir), on_scratch)
+
+  def HasFreeSpace(self):
+    """Returns True if runs can be placed on the scratch root."""
+    if not self.root:
+      return False
+    try:
+      st = os.statvfs(self.root)
+    except OSError:
+      return False
+    return st.f_bavail * st.f_frsize >= _MIN_FREE_BYTES
+
+  def Close(self):
+    """Removes all directories made by this process."""
+    for base_dir in self._base_dirs.values():
+      files.RemoveTree(base_dir)
+    self._base_dirs.clear()
+
+  def _GetBaseDir(self, parent):
+    # Directories of a process are grouped, so that they can be cleaned up at
+    # once even if some runs are interrupted.
+    if parent not in self._base_dirs:
+      files.MakeDir(parent)
+      self._base_dirs[parent] = tempfile.mkdtemp(
+        prefix='rime-%d-' % os.getpid(), dir=parent)
+    return self._base_dirs[parent]
@@ -0,0 +1,66 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+"""Queries version control systems."""
+
+import os.path
+import subprocess
+
+
+class VcsError(Exception):
+  pass
+
+
+def _RunGit(args, cwd):
+  try:
+    proc = subprocess.Popen(['git'] + args, cwd=cwd,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+  except OSError as e:
+    raise VcsError('cannot run git: %s' % e)
+  out, err = proc.communicate()
+  if proc.returncode != 0:
+    raise VcsError('git %s failed: %s' % (args[0], err.strip()))
+  return out
+
+
+def GetChangedFiles(dir, rev):
+  """Returns absolute paths of files changed since a git revision.
+
+  Changes in the working tree, including untracked files which are not
+  ignored, are taken into account. Renamed files appear both with old and
+  new paths. Paths are based on dir as given, even if it contains symlinks.
+
+  Raises:
+    VcsError: dir is not in a git repository, or rev is invalid.
+  """
+  toplevel = _RunGit(['rev-parse', '--show-toplevel'], dir).strip()
+  changed = _RunGit(['diff', '--name-only', '--no-renames', '-z', rev, '--'],
+                    toplevel).split('\0')
+  changed += _RunGit(['ls-files', '--others', '--exclude-standard', '-z'],
+                     toplevel).split('\0')
+  real_dir = os.path.realpath(dir)
+  return sorted(set(
+    os.path.normpath(os.path.join(
+      os.path.abspath(dir),
+      os.path.relpath(os.path.join(toplevel, path), real_dir)))
+    for path in changed if path))
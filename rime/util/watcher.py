@@ -0,0 +1,283 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+from __future__ import absolute_import
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import os.path
+import select
+import struct
+import time
+
+
+# Events from inotify(7) which indicate changes of directory contents.
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_ISDIR = 0x40000000
+_IN_IGNORED = 0x00008000
+_IN_NONBLOCK = 0x00000800
+_IN_CLOEXEC = 0x00080000
+
+_WATCH_MASK = (_IN_CLOSE_WRITE | _IN_ATTRIB | _IN_MOVED_FROM | _IN_MOVED_TO |
+               _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF)
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+# Changes arriving within this many seconds are reported together, so that
+# an editor saving several files triggers only one rebuild.
+_SETTLE_TIME = 0.2
+
+# Interval of scans by PollingWatcher.
+_POLL_INTERVAL = 1.0
+
+
+def _IsIgnoredName(name):
+  return name.startswith('.') or name.endswith('~')
+
+
+def _IsUnder(path, dir):
+  return path == dir or path.startswith(os.path.join(dir, ''))
+
+
+class WatcherBase(object):
+  """Interface of file system watchers.
+
+  Directories are watched recursively. ignore, if given, is called with
+  the path of a directory and returns True to exclude its subtree. Hidden
+  files and editor backups are never reported.
+  """
+
+  def __init__(self, ignore=None):
+    self.ignore = ignore or (lambda path: False)
+    self._roots = []
+
+  def AddTree(self, dir):
+    """Starts watching a directory and everything under it."""
+    raise NotImplementedError()
+
+  def RemoveTree(self, dir):
+    """Stops watching a directory added by AddTree().
+
+    Parts of the tree which are under other directories added are still
+    watched.
+    """
+    raise NotImplementedError()
+
+  def Wait(self, timeout=None):
+    """Waits for changes and returns a sorted list of changed paths.
+
+    Returns an empty list if nothing changed within timeout seconds.
+    """
+    raise NotImplementedError()
+
+  def Close(self):
+    pass
+
+  def _WalkDirs(self, dir):
+    for root, dirs, _ in os.walk(dir):
+      dirs[:] = [d for d in dirs
+                 if not _IsIgnoredName(d) and
+                 not self.ignore(os.path.join(root, d))]
+      yield root
+
+  def _IsWatched(self, path):
+    return any(_IsUnder(path, root) for root in self._roots)
+
+
+class InotifyWatcher(WatcherBase):
+  """Watches directories with inotify(7) of Linux."""
+
+  def __init__(self, ignore=None):
+    super(InotifyWatcher, self).__init__(ignore)
+    libc = _LoadLibc()
+    if libc is None:
+      raise OSError(errno.ENOSYS, 'inotify is not available')
+    self._libc = libc
+    self._fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+    if self._fd < 0:
+      err = ctypes.get_errno()
+      raise OSError(err, os.strerror(err))
+    self._dirs = {}
+
+  def AddTree(self, dir):
+    dir = os.path.abspath(dir)
+    self._roots.append(dir)
+    self._AddWatches(dir)
+
+  def RemoveTree(self, dir):
+    self._roots.remove(os.path.abspath(dir))
+    for wd, path in self._dirs.items():
+      if not self._IsWatched(path):
+        self._libc.inotify_rm_watch(self._fd, wd)
+        del self._dirs[wd]
+
+  def Wait(self, timeout=None):
+    changed = set()
+    deadline = None if timeout is None else time.time() + timeout
+    while True:
+      if changed:
+        wait = _SETTLE_TIME
+      elif deadline is None:
+        wait = None
+      else:
+        wait = max(0, deadline - time.time())
+      readable, _, _ = select.select([self._fd], [], [], wait)
+      if not readable:
+        if changed or deadline is not None:
+          break
+        continue
+      changed.update(self._ReadEvents())
+    return sorted(changed)
+
+  def Close(self):
+    if self._fd >= 0:
+      os.close(self._fd)
+      self._fd = -1
+
+  def _ReadEvents(self):
+    try:
+      data = os.read(self._fd, 65536)
+    except OSError as e:
+      if e.errno == errno.EAGAIN:
+        return []
+      raise
+    paths = []
+    offset = 0
+    while offset < len(data):
+      wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+      offset += _EVENT_HEADER.size
+      name = data[offset:offset+length].rstrip('\0')
+      offset += length
+      dir = self._dirs.get(wd)
+      if dir is None:
+        continue
+      if mask & _IN_IGNORED:
+        del self._dirs[wd]
+        continue
+      if not name:
+        paths.append(dir)
+        continue
+      if _IsIgnoredName(name):
+        continue
+      path = os.path.join(dir, name)
+      if mask & _IN_ISDIR:
+        if self.ignore(path):
+          continue
+        if mask & (_IN_CREATE | _IN_MOVED_TO):
+          # Files created before the watch is added are not reported, but
+          # the directory itself is.
+          self._AddWatches(path)
+      paths.append(path)
+    return paths
+
+  def _AddWatches(self, dir):
+    for path in self._WalkDirs(dir):
+      wd = self._libc.inotify_add_watch(self._fd, path, _WATCH_MASK)
+      if wd >= 0:
+        self._dirs[wd] = path
+
+
+class PollingWatcher(WatcherBase):
+  """Watches directories by scanning modification times periodically."""
+
+  def __init__(self, ignore=None):
+    super(PollingWatcher, self).__init__(ignore)
+    self._state = {}
+
+  def AddTree(self, dir):
+    dir = os.path.abspath(dir)
+    self._roots.append(dir)
+    self._state.update(self._Scan(dir))
+
+  def RemoveTree(self, dir):
+    self._roots.remove(os.path.abspath(dir))
+    self._state = dict((path, value) for path, value in self._state.items()
+                       if self._IsWatched(path))
+
+  def Wait(self, timeout=None):
+    deadline = None if timeout is None else time.time() + timeout
+    while True:
+      state = {}
+      for root in self._roots:
+        state.update(self._Scan(root))
+      changed = set(path for path in set(state) ^ set(self._state))
+      changed.update(path for path in set(state) & set(self._state)
+                     if state[path] != self._state[path])
+      self._state = state
+      if changed:
+        return sorted(changed)
+      if deadline is not None and time.time() >= deadline:
+        return []
+      time.sleep(_POLL_INTERVAL)
+
+  def _Scan(self, dir):
+    state = {}
+    for root in self._WalkDirs(dir):
+      try:
+        names = os.listdir(root)
+      except OSError:
+        continue
+      for name in names:
+        if _IsIgnoredName(name):
+          continue
+        path = os.path.join(root, name)
+        try:
+          st = os.stat(path)
+        except OSError:
+          continue
+        if os.path.isdir(path):
+          # Directories are reported only when created or removed.
+          if not self.ignore(path):
+            state[path] = None
+        else:
+          state[path] = (st.st_size, st.st_mtime)
+    return state
+
+
+def _LoadLibc():
+  path = ctypes.util.find_library('c')
+  if path is None:
+    return None
+  try:
+    libc = ctypes.CDLL(path, use_errno=True)
+    libc.inotify_init1
+  except (OSError, AttributeError):
+    return None
+  return libc
+
+
+def CreateWatcher(ignore=None):
+  """Returns the best watcher available on this platform."""
+  try:
+    return InotifyWatcher(ignore)
+  except OSError:
+    return PollingWatcher(ignore)
@@ -2,7 +2,7 @@ from setuptools import setup, find_packages
 setup(
   name = "rime_plus",
   version = "0.9.0.2",
-  scripts          = ['bin/rime', 'bin/rime_init'],
+  scripts          = ['bin/rime', 'bin/rime_init', 'bin/rime_cache_server'],
   packages         = find_packages(),
   package_dir      = {'rime': 'rime'},
 )
@@ -0,0 +1,80 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import gzip
+import os
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from rime.basic import codes
+from rime.core import codes as core_codes
+from rime.core import taskgraph
+from rime.util import files
+
+
+class OutputLimitTest(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+    files.InvalidatePath()
+
+  def _Run(self, output, count):
+    code = codes.CodeBase(
+      src_name='dd', src_dir=self.tmpdir, out_dir=self.tmpdir,
+      compile_args=[],
+      run_args=['dd', 'if=/dev/zero', 'bs=1000', 'count=%d' % count])
+    code.output_limit = 4096
+    return taskgraph.FiberTaskGraph(parallelism=2).Run(code.Run(
+      args=(), cwd=self.tmpdir, input=os.devnull, output=output,
+      timeout=None, precise=False))
+
+  def _ReadGzip(self, path):
+    with gzip.open(path) as f:
+      return f.read()
+
+  def testPlainOutput(self):
+    output = os.path.join(self.tmpdir, 'a.out')
+    result = self._Run(output, 100)
+    self.assertEqual(result.status, core_codes.RunResult.OLE)
+    self.assertEqual(os.path.getsize(output), 4096)
+
+  def testCompressedOutput(self):
+    output = os.path.join(self.tmpdir, 'a.out.gz')
+    result = self._Run(output, 100)
+    self.assertEqual(result.status, core_codes.RunResult.OLE)
+    self.assertEqual(len(self._ReadGzip(output)), 4096)
+    self.assertEqual(sorted(os.listdir(self.tmpdir)), ['a.out.gz'])
+
+  def testCompressedOutputWithinLimit(self):
+    output = os.path.join(self.tmpdir, 'a.out.gz')
+    result = self._Run(output, 4)
+    self.assertEqual(result.status, core_codes.RunResult.OK)
+    self.assertEqual(self._ReadGzip(output), '\0' * 4000)
+
+
+if __name__ == '__main__':
+  unittest.main()
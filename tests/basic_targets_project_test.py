@@ -0,0 +1,96 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+import os
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from rime.core import main
+from rime.core import ui as ui_mod
+from rime.util import console as console_mod
+from rime.util import files
+from rime.util import module_loader
+from rime.util import struct
+
+
+class ProjectTest(unittest.TestCase):
+  def setUp(self):
+    module_loader.LoadPackage('rime.basic')
+    self.tmpdir = tempfile.mkdtemp()
+    files.WriteFile('', os.path.join(self.tmpdir, 'PROJECT'))
+    self._WriteProblem('a', "problem(time_limit=1.0, id='A')\n")
+    self._WriteProblem('b', "problem(time_limit=1.0, id='B')\n")
+    self._WriteProblem('c', "problem(time_limit=1.0, id='C'\n")
+    self.ui = ui_mod.UiContext(
+      struct.Struct(debug=0), console_mod.NullConsole(), {}, None)
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+    files.InvalidatePath()
+
+  def _WriteProblem(self, name, config):
+    os.mkdir(os.path.join(self.tmpdir, name))
+    files.WriteFile(config, os.path.join(self.tmpdir, name, 'PROBLEM'))
+
+  def _LoadProject(self):
+    project = main.LoadProject(self.tmpdir, self.ui)
+    self.assertTrue(project is not None)
+    return project
+
+  def testFindByBaseDirLoadsContainingProblem(self):
+    project = self._LoadProject()
+    problem = project.FindByBaseDir(os.path.join(self.tmpdir, 'a'))
+    self.assertEqual(problem.name, 'a')
+    self.assertEqual(problem.id, 'A')
+    self.assertEqual(sorted(project._loaded_problems), ['a'])
+    self.assertIs(project.FindByBaseDir(os.path.join(self.tmpdir, 'a')),
+                  problem)
+    self.assertIs(project.FindByBaseDir(self.tmpdir), project)
+    self.assertIsNone(
+      project.FindByBaseDir(os.path.join(self.tmpdir, 'missing')))
+
+  def testBrokenSiblingProblem(self):
+    project = self._LoadProject()
+    problem = project.FindByBaseDir(os.path.join(self.tmpdir, 'b'))
+    self.assertEqual(problem.id, 'B')
+    self.assertFalse(self.ui.errors.HasError())
+    self.assertIsNone(project.FindByBaseDir(os.path.join(self.tmpdir, 'c')))
+    self.assertTrue(self.ui.errors.HasError())
+
+  def testProblemsLoadedAtFirstAccess(self):
+    project = self._LoadProject()
+    self.assertEqual(project._loaded_problems, {})
+    problem = project.FindByBaseDir(os.path.join(self.tmpdir, 'a'))
+    problems = project.problems
+    self.assertEqual([p.id for p in problems], ['A', 'B'])
+    # The problem loaded before is shared.
+    self.assertIs(problems[0], problem)
+    self.assertEqual(sorted(project._loaded_problems), ['a', 'b', 'c'])
+    self.assertEqual(len(self.ui.errors.errors), 1)
+    self.assertIs(project.problems, problems)
+    self.assertEqual(len(self.ui.errors.errors), 1)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,123 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from rime.basic import test
+from rime.core import api
+from tests import plugin_loader
+from tests import project_fixture
+
+
+class SessionTest(unittest.TestCase):
+  def setUp(self):
+    self.restore_plugin = plugin_loader.InstallPlugin('rime.plugins.rime_plus')
+    self.tmpdir = tempfile.mkdtemp()
+    project_fixture.CreateProject(self.tmpdir)
+    self.session = api.Session(self.tmpdir, parallelism=0)
+
+  def tearDown(self):
+    self.session.Close()
+    shutil.rmtree(self.tmpdir)
+    self.restore_plugin()
+
+  def _GetResult(self, result, solution_name):
+    for testset_result in result.value:
+      if testset_result.solution.name == solution_name:
+        return testset_result
+    self.fail('No result for %s' % solution_name)
+
+  def testBuild(self):
+    result = self.session.Build('a+b/correct')
+    self.assertTrue(result.IsSuccess())
+    self.assertEqual(result.errors, [])
+    self.assertTrue(os.path.isdir(
+      os.path.join(self.tmpdir, 'a+b', 'rime-out', 'correct')))
+
+  def testBuildFailure(self):
+    project_fixture.WriteFile(self.tmpdir, 'a+b/correct/main.py',
+                              '#!/nonexistent/python\n')
+    result = self.session.Build('a+b/correct')
+    self.assertFalse(result.IsSuccess())
+    self.assertNotEqual(result.errors, [])
+
+  def testTest(self):
+    result = self.session.Test('a+b')
+    self.assertTrue(result.IsSuccess())
+    correct = self._GetResult(result, 'correct')
+    self.assertTrue(correct.expected)
+    self.assertTrue(correct.IsAccepted())
+    self.assertEqual(len(correct.results), len(project_fixture.CASES))
+    for case_result in correct.results.values():
+      self.assertTrue(case_result.verdict is test.TestCaseResult.AC)
+      self.assertTrue(0 <= case_result.time <= 1.0)
+      self.assertTrue(case_result.memory is not None)
+      self.assertTrue(case_result.memory > 0)
+    wrong = self._GetResult(result, 'wrong')
+    self.assertTrue(wrong.expected)
+    self.assertFalse(wrong.IsAccepted())
+    verdicts = [c.verdict for c in wrong.results.values()]
+    self.assertTrue(test.TestCaseResult.WA in verdicts)
+
+  def testTestSeesEditedFiles(self):
+    result = self.session.Test('a+b/correct')
+    self.assertTrue(self._GetResult(result, 'correct').IsAccepted())
+    project_fixture.WriteFile(self.tmpdir, 'a+b/correct/main.py',
+                              project_fixture.WRONG_SOLUTION)
+    result = self.session.Test('a+b/correct')
+    correct = self._GetResult(result, 'correct')
+    self.assertFalse(correct.IsAccepted())
+    self.assertFalse(correct.expected)
+    self.assertFalse(result.IsSuccess())
+    self.assertFalse(correct.IsCached())
+
+  def testClean(self):
+    self.assertTrue(self.session.Build('a+b/correct').IsSuccess())
+    out_dir = os.path.join(self.tmpdir, 'a+b', 'rime-out', 'correct')
+    self.assertTrue(os.path.isdir(out_dir))
+    result = self.session.Clean('a+b/correct')
+    self.assertTrue(result.IsSuccess())
+    self.assertFalse(os.path.exists(out_dir))
+
+  def testMissingTarget(self):
+    self.assertRaises(api.Error, self.session.Test, 'no-such-problem')
+
+  def testUnknownOption(self):
+    self.assertRaises(api.Error, self.session.Test, 'a+b', no_such_option=1)
+
+  def testToDict(self):
+    summary = self.session.Test('a+b/correct').ToDict()
+    self.assertEqual(summary['errors'], [])
+    [testset_summary] = summary['value']
+    self.assertEqual(testset_summary['solution'], 'correct')
+    self.assertTrue(testset_summary['accepted'])
+    self.assertTrue(testset_summary['max_memory'] > 0)
+    self.assertEqual(
+      sorted(c['verdict'] for c in testset_summary['cases']),
+      [test.TestCaseResult.AC.msg] * len(project_fixture.CASES))
+
+
+if __name__ == '__main__':
+  unittest.main()
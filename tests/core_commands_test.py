@@ -0,0 +1,63 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import unittest
+
+from rime.core import commands
+
+
+class FakeCommand(commands.CommandBase):
+  def __init__(self, parent):
+    super(FakeCommand, self).__init__('fake', '', '', '', parent)
+    self.AddOptionEntry(commands.OptionEntry(
+        None, 'changed', 'changed', str, '', 'rev', '', implicit='HEAD'))
+    self.AddOptionEntry(commands.OptionEntry(
+        'n', 'number', 'number', int, 0, 'n', ''))
+
+
+class ParseTest(unittest.TestCase):
+  def setUp(self):
+    default = commands.CommandBase(None, None, '', '', None)
+    self.commands = {None: default, 'fake': FakeCommand(default)}
+
+  def _Parse(self, *args):
+    return commands.Parse(['rime', 'fake'] + list(args), self.commands)
+
+  def testImplicitValue(self):
+    cmd, args, options = self._Parse('--changed', 'target')
+    self.assertEqual(options.changed, 'HEAD')
+    self.assertEqual(args, ['target'])
+    cmd, args, options = self._Parse('--changed=HEAD~3')
+    self.assertEqual(options.changed, 'HEAD~3')
+    cmd, args, options = self._Parse()
+    self.assertEqual(options.changed, '')
+
+  def testRequiredValue(self):
+    cmd, args, options = self._Parse('-n', '3', 'target')
+    self.assertEqual(options.number, 3)
+    self.assertEqual(args, ['target'])
+    self.assertRaises(commands.ParseError, self._Parse, '-n')
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import cPickle as pickle
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from rime.core import targets
+from rime.util import files
+
+
+class ScanPluginsTest(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.config_file = os.path.join(self.tmpdir, 'PROJECT')
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+
+  def testScanPlugins(self):
+    files.WriteFile(
+      "use_plugin('rime_plus')\n"
+      "use_plugin(\"judge_system.aoj\")\n"
+      "if False:\n"
+      "  use_plugin('nested')\n"
+      "name = 'dynamic'\n"
+      "use_plugin(name)\n"
+      "project(library_dir='lib')\n",
+      self.config_file)
+    self.assertEqual(targets.ScanPlugins(self.config_file),
+                     ['rime_plus', 'judge_system.aoj'])
+
+  def testScanPluginsBroken(self):
+    files.WriteFile("use_plugin('rime_plus'\n", self.config_file)
+    self.assertEqual(targets.ScanPlugins(self.config_file), [])
+    self.assertEqual(
+      targets.ScanPlugins(os.path.join(self.tmpdir, 'missing')), [])
+
+
+class TargetPickleTest(unittest.TestCase):
+  def testPickleDropsExports(self):
+    target = targets.Project('a', '/tmp', None)
+    target.Export(lambda: None, 'func')
+    target.configs['x'] = 1
+    target.timeout = 2
+    restored = pickle.loads(pickle.dumps(target, pickle.HIGHEST_PROTOCOL))
+    self.assertEqual(restored.exports, {})
+    self.assertEqual(restored.configs, {})
+    self.assertEqual(restored.timeout, 2)
+    self.assertEqual(restored.fullname, 'a')
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,178 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import os
+import os.path
+import shutil
+import signal
+import sys
+import tempfile
+import unittest
+
+from rime.core import taskgraph
+from rime.util import files
+
+
+class FakeMemoStore(taskgraph.MemoStore):
+  def __init__(self):
+    self.records = {}
+    self.blobs = {}
+
+  def Lookup(self, key):
+    return self.records.get(key)
+
+  def Save(self, key, record):
+    self.records[key] = record
+
+  def GetFileHash(self, path):
+    return files.GetFileHash(path)
+
+  def PutFile(self, path):
+    digest = files.GetFileHash(path)
+    self.blobs[digest] = files.ReadFile(path)
+    return digest
+
+  def HasFile(self, digest):
+    return digest in self.blobs
+
+  def GetFile(self, digest, path):
+    files.WriteFile(self.blobs[digest], path)
+    return True
+
+
+class MemoizeTest(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.infile = os.path.join(self.tmpdir, 'in')
+    self.outfile = os.path.join(self.tmpdir, 'out')
+    self.runs = 0
+    taskgraph.SetMemoStore(FakeMemoStore())
+
+  def tearDown(self):
+    taskgraph.SetMemoStore(None)
+    shutil.rmtree(self.tmpdir)
+
+  @taskgraph.task_method
+  def _Double(self, suffix):
+    yield taskgraph.Memoize(inputs=[self.infile], params=[suffix],
+                            outputs=[self.outfile])
+    self.runs += 1
+    files.WriteFile(files.ReadFile(self.infile) * 2 + suffix, self.outfile)
+    yield self.runs
+
+  def _Run(self, suffix='!'):
+    return taskgraph.SerialTaskGraph().Run(self._Double(suffix))
+
+  @taskgraph.task_method
+  def _CheckInput(self):
+    yield taskgraph.Memoize(inputs=[self.infile], outputs=[self.outfile])
+    self.runs += 1
+    yield os.path.isfile(self.infile)
+
+  def testMemoize(self):
+    files.WriteFile('a', self.infile)
+    self.assertEqual(self._Run(), 1)
+    os.remove(self.outfile)
+    self.assertEqual(self._Run(), 1)
+    self.assertEqual(files.ReadFile(self.outfile), 'aa!')
+    self.assertEqual(self.runs, 1)
+
+  def testInvalidation(self):
+    files.WriteFile('a', self.infile)
+    self._Run()
+    files.WriteFile('b', self.infile)
+    self._Run()
+    self.assertEqual(files.ReadFile(self.outfile), 'bb!')
+    self._Run('?')
+    self.assertEqual(files.ReadFile(self.outfile), 'bb?')
+    self.assertEqual(self.runs, 3)
+
+  def testMissingInput(self):
+    self.assertFalse(taskgraph.SerialTaskGraph().Run(self._CheckInput()))
+    self.assertEqual(self.runs, 1)
+
+  def testWithoutStore(self):
+    taskgraph.SetMemoStore(None)
+    files.WriteFile('a', self.infile)
+    self._Run()
+    self._Run()
+    self.assertEqual(self.runs, 2)
+
+
+class ExternalProcessTaskTest(unittest.TestCase):
+  def _Run(self, args, exclusive, **kwargs):
+    task = taskgraph.ExternalProcessTask(args, exclusive=exclusive, **kwargs)
+    proc = taskgraph.FiberTaskGraph(parallelism=2).Run(task)
+    return task, proc
+
+  def testReturnCode(self):
+    for exclusive in (False, True):
+      task, proc = self._Run(
+        [sys.executable, '-c', 'import sys; sys.exit(3)'], exclusive)
+      self.assertEqual(proc.returncode, 3)
+      task, proc = self._Run(
+        [sys.executable, '-c', 'import os; os.kill(os.getpid(), 9)'],
+        exclusive)
+      self.assertEqual(proc.returncode, -9)
+
+  def testMemory(self):
+    size = 128 * 1024 * 1024
+    for exclusive in (False, True):
+      task, proc = self._Run(
+        [sys.executable, '-c',
+         'import time; x = bytearray(%d); time.sleep(0.1)' % size],
+        exclusive)
+      self.assertEqual(proc.returncode, 0)
+      self.assertTrue(task.rusage is not None)
+      self.assertTrue(task.memory is not None)
+      self.assertTrue(task.memory >= size)
+
+  def testMemoryInLargeProcess(self):
+    # Pages of this process inherited before exec() are not counted.
+    ballast = bytearray(512 * 1024 * 1024)
+    try:
+      task, proc = self._Run(['sleep', '0.05'], False)
+      self.assertTrue(task.memory is not None)
+      self.assertTrue(task.memory < 64 * 1024 * 1024)
+    finally:
+      del ballast
+
+  def testLostStatus(self):
+    task = taskgraph.ExternalProcessTask(['true'])
+    task._StartProcess()
+    os.waitpid(task.proc.pid, 0)
+    task.Wait()
+    self.assertEqual(task.proc.returncode, taskgraph.LOST_RETURNCODE)
+    self.assertTrue(task.proc.returncode < 0)
+
+  def testOutputLimit(self):
+    with tempfile.TemporaryFile() as outfile:
+      task, proc = self._Run(
+        ['dd', 'if=/dev/zero', 'bs=1000', 'count=100'], False,
+        stdout=outfile, stderr=files.OpenNull(), output_limit=4096)
+      self.assertEqual(proc.returncode, -signal.SIGXFSZ)
+      self.assertEqual(os.fstat(outfile.fileno()).st_size, 4096)
+
+
+if __name__ == '__main__':
+  unittest.main()
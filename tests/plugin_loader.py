@@ -0,0 +1,78 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""Helpers to import plugins in tests."""
+
+import sys
+
+from rime.core import targets
+from rime.util import module_loader
+
+# Sub-modules of this plugin depend on each other, so they are loaded as a
+# whole to chain their overrides in order.
+_PLUS_PLUGIN = 'rime.plugins.rime_plus'
+
+# Classes in the registry with plugins loaded, by plugin module names.
+_plugin_classes = {}
+
+
+def ImportPlugin(module_fullname):
+  """Imports a plugin module without keeping its overrides in the registry.
+
+  Plugins override target classes on import, which would otherwise leak into
+  the other tests. Use InstallPlugin() to run targets with the plugin.
+  """
+  if module_fullname.startswith('rime.plugins.plus.'):
+    _LoadPlugin(_PLUS_PLUGIN)
+  else:
+    _LoadPlugin(module_fullname)
+  return sys.modules[module_fullname]
+
+
+def InstallPlugin(module_fullname):
+  """Puts target classes of the plugin in the registry.
+
+  Returns a function to restore the registry.
+  """
+  if module_fullname.startswith('rime.plugins.plus.'):
+    module_fullname = _PLUS_PLUGIN
+  _LoadPlugin(module_fullname)
+  classes = dict(targets.registry.classes)
+  targets.registry.classes.clear()
+  targets.registry.classes.update(_plugin_classes[module_fullname])
+  def Restore():
+    targets.registry.classes.clear()
+    targets.registry.classes.update(classes)
+  return Restore
+
+
+def _LoadPlugin(module_fullname):
+  if module_fullname in _plugin_classes:
+    return
+  module_loader.LoadPackage('rime.basic')
+  classes = dict(targets.registry.classes)
+  try:
+    __import__(module_fullname)
+    _plugin_classes[module_fullname] = dict(targets.registry.classes)
+  finally:
+    targets.registry.classes.clear()
+    targets.registry.classes.update(classes)
@@ -0,0 +1,265 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+import fnmatch
+import os
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from rime.basic import test
+from rime.core import taskgraph
+from rime.core import ui as ui_mod
+from rime.util import console as console_mod
+from rime.util import files
+from rime.util import struct
+from tests import plugin_loader
+
+basic_patch = plugin_loader.ImportPlugin('rime.plugins.plus.basic_patch')
+
+
+class FakeCacheStore(object):
+  def __init__(self):
+    self.entries = {}
+
+  def Get(self, namespace, key, default=None):
+    return self.entries.get((namespace, key), default)
+
+  def GetMany(self, namespace, keys):
+    return dict((key, self.entries[(namespace, key)]) for key in keys
+                if (namespace, key) in self.entries)
+
+  def Put(self, namespace, key, value):
+    self.entries[(namespace, key)] = value
+
+  def GetFileHash(self, path):
+    return files.GetFileHash(path)
+
+
+class FakeProject(object):
+  def __init__(self):
+    self.store = FakeCacheStore()
+    self.output_compression = None
+
+  def GetCacheStore(self):
+    return self.store
+
+
+class FakeProblem(object):
+  timeout = 1.0
+
+
+class FakeCode(object):
+  def __init__(self, binary_hash):
+    self.binary_hash = binary_hash
+    self.variant = None
+    self.output_limit = None
+
+  def GetBinaryHash(self, hash_file=None):
+    return self.binary_hash
+
+
+class FakeSolution(object):
+  def __init__(self):
+    self.code = FakeCode('solution')
+
+
+class FakeTestset(basic_patch.Testset):
+  """Testset which counts runs of solutions instead of running them."""
+
+  def __init__(self, project, out_dir=None):
+    self.project = project
+    self.out_dir = out_dir
+    self._test_cases = None
+    self._test_case_names = None
+    self._test_case_index = {}
+    self.problem = FakeProblem()
+    self.judges = [FakeCode('judge')]
+    self.reactives = []
+    self.runs = 0
+
+  @taskgraph.task_method
+  def _TestOneCaseNoCache(self, solution, testcase, ui):
+    self.runs += 1
+    yield test.TestCaseResult(solution, testcase, test.TestCaseResult.AC,
+                              time=0.1, cached=False)
+
+
+class TestResultCacheTest(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.testset = FakeTestset(FakeProject())
+    self.solution = FakeSolution()
+    self.testcase = test.TestCase(
+      self.testset, os.path.join(self.tmpdir, '1.in'))
+    files.WriteFile('1 2\n', self.testcase.infile)
+    files.WriteFile('3\n', self.testcase.difffile)
+    self.ui = ui_mod.UiContext(
+      struct.Struct(cache_tests=True, precise=False, parallelism=2),
+      console_mod.NullConsole(), {}, None)
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+
+  def _GetKey(self):
+    return self.testset._GetTestResultKey(
+      self.solution, self.testcase, self.ui)
+
+  def _Run(self):
+    return taskgraph.SerialTaskGraph().Run(
+      self.testset._TestOneCase(self.solution, self.testcase, self.ui))
+
+  def _CheckInvalidated(self, change):
+    self.assertFalse(self._Run().cached)
+    self.assertTrue(self._Run().cached)
+    key = self._GetKey()
+    change()
+    self.assertNotEqual(self._GetKey(), key)
+    runs = self.testset.runs
+    self.assertFalse(self._Run().cached)
+    self.assertEqual(self.testset.runs, runs + 1)
+
+  def testSolutionBinary(self):
+    def Change():
+      self.solution.code.binary_hash = 'solution2'
+    self._CheckInvalidated(Change)
+
+  def testInput(self):
+    self._CheckInvalidated(
+      lambda: files.WriteFile('2 1\n', self.testcase.infile))
+
+  def testDiff(self):
+    self._CheckInvalidated(
+      lambda: files.WriteFile('4\n', self.testcase.difffile))
+
+  def testMissingDiff(self):
+    self._CheckInvalidated(lambda: os.remove(self.testcase.difffile))
+
+  def testJudge(self):
+    def Change():
+      self.testset.judges[0].binary_hash = 'judge2'
+    self._CheckInvalidated(Change)
+
+  def testTimeout(self):
+    def Change():
+      self.testset.problem.timeout = 2.0
+    self._CheckInvalidated(Change)
+
+  def testPrecise(self):
+    def Change():
+      self.ui.options.precise = True
+    self._CheckInvalidated(Change)
+
+  def testOutputLimit(self):
+    def Change():
+      self.solution.code.output_limit = 1 << 20
+    self._CheckInvalidated(Change)
+
+  def testPrefetchMiss(self):
+    self.testset._PrefetchTestResults(
+      self.solution, [self.testcase], self.ui)
+    result = self._Run()
+    self.assertFalse(result.cached)
+    self.assertEqual(self.testset.runs, 1)
+
+  def testPrefetchHit(self):
+    self._Run()
+    testset = FakeTestset(self.testset.project)
+    testcase = test.TestCase(testset, self.testcase.infile)
+    testset._PrefetchTestResults(self.solution, [testcase], self.ui)
+    result = taskgraph.SerialTaskGraph().Run(
+      testset._TestOneCase(self.solution, testcase, self.ui))
+    self.assertTrue(result.cached)
+    self.assertEqual(result.verdict, test.TestCaseResult.AC)
+    self.assertEqual(testset.runs, 0)
+
+  def testWithoutCache(self):
+    self.ui.options.cache_tests = False
+    self._Run()
+    self.assertFalse(self._Run().cached)
+    self.assertEqual(self.testset.runs, 2)
+
+
+class ListTestCasesTest(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.testset = FakeTestset(FakeProject(), self.tmpdir)
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+    files.InvalidatePath()
+
+  def _Write(self, *names):
+    for name in names:
+      files.WriteFile('', os.path.join(self.tmpdir, name))
+
+  def _Remove(self, name):
+    os.remove(os.path.join(self.tmpdir, name))
+    files.InvalidatePath(os.path.join(self.tmpdir, name))
+
+  def _List(self):
+    return [(os.path.basename(t.infile), os.path.basename(t.difffile))
+            for t in self.testset.ListTestCases()]
+
+  def testRefreshed(self):
+    self._Write('1.in', '1.diff', '2.in')
+    self.assertEqual(self._List(), [('1.in', '1.diff'), ('2.in', '2.diff')])
+    # Test cases are the same objects while files are unchanged.
+    testcases = self.testset.ListTestCases()
+    self.assertEqual(self.testset.ListTestCases(), testcases)
+    self._Write('3.in.gz', '3.diff.gz')
+    self.assertEqual(self._List(), [('1.in', '1.diff'), ('2.in', '2.diff'),
+                                    ('3.in.gz', '3.diff.gz')])
+    self._Remove('2.in')
+    self.assertEqual(self._List(), [('1.in', '1.diff'),
+                                    ('3.in.gz', '3.diff.gz')])
+
+  def testCompressedDiff(self):
+    self._Write('1.in')
+    self.testset.project.output_compression = '.gz'
+    self.assertEqual(self._List(), [('1.in', '1.diff.gz')])
+    self._Write('1.diff.zst')
+    self.assertEqual(self._List(), [('1.in', '1.diff.zst')])
+    self._Write('1.diff')
+    self.assertEqual(self._List(), [('1.in', '1.diff')])
+    self._Remove('1.diff')
+    self._Remove('1.diff.zst')
+    self.assertEqual(self._List(), [('1.in', '1.diff.gz')])
+
+  def testFindTestCases(self):
+    self._Write('1.in', '2.in', '10.in', 'a_1.in', 'a_2.in.gz', 'b.in',
+                'sample.in', '1.diff', 'x.txt')
+    testcases = self.testset.ListTestCases()
+    for pattern in ['*', '*.in', '?.in', '1*', 'a_*', '[ab]*', '*.gz',
+                    'sample.in', 'missing', '*.diff']:
+      expected = [t for t in testcases
+                  if fnmatch.fnmatch(os.path.basename(t.infile), pattern)]
+      self.assertEqual(self.testset.FindTestCases(pattern), expected)
+    self._Write('a_3.in')
+    self.assertEqual(
+      [os.path.basename(t.infile) for t in self.testset.FindTestCases('a_*')],
+      ['a_1.in', 'a_2.in.gz', 'a_3.in'])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,147 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+import os
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from rime.core import taskgraph
+from rime.util import files
+from tests import plugin_loader
+from tests import project_fixture
+
+build_cache = plugin_loader.ImportPlugin('rime.plugins.plus.build_cache')
+
+
+class BuildCacheTest(unittest.TestCase):
+  def setUp(self):
+    self.restore_plugin = plugin_loader.InstallPlugin('rime.plugins.rime_plus')
+    self.tmpdir = tempfile.mkdtemp()
+    project_fixture.CreateProject(self.tmpdir)
+    # The output of case 2 is made by the reference solution.
+    os.remove(os.path.join(self.tmpdir, 'a+b/tests/2.diff'))
+    # Programs leave marks in the log to count their runs.
+    self.log = os.path.join(self.tmpdir, 'runs.log')
+    self._WriteValidator('')
+    self._WriteReferenceSolution('a + b')
+    self.project = None
+
+  def tearDown(self):
+    if self.project is not None:
+      self.project.CloseCaches()
+    shutil.rmtree(self.tmpdir)
+    self.restore_plugin()
+
+  def _WriteValidator(self, suffix):
+    project_fixture.WriteFile(
+      self.tmpdir, 'a+b/tests/validator.py',
+      project_fixture.VALIDATOR + "open(%r, 'a').write('V')\n%s" %
+      (self.log, suffix))
+
+  def _WriteReferenceSolution(self, expr):
+    project_fixture.WriteFile(
+      self.tmpdir, 'a+b/correct/main.py', project_fixture.SHEBANG + """
+import sys
+a, b = map(int, sys.stdin.read().split())
+open(%r, 'a').write('R')
+print %s
+""" % (self.log, expr))
+
+  def _Build(self, clean=True):
+    """Builds the testset as a new run does.
+
+    Returns the number of runs of the validator and the reference solution,
+    and the testset.
+    """
+    if self.project is not None:
+      self.project.CloseCaches()
+    files.InvalidatePath()
+    self.project, ui = project_fixture.LoadProject(self.tmpdir)
+    testset = self.project.FindByBaseDir(os.path.join(self.tmpdir, 'a+b/tests'))
+    if clean:
+      files.RemoveTree(testset.out_dir)
+    files.WriteFile('', self.log)
+    self.assertTrue(taskgraph.SerialTaskGraph().Run(testset.Build(ui)))
+    self.assertEqual(ui.errors.errors, [])
+    runs = files.ReadFile(self.log)
+    return runs.count('V'), runs.count('R'), testset
+
+  def _ReadOutput(self, testset):
+    return files.ReadFile(os.path.join(testset.out_dir, '2.diff'))
+
+  def testReused(self):
+    self.assertEqual(self._Build()[:2], (2, 1))
+    validations, references, testset = self._Build()
+    self.assertEqual((validations, references), (0, 0))
+    self.assertEqual(self._ReadOutput(testset), '70\n')
+
+  def testValidatorChanged(self):
+    self._Build()
+    self._WriteValidator('# changed\n')
+    self.assertEqual(self._Build(clean=False)[:2], (2, 0))
+    self.assertEqual(self._Build()[:2], (0, 0))
+
+  def testReferenceSolutionChanged(self):
+    self._Build()
+    self._WriteReferenceSolution('b + a')
+    validations, references, testset = self._Build(clean=False)
+    self.assertEqual((validations, references), (0, 1))
+    self.assertEqual(self._ReadOutput(testset), '70\n')
+
+  def testInputChanged(self):
+    self._Build()
+    project_fixture.WriteFile(self.tmpdir, 'a+b/tests/2.in', '5 6\n')
+    validations, references, testset = self._Build(clean=False)
+    self.assertEqual((validations, references), (1, 1))
+    self.assertEqual(self._ReadOutput(testset), '11\n')
+
+  def testStaleReferenceOutputNotRestored(self):
+    self._Build()
+    self._WriteReferenceSolution('a + b + 1')
+    validations, references, testset = self._Build()
+    self.assertEqual(references, 1)
+    self.assertEqual(self._ReadOutput(testset), '71\n')
+    # The output for the previous source is restored if it comes back.
+    self._WriteReferenceSolution('a + b')
+    validations, references, testset = self._Build()
+    self.assertEqual(references, 0)
+    self.assertEqual(self._ReadOutput(testset), '70\n')
+
+  def testMissingBlobRecomputed(self):
+    testset = self._Build()[2]
+    files.RemoveTree(testset.project.GetContentStore().root)
+    validations, references, testset = self._Build()
+    self.assertEqual((validations, references), (0, 1))
+    self.assertEqual(self._ReadOutput(testset), '70\n')
+
+  def testStaticOutputNotReplaced(self):
+    self._Build()
+    project_fixture.WriteFile(self.tmpdir, 'a+b/tests/2.diff', '0\n')
+    validations, references, testset = self._Build()
+    self.assertEqual(references, 0)
+    self.assertEqual(self._ReadOutput(testset), '0\n')
+
+
+if __name__ == '__main__':
+  unittest.main()
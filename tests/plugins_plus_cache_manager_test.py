@@ -0,0 +1,229 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+import os
+import os.path
+import shutil
+import tempfile
+import time
+import unittest
+
+from rime.core import taskgraph
+from rime.util import files
+from tests import plugin_loader
+from tests import project_fixture
+
+cache_manager = plugin_loader.ImportPlugin('rime.plugins.plus.cache_manager')
+build_cache = plugin_loader.ImportPlugin('rime.plugins.plus.build_cache')
+
+NAMESPACE = 'test_result'
+
+
+class GetDirSizeTest(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+
+  def testSize(self):
+    files.WriteFile('a' * 10, os.path.join(self.tmpdir, 'a'))
+    files.MakeDir(os.path.join(self.tmpdir, 'sub'))
+    files.WriteFile('b' * 20, os.path.join(self.tmpdir, 'sub', 'b'))
+    self.assertEqual(cache_manager.GetDirSize(self.tmpdir), 30)
+
+  def testHardLinksCountedOnce(self):
+    blob = os.path.join(self.tmpdir, 'blob')
+    files.WriteFile('a' * 10, blob)
+    out_dir = os.path.join(self.tmpdir, 'out')
+    files.MakeDir(out_dir)
+    os.link(blob, os.path.join(out_dir, 'a'))
+    os.link(blob, os.path.join(out_dir, 'b'))
+    files.WriteFile('c' * 20, os.path.join(out_dir, 'c'))
+    self.assertEqual(cache_manager.GetDirSize(out_dir), 30)
+    counted = set()
+    cache_manager._AddInode(blob, counted)
+    self.assertEqual(cache_manager.GetDirSize(out_dir, counted), 20)
+    self.assertEqual(cache_manager.GetDirSize(out_dir, counted), 0)
+
+
+class CacheManagerTest(unittest.TestCase):
+  def setUp(self):
+    self.restore_plugin = plugin_loader.InstallPlugin('rime.plugins.rime_plus')
+    self.tmpdir = tempfile.mkdtemp()
+    project_fixture.CreateProject(self.tmpdir)
+    self.project, self.ui = project_fixture.LoadProject(self.tmpdir)
+    self.manager = cache_manager.CacheManager(self.project)
+    self.store = self.manager.store
+    self.content_store = self.manager.content_store
+
+  def tearDown(self):
+    self.project.CloseCaches()
+    shutil.rmtree(self.tmpdir)
+    self.restore_plugin()
+
+  def _PutEntry(self, namespace, key, value, last_used):
+    self.store.Put(namespace, key, value)
+    self.store.Flush()
+    self.store.conn.execute(
+      'UPDATE entries SET last_used = ? WHERE namespace = ? AND key = ?',
+      (last_used, namespace, key))
+    self.store.conn.commit()
+
+  def _PutBlob(self, content, last_used):
+    path = os.path.join(self.tmpdir, 'blob')
+    files.WriteFile(content, path)
+    digest = self.content_store.Put(path)
+    os.remove(path)
+    self.store.Flush()
+    self.store.conn.execute(
+      'UPDATE blobs SET last_used = ? WHERE digest = ?', (last_used, digest))
+    self.store.conn.commit()
+    return digest
+
+  def _GetKeys(self, category):
+    return sorted(item.key for item in self.manager.ListItems()
+                  if item.category == category)
+
+  def _Build(self, name, last_used):
+    component = self.project.FindByBaseDir(
+      os.path.join(self.tmpdir, 'a+b', name))
+    self.assertTrue(taskgraph.SerialTaskGraph().Run(component.Build(self.ui)))
+    os.utime(component.stamp_file, (last_used, last_used))
+    return component
+
+  def testListItems(self):
+    self._PutEntry(NAMESPACE, 'key', 'value', 1000)
+    digest = self._PutBlob('blob', 1000)
+    solution = self._Build('correct', 1000)
+    items = dict((item.category, item) for item in self.manager.ListItems())
+    self.assertEqual(items[NAMESPACE].key, (NAMESPACE, 'key'))
+    self.assertEqual(items[NAMESPACE].last_used, 1000)
+    self.assertEqual(items[cache_manager.OBJECTS_CATEGORY].key, digest)
+    self.assertEqual(items[cache_manager.OBJECTS_CATEGORY].size, 4)
+    self.assertEqual(items[cache_manager.BUILD_CATEGORY].key,
+                     solution.out_dir)
+    self.assertEqual(items[cache_manager.BUILD_CATEGORY].owner, 'a+b')
+    self.assertEqual(items[cache_manager.BUILD_CATEGORY].last_used, 1000)
+
+  def testCollectLeastRecentlyUsed(self):
+    for i in xrange(4):
+      self._PutEntry(NAMESPACE, 'key%d' % i, 'value', 1000 + i)
+    digest = self._PutBlob('blob', 1001.5)
+    items = self.manager.ListItems()
+    sizes = dict((item.key, item.size) for item in items)
+    limit = (self.manager.GetTotalSize(items) -
+             sizes[(NAMESPACE, 'key0')] - sizes[(NAMESPACE, 'key1')])
+    evicted = self.manager.Collect(limit)
+    self.assertEqual([item.key for item in evicted],
+                     [(NAMESPACE, 'key0'), (NAMESPACE, 'key1')])
+    self.assertEqual(self._GetKeys(NAMESPACE),
+                     [(NAMESPACE, 'key2'), (NAMESPACE, 'key3')])
+    self.assertEqual(self._GetKeys(cache_manager.OBJECTS_CATEGORY), [digest])
+    self.assertTrue(self.manager.GetTotalSize() <= limit)
+    # Further items are evicted in the order of their last use.
+    evicted = self.manager.Collect(limit - 1)
+    self.assertEqual([item.key for item in evicted], [digest])
+    self.assertFalse(self.content_store.Has(digest))
+    self.assertTrue(self.manager.GetTotalSize() <= limit - 1)
+
+  def testCollectBuildOutputs(self):
+    self._PutEntry(NAMESPACE, 'key', 'value', 1001)
+    testset = self._Build('tests', 1000)
+    [item] = [item for item in self.manager.ListItems()
+              if item.key == testset.out_dir]
+    self.assertTrue(item.size > 0)
+    evicted = self.manager.Collect(self.manager.GetTotalSize() - item.size)
+    self.assertEqual([item.key for item in evicted], [testset.out_dir])
+    self.assertFalse(os.path.exists(testset.out_dir))
+    self.assertEqual(self._GetKeys(NAMESPACE), [(NAMESPACE, 'key')])
+
+  def testCollectKeepsRecentItems(self):
+    for i in xrange(4):
+      self._PutEntry(NAMESPACE, 'key%d' % i, 'value', 1000 + i)
+    evicted = self.manager.Collect(0, keep_since=1002)
+    self.assertEqual(len(evicted), 2)
+    self.assertEqual(self._GetKeys(NAMESPACE),
+                     [(NAMESPACE, 'key2'), (NAMESPACE, 'key3')])
+
+  def testCollectNothingWithinLimit(self):
+    self._PutEntry(NAMESPACE, 'key', 'value', 1000)
+    self._PutBlob('blob', 1000)
+    self.assertEqual(self.manager.Collect(self.manager.GetTotalSize()), [])
+    self.assertEqual(len(self.manager.ListItems()), 2)
+
+  def testCollectRemovesDanglingReferenceOutputs(self):
+    namespace = build_cache.REFERENCE_OUTPUT_NAMESPACE
+    digest = self._PutBlob('3\n', 1000)
+    self._PutEntry(namespace, 'case', digest, 1001)
+    self._PutEntry(NAMESPACE, 'key', 'value', 1002)
+    evicted = self.manager.Collect(self.manager.GetTotalSize() - 1)
+    self.assertEqual([item.key for item in evicted], [digest])
+    self.assertEqual(self._GetKeys(namespace), [])
+    self.assertEqual(self._GetKeys(NAMESPACE), [(NAMESPACE, 'key')])
+
+  def testVerify(self):
+    namespace = build_cache.REFERENCE_OUTPUT_NAMESPACE
+    good = self._PutBlob('good', 1000)
+    bad = self._PutBlob('bad', 1000)
+    self._PutEntry(namespace, 'good', good, 1000)
+    self._PutEntry(namespace, 'bad', bad, 1000)
+    self._PutEntry(namespace, 'missing', '0' * 40, 1000)
+    self._PutEntry(NAMESPACE, 'key', 'value', 1000)
+    path = self.content_store.GetPath(bad)
+    os.chmod(path, 0644)
+    with open(path, 'w') as f:
+      f.write('corrupted')
+    self.assertEqual(sorted(self.manager.Verify()), sorted([
+        '%s: corrupted blob' % bad,
+        '%s/bad: missing blob' % namespace,
+        '%s/missing: missing blob' % namespace,
+        ]))
+    self.assertFalse(self.content_store.Has(bad))
+    self.assertTrue(self.content_store.Has(good))
+    self.assertEqual(self._GetKeys(namespace), [(namespace, 'good')])
+    self.assertEqual(self._GetKeys(NAMESPACE), [(NAMESPACE, 'key')])
+    self.assertEqual(self.manager.Verify(), [])
+
+  def testClear(self):
+    self._PutEntry(NAMESPACE, 'key', 'value', 1000)
+    self._PutBlob('blob', 1000)
+    self.manager.Clear()
+    self.assertEqual(self._GetKeys(NAMESPACE), [])
+    self.assertEqual(self._GetKeys(cache_manager.OBJECTS_CATEGORY), [])
+    self.assertFalse(os.path.exists(self.content_store.root))
+
+  def testCollectGarbageAfterCommand(self):
+    self._PutEntry(NAMESPACE, 'old', 'value', 1000)
+    cache_manager._RecordCommandStart(self.ui)
+    self._PutEntry(NAMESPACE, 'new', 'value', time.time())
+    self.project.cache_size_limit = None
+    cache_manager._CollectGarbage(self.ui)
+    self.assertEqual(len(self._GetKeys(NAMESPACE)), 2)
+    # Items used in the command are kept even beyond the limit.
+    self.project.cache_size_limit = 0
+    cache_manager._CollectGarbage(self.ui)
+    self.assertEqual(self._GetKeys(NAMESPACE), [(NAMESPACE, 'new')])
+
+
+if __name__ == '__main__':
+  unittest.main()
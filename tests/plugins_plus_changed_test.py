@@ -0,0 +1,166 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+import os.path
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from rime.core import taskgraph
+from rime.util import files
+from tests import plugin_loader
+from tests import project_fixture
+
+changed = plugin_loader.ImportPlugin('rime.plugins.plus.changed')
+
+
+class ChangedTestBase(unittest.TestCase):
+  def setUp(self):
+    self.restore_plugin = plugin_loader.InstallPlugin('rime.plugins.rime_plus')
+    self.tmpdir = tempfile.mkdtemp()
+    project_fixture.CreateProject(self.tmpdir)
+    self.project, self.ui = project_fixture.LoadProject(self.tmpdir)
+    self.testset = self._Find('a+b/tests')
+    self.correct = self._Find('a+b/correct')
+    self.wrong = self._Find('a+b/wrong')
+
+  def tearDown(self):
+    self.project.CloseCaches()
+    shutil.rmtree(self.tmpdir)
+    self.restore_plugin()
+
+  def _Find(self, relpath):
+    return self.project.FindByBaseDir(os.path.join(self.tmpdir, relpath))
+
+  def _Write(self, relpath, content):
+    project_fixture.WriteFile(self.tmpdir, relpath, content)
+    files.InvalidatePath()
+
+
+class SummaryTest(ChangedTestBase):
+  def _TestWrong(self):
+    [result] = taskgraph.SerialTaskGraph().Run(
+      self.testset.TestSolution(self.wrong, self.ui))
+    return result
+
+  def testLoadSavedSummary(self):
+    result = self._TestWrong()
+    summary = changed.LoadSummary(self.testset, self.wrong)
+    self.assertTrue(summary.IsCached())
+    self.assertEqual(summary.expected, result.expected)
+    self.assertEqual(summary.detail, result.detail)
+    self.assertEqual(
+      [os.path.basename(t.infile) for t in summary.testcases],
+      [os.path.basename(t.infile) for t in result.testcases])
+    for testcase, saved in zip(result.testcases, summary.testcases):
+      self.assertTrue(summary.results[saved].verdict is
+                      result.results[testcase].verdict)
+      self.assertEqual(summary.results[saved].time,
+                       result.results[testcase].time)
+
+  def testNoSummary(self):
+    self.assertTrue(changed.LoadSummary(self.testset, self.wrong) is None)
+
+  def testSourcesChanged(self):
+    self._TestWrong()
+    for relpath, content in [
+        ('a+b/wrong/main.py', project_fixture.CORRECT_SOLUTION),
+        ('a+b/wrong/extra.txt', ''),
+        ('a+b/tests/validator.py', project_fixture.VALIDATOR + '\n'),
+        ('a+b/correct/main.py', project_fixture.CORRECT_SOLUTION + '\n'),
+        ('a+b/PROBLEM', "problem(title='A+B', id='A', time_limit=2.0)\n"),
+        ('PROJECT', "use_plugin('rime_plus')\nproject(library_dir='lib')\n"
+         "# edited\n"),
+        ]:
+      path = os.path.join(self.tmpdir, relpath)
+      original = files.ReadFile(path) if os.path.exists(path) else None
+      self._Write(relpath, content)
+      self.assertTrue(changed.LoadSummary(self.testset, self.wrong) is None,
+                      relpath)
+      # The summary is found again for the same contents.
+      if original is None:
+        os.remove(path)
+      else:
+        self._Write(relpath, original)
+      files.InvalidatePath()
+      self.assertFalse(changed.LoadSummary(self.testset, self.wrong) is None,
+                       relpath)
+
+  def testOtherSolutionChanged(self):
+    self._TestWrong()
+    self._Write('a+b/other/main.py', project_fixture.WRONG_SOLUTION)
+    self.assertFalse(changed.LoadSummary(self.testset, self.wrong) is None)
+
+
+class TestChangedTest(ChangedTestBase):
+  def _Git(self, *args):
+    subprocess.check_call(
+      ['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com'] +
+      list(args), cwd=self.tmpdir)
+
+  def _RunTest(self, rev):
+    self.ui.options['changed'] = rev
+    # Tasks are memoized in a graph, so each run needs a new one.
+    self.ui.graph = taskgraph.SerialTaskGraph()
+    cmd = self.ui.commands['test']
+    task = cmd.Run(self.project, (self.tmpdir,), self.ui)
+    if task is None:
+      return None
+    results = self.ui.graph.Run(task)
+    return dict((result.solution, result) for result in results)
+
+  def setUp(self):
+    super(TestChangedTest, self).setUp()
+    self._Write('.gitignore', 'rime-out\n')
+    self._Git('init', '-q')
+    self._Git('add', '.')
+    self._Git('commit', '-q', '-m', 'initial')
+
+  def testChangedSolution(self):
+    self._RunTest('HEAD')
+    self._Write('a+b/wrong/main.py', project_fixture.CORRECT_SOLUTION)
+    results = self._RunTest('HEAD')
+    self.assertTrue(results[self.correct].IsCached())
+    self.assertTrue(results[self.correct].IsAccepted())
+    self.assertFalse(isinstance(results[self.wrong],
+                                changed.CachedTestsetResult))
+    # The wrong solution is now accepted unexpectedly.
+    self.assertTrue(results[self.wrong].IsAccepted())
+    self.assertFalse(results[self.wrong].expected)
+
+  def testNotTestedBefore(self):
+    results = self._RunTest('HEAD')
+    for solution in (self.correct, self.wrong):
+      self.assertFalse(isinstance(results[solution],
+                                  changed.CachedTestsetResult))
+      self.assertTrue(results[solution].expected)
+    self.assertTrue(results[self.correct].IsAccepted())
+    self.assertFalse(results[self.wrong].IsAccepted())
+
+  def testInvalidRevision(self):
+    self.assertTrue(self._RunTest('no-such-revision') is None)
+    self.assertEqual(len(self.ui.errors.errors), 1)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,104 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+import os
+import os.path
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from rime.util import files
+from tests import plugin_loader
+from tests import project_fixture
+
+daemon = plugin_loader.ImportPlugin('rime.plugins.plus.daemon')
+
+
+class FakeWriter(object):
+  def __init__(self):
+    self.data = []
+
+  def write(self, data):
+    self.data.append(data)
+
+  def isatty(self):
+    return False
+
+
+class OutputRedirectorTest(unittest.TestCase):
+  def testRedirectFds(self):
+    writer = FakeWriter()
+    stdout_stat = os.fstat(1)
+    with daemon.OutputRedirector(writer) as out:
+      out.write('console\n')
+      os.write(1, 'fd1\n')
+      subprocess.check_call(['sh', '-c', 'echo child; echo error >&2'])
+      sys.__stderr__.write('stderr\n')
+    output = ''.join(writer.data)
+    for line in ['console', 'fd1', 'child', 'error', 'stderr']:
+      self.assertTrue(line + '\n' in output, output)
+    # The file descriptors are restored.
+    self.assertEqual(os.fstat(1).st_ino, stdout_stat.st_ino)
+
+
+class DaemonSessionTest(unittest.TestCase):
+  def setUp(self):
+    self.restore_plugin = plugin_loader.InstallPlugin('rime.plugins.rime_plus')
+    self.tmpdir = tempfile.mkdtemp()
+    project_fixture.CreateProject(self.tmpdir)
+    project, ui = project_fixture.LoadProject(self.tmpdir)
+    self.session = daemon.DaemonSession(project, ui)
+
+  def tearDown(self):
+    self.session.watcher.Close()
+    if self.session.project is not None:
+      self.session.project.CloseCaches()
+    shutil.rmtree(self.tmpdir)
+    self.restore_plugin()
+
+  def testOutputDirsListedAgain(self):
+    out_dirs = [os.path.join(self.tmpdir, 'a+b', 'rime-out', 'tests'),
+                os.path.join(self.tmpdir, 'rime-out', 'run')]
+    for out_dir in out_dirs:
+      files.MakeDir(out_dir)
+      files.WriteFile('', os.path.join(out_dir, 'file'))
+      self.assertEqual(files.ListDir(out_dir), ['file'])
+    self.session._ProcessChanges()
+    # Files under rime-out are changed outside Rime.
+    for out_dir in out_dirs:
+      os.remove(os.path.join(out_dir, 'file'))
+    self.session._ProcessChanges()
+    for out_dir in out_dirs:
+      self.assertEqual(files.ListDir(out_dir), [])
+
+  def testProjectReloadedAfterConfigChange(self):
+    project_fixture.WriteFile(
+      self.tmpdir, 'a+b/PROBLEM',
+      "problem(title='A+B', id='A', time_limit=2.0)\n")
+    self.session._ProcessChanges()
+    self.assertTrue(self.session.project is None)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,124 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from tests import plugin_loader
+from tests import project_fixture
+
+impact = plugin_loader.ImportPlugin('rime.plugins.plus.impact')
+
+
+class FindAffectedTest(unittest.TestCase):
+  def setUp(self):
+    self.restore_plugin = plugin_loader.InstallPlugin('rime.plugins.rime_plus')
+    self.tmpdir = tempfile.mkdtemp()
+    project_fixture.CreateProject(self.tmpdir)
+    # The validator uses a library file.
+    project_fixture.WriteFile(
+      self.tmpdir, 'a+b/tests/TESTSET',
+      "script_validator(src='validator.py', dependency=['common.py'])\n")
+    project_fixture.WriteFile(self.tmpdir, 'lib/common.py', '')
+    self.project, self.ui = project_fixture.LoadProject(self.tmpdir)
+    self.problem = self._Find('a+b')
+    self.testset = self._Find('a+b/tests')
+    self.correct = self._Find('a+b/correct')
+    self.wrong = self._Find('a+b/wrong')
+
+  def tearDown(self):
+    self.project.CloseCaches()
+    shutil.rmtree(self.tmpdir)
+    self.restore_plugin()
+
+  def _Find(self, relpath):
+    return self.project.FindByBaseDir(os.path.join(self.tmpdir, relpath))
+
+  def _FindAffected(self, target, *relpaths):
+    return impact.FindAffected(
+      self.project, target,
+      [os.path.join(self.tmpdir, relpath) for relpath in relpaths])
+
+  def testSolution(self):
+    self.assertEqual(self._FindAffected(self.project, 'a+b/wrong/main.py'),
+                     {self.testset: set([self.wrong])})
+
+  def testReferenceSolution(self):
+    self.assertTrue(self.problem.reference_solution is self.correct)
+    self.assertEqual(self._FindAffected(self.project, 'a+b/correct/main.py'),
+                     {self.testset: None})
+
+  def testTestset(self):
+    self.assertEqual(self._FindAffected(self.project, 'a+b/tests/3.in'),
+                     {self.testset: None})
+
+  def testConfigFiles(self):
+    for relpath in ('PROJECT', 'a+b/PROBLEM'):
+      self.assertEqual(self._FindAffected(self.project, relpath),
+                       {self.testset: None})
+    self.assertEqual(self._FindAffected(self.project, 'a+b/wrong/SOLUTION'),
+                     {self.testset: set([self.wrong])})
+
+  def testLibrary(self):
+    self.assertEqual(self._FindAffected(self.project, 'lib/common.py'),
+                     {self.testset: None})
+    self.assertEqual(self._FindAffected(self.project, 'lib/unused.py'), {})
+
+  def testUnrelatedFiles(self):
+    self.assertEqual(self._FindAffected(self.project, 'README', 'b/PROBLEM'),
+                     {})
+
+  def testMultiplePaths(self):
+    self.assertEqual(
+      self._FindAffected(self.project, 'a+b/wrong/main.py', 'README'),
+      {self.testset: set([self.wrong])})
+    self.assertEqual(
+      self._FindAffected(self.project, 'a+b/wrong/main.py',
+                         'a+b/tests/validator.py'),
+      {self.testset: None})
+
+  def testNarrowedToTarget(self):
+    self.assertEqual(self._FindAffected(self.wrong, 'a+b/tests/validator.py'),
+                     {self.testset: set([self.wrong])})
+    self.assertEqual(self._FindAffected(self.correct, 'a+b/wrong/main.py'),
+                     {})
+    self.assertEqual(self._FindAffected(self.testset, 'a+b/wrong/main.py'),
+                     {self.testset: set([self.wrong])})
+
+  def testIsAffected(self):
+    affected = self._FindAffected(self.project, 'a+b/wrong/main.py')
+    self.assertTrue(impact.IsAffected(affected, self.testset, self.wrong))
+    self.assertFalse(impact.IsAffected(affected, self.testset, self.correct))
+    affected = self._FindAffected(self.project, 'a+b/tests/validator.py')
+    self.assertTrue(impact.IsAffected(affected, self.testset, self.correct))
+
+  def testListPairs(self):
+    pairs = [(self.testset, self.correct), (self.testset, self.wrong)]
+    self.assertEqual(sorted(impact.ListPairs(self.project)), sorted(pairs))
+    self.assertEqual(impact.ListPairs(self.wrong),
+                     [(self.testset, self.wrong)])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,258 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+import os
+import os.path
+import shutil
+import StringIO
+import tempfile
+import unittest
+
+from rime.basic import test
+from rime.core import taskgraph
+from rime.core import ui as ui_mod
+from rime.util import console as console_mod
+from rime.util import files
+from tests import plugin_loader
+from tests.core_taskgraph_test import FakeMemoStore
+
+merged_test = plugin_loader.ImportPlugin('rime.plugins.plus.merged_test')
+
+
+class FakeProblem(object):
+  timeout = 2.0
+
+
+class FakeTestset(merged_test.Testset):
+  """Testset with only what merged tests use."""
+
+  def __init__(self, out_dir, testcases):
+    self.out_dir = out_dir
+    self.problem = FakeProblem()
+    self.testcases = testcases
+    self.test_merger = None
+    self.merged_testcases = []
+    self.fullname = 'tests'
+
+  def FindTestCases(self, pattern):
+    return self.testcases
+
+
+class CountingMerger(merged_test.GCJMerger):
+  def __init__(self, output_replace=None):
+    super(CountingMerger, self).__init__(output_replace)
+    self.runs = 0
+
+  def Run(self, testcases, merged_testcase, ui):
+    self.runs += 1
+    super(CountingMerger, self).Run(testcases, merged_testcase, ui)
+
+
+class FakeSolution(object):
+  def IsCorrect(self):
+    return True
+
+
+class FakeResult(object):
+  expected = False
+
+
+def CreateUi():
+  return ui_mod.UiContext(None, console_mod.NullConsole(), {}, None)
+
+
+class MergedTestTestBase(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.chunk_size = merged_test._CHUNK_SIZE
+    # Small chunks make patterns and files span chunk boundaries.
+    merged_test._CHUNK_SIZE = 3
+
+  def tearDown(self):
+    merged_test._CHUNK_SIZE = self.chunk_size
+    shutil.rmtree(self.tmpdir)
+
+  def _CreateTestset(self, cases):
+    testset = FakeTestset(self.tmpdir, [])
+    for name, (indata, diffdata) in sorted(cases.items()):
+      basename = os.path.join(self.tmpdir, name)
+      files.WriteFile(indata, basename + merged_test.consts.IN_ORIGINAL_EXT)
+      files.WriteFile(diffdata, basename + merged_test.consts.DIFF_EXT)
+      testset.testcases.append(
+        test.TestCase(testset, basename + merged_test.consts.IN_EXT))
+    return testset
+
+
+class CaseNumReplaceTest(MergedTestTestBase):
+  def _Copy(self, replacer, i, data):
+    dst = StringIO.StringIO()
+    replacer.Copy(i, StringIO.StringIO(data), dst)
+    return dst.getvalue()
+
+  def testCopyMatchesReplace(self):
+    replacer = merged_test.CaseNumReplace('Case #1:', 'Case #{0}:')
+    for data in ['', 'Case #1:', 'Case #1: 1\nCase #1: 2\n', 'Case #1',
+                 'Case #Case #1:', 'xCase #1:yCase #1:z', 'ase #1: Case #1:',
+                 'CCase #1:' * 5]:
+      for prefix in ['', 'a', 'ab']:
+        self.assertEqual(self._Copy(replacer, 12, prefix + data),
+                         replacer(12, prefix + data))
+
+  def testCopySingleCharPattern(self):
+    replacer = merged_test.CaseNumReplace('#', '<{0}>')
+    self.assertEqual(self._Copy(replacer, 3, '#ab#cd##'), '<3>ab<3>cd<3><3>')
+
+  def testOldKeywordNames(self):
+    replacer = merged_test.CaseNumReplace(case_pattern='Case #1:',
+                                          case_replace='Case #{0}:')
+    self.assertEqual(replacer(2, 'Case #1: 3'), 'Case #2: 3')
+    self.assertRaises(TypeError, merged_test.CaseNumReplace, 'Case #1:')
+
+
+class TestMergerTest(MergedTestTestBase):
+  def testGCJMerger(self):
+    testset = self._CreateTestset({
+        '1': ('1 2\n', 'Case #1: 3\n'),
+        '2': ('30 40\n', 'Case #1: 70\n'),
+        })
+    merger = merged_test.GCJMerger(
+      merged_test.CaseNumReplace('Case #1:', 'Case #{0}:'))
+    merged = merged_test.MergedTestCase(testset, 'all', '*')
+    merger.Run(testset.testcases, merged, CreateUi())
+    self.assertEqual(files.ReadFile(merged.infile), '2\n1 2\n30 40\n')
+    self.assertEqual(files.ReadFile(merged.difffile),
+                     'Case #1: 3\nCase #2: 70\n')
+
+  def testICPCMerger(self):
+    testset = self._CreateTestset({
+        '1': ('1 2\n', '3\n'),
+        '2': ('30 40\n', '70\n'),
+        })
+    merger = merged_test.ICPCMerger('0 0\n')
+    merged = merged_test.MergedTestCase(testset, 'all', '*')
+    merger.Run(testset.testcases, merged, CreateUi())
+    self.assertEqual(files.ReadFile(merged.infile), '1 2\n30 40\n0 0\n')
+    self.assertEqual(files.ReadFile(merged.difffile), '3\n70\n')
+
+
+class GenerateMergedTestTest(MergedTestTestBase):
+  def setUp(self):
+    super(GenerateMergedTestTest, self).setUp()
+    taskgraph.SetMemoStore(FakeMemoStore())
+    self.testset = self._CreateTestset({
+        '1': ('1 2\n', 'Case #1: 3\n'),
+        '2': ('30 40\n', 'Case #1: 70\n'),
+        })
+    self.testset.test_merger = CountingMerger(
+      merged_test.CaseNumReplace('Case #1:', 'Case #{0}:'))
+    self.merged = merged_test.MergedTestCase(self.testset, 'all', '*')
+
+  def tearDown(self):
+    taskgraph.SetMemoStore(None)
+    super(GenerateMergedTestTest, self).tearDown()
+
+  def _Run(self):
+    return taskgraph.SerialTaskGraph().Run(
+      self.testset._GenerateMergedTest(self.merged, CreateUi()))
+
+  def testMemoize(self):
+    self.assertTrue(self._Run())
+    os.remove(self.merged.infile)
+    os.remove(self.merged.difffile)
+    self.assertTrue(self._Run())
+    self.assertEqual(self.testset.test_merger.runs, 1)
+    self.assertEqual(files.ReadFile(self.merged.infile), '2\n1 2\n30 40\n')
+    self.assertEqual(files.ReadFile(self.merged.difffile),
+                     'Case #1: 3\nCase #2: 70\n')
+
+  def testInvalidation(self):
+    self.assertTrue(self._Run())
+    files.WriteFile('Case #1: 4\n', os.path.join(self.tmpdir, '1.diff'))
+    self.assertTrue(self._Run())
+    self.assertEqual(self.testset.test_merger.runs, 2)
+    self.assertEqual(files.ReadFile(self.merged.difffile),
+                     'Case #1: 4\nCase #2: 70\n')
+
+  def testCustomReplacerNotMemoized(self):
+    self.testset.test_merger.output_replace = lambda i, src: src
+    self.assertTrue(self._Run())
+    self.assertTrue(self._Run())
+    self.assertEqual(self.testset.test_merger.runs, 2)
+
+
+class MergedTestCaseTest(MergedTestTestBase):
+  def testDefaultTimeout(self):
+    testset = self._CreateTestset({'1': ('', ''), '2': ('', ''), '3': ('', '')})
+    merged = merged_test.MergedTestCase(testset, 'all', '*')
+    self.assertEqual(merged.timeout, 6.0)
+
+  def testTimeLimit(self):
+    testset = self._CreateTestset({'1': ('', ''), '2': ('', '')})
+    merged = merged_test.MergedTestCase(testset, 'all', '*', time_limit=1.5)
+    self.assertEqual(merged.timeout, 1.5)
+
+
+class TestSolutionWithAllCasesTest(MergedTestTestBase):
+  def setUp(self):
+    super(TestSolutionWithAllCasesTest, self).setUp()
+    self.events = []
+    # Stub the method of the base class called by the merged test plugin.
+    self.base = merged_test.Testset.__mro__[1]
+    self.saved = self.base.__dict__.get('_TestSolutionWithAllCases')
+    events = self.events
+
+    @taskgraph.task_method
+    def _TestSolutionWithAllCases(testset, solution, ui):
+      events.append('normal start')
+      yield taskgraph.ExternalProcessTask(['sleep', '0.2'])
+      events.append('normal end')
+      yield FakeResult()
+    self.base._TestSolutionWithAllCases = _TestSolutionWithAllCases
+
+  def tearDown(self):
+    if self.saved is None:
+      del self.base._TestSolutionWithAllCases
+    else:
+      self.base._TestSolutionWithAllCases = self.saved
+    super(TestSolutionWithAllCasesTest, self).tearDown()
+
+  def testMergedCasesRunConcurrently(self):
+    events = self.events
+
+    class ConcurrentTestset(FakeTestset):
+      @taskgraph.task_method
+      def _TestSolutionWithMergedTests(self, solution, ui):
+        events.append('merged')
+        yield FakeResult()
+
+    testset = ConcurrentTestset(self.tmpdir, [])
+    testset.merged_testcases.append(
+      merged_test.MergedTestCase(testset, 'all', '*'))
+    graph = taskgraph.FiberTaskGraph(parallelism=2)
+    result = graph.Run(
+      testset._TestSolutionWithAllCases(FakeSolution(), CreateUi()))
+    self.assertTrue(isinstance(result, FakeResult))
+    self.assertEqual(events, ['normal start', 'merged', 'normal end'])
+
+
+if __name__ == '__main__':
+  unittest.main()
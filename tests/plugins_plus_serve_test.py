@@ -0,0 +1,98 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+import shutil
+import tempfile
+import unittest
+
+from rime.util import judge_server
+from tests import plugin_loader
+from tests import project_fixture
+
+serve = plugin_loader.ImportPlugin('rime.plugins.plus.serve')
+
+# Writes more than the output limit of the problem.
+FLOOD_SOLUTION = project_fixture.SHEBANG + """
+import sys
+sys.stdout.write('x' * 65536)
+"""
+
+
+class SubmissionRunnerTest(unittest.TestCase):
+  def setUp(self):
+    self.restore_plugin = plugin_loader.InstallPlugin('rime.plugins.rime_plus')
+    self.tmpdir = tempfile.mkdtemp()
+    project_fixture.CreateProject(self.tmpdir)
+    project_fixture.WriteFile(
+      self.tmpdir, 'a+b/PROBLEM',
+      "problem(title='A+B', id='A', time_limit=1.0, output_limit=1024)\n")
+    self.project, ui = project_fixture.LoadProject(self.tmpdir, 'serve')
+    self.runner = serve.SubmissionRunner(self.project, ui)
+
+  def tearDown(self):
+    self.project.CloseCaches()
+    shutil.rmtree(self.tmpdir)
+    self.restore_plugin()
+
+  def _Judge(self, *sources):
+    jobs = [judge_server.Job(i, {'problem': 'a+b', 'language': 'py',
+                                 'source': source})
+            for i, source in enumerate(sources)]
+    for job in jobs:
+      self.runner.Validate(job.request)
+    self.runner.RunBatch(jobs)
+    return [job.result for job in jobs]
+
+  def testVerdicts(self):
+    accepted, wrong, compile_error = self._Judge(
+      project_fixture.CORRECT_SOLUTION,
+      project_fixture.WRONG_SOLUTION,
+      '#!/nonexistent/python\n')
+    self.assertEqual(accepted['verdict'], 'Accepted')
+    self.assertEqual(accepted['errors'], [])
+    [testset] = accepted['testsets']
+    self.assertTrue(testset['accepted'])
+    self.assertEqual(len(testset['cases']), len(project_fixture.CASES))
+    self.assertEqual(wrong['verdict'], 'Wrong Answer')
+    self.assertEqual(compile_error['verdict'], 'Compile Error')
+    self.assertEqual(compile_error['testsets'], [])
+
+  def testOutputLimit(self):
+    [result] = self._Judge(FLOOD_SOLUTION)
+    self.assertEqual(result['verdict'], 'Output Limit Exceeded')
+
+  def testSameSourceCompiledOnce(self):
+    self._Judge(project_fixture.CORRECT_SOLUTION)
+    [result] = self._Judge(project_fixture.CORRECT_SOLUTION)
+    self.assertEqual(result['verdict'], 'Accepted')
+    self.assertEqual(self.runner.GetStats(),
+                     {'compiles': 1, 'compile_cache_hits': 1})
+
+  def testUnknownProblem(self):
+    job = judge_server.Job(0, {'problem': 'no-such-problem', 'language': 'py',
+                               'source': project_fixture.CORRECT_SOLUTION})
+    self.runner.RunBatch([job])
+    self.assertEqual(job.result['verdict'], 'Unknown problem')
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,161 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+import os
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from rime.util import files
+from tests import plugin_loader
+from tests import project_fixture
+
+snapshot = plugin_loader.ImportPlugin('rime.plugins.plus.snapshot')
+
+
+class SnapshotTest(unittest.TestCase):
+  def setUp(self):
+    self.restore_plugin = plugin_loader.InstallPlugin('rime.plugins.rime_plus')
+    self.tmpdir = tempfile.mkdtemp()
+    project_fixture.CreateProject(self.tmpdir)
+    self.projects = []
+    self.restored = []
+    self.restore_snapshot = snapshot.Problem.__dict__['_RestoreSnapshot']
+    def RestoreSnapshot(problem, path):
+      restored = self.restore_snapshot(problem, path)
+      self.restored.append(restored)
+      return restored
+    snapshot.Problem._RestoreSnapshot = RestoreSnapshot
+
+  def tearDown(self):
+    snapshot.Problem._RestoreSnapshot = self.restore_snapshot
+    for project in self.projects:
+      project.CloseCaches()
+    shutil.rmtree(self.tmpdir)
+    self.restore_plugin()
+
+  def _Load(self):
+    """Loads the problem as a new run does, and returns it."""
+    files.InvalidatePath()
+    project, ui = project_fixture.LoadProject(self.tmpdir)
+    self.projects.append(project)
+    problem = project.FindByBaseDir(os.path.join(self.tmpdir, 'a+b'))
+    self.assertEqual(ui.errors.errors, [])
+    return problem
+
+  def _IsRestored(self):
+    self._Load()
+    return self.restored[-1]
+
+  def _AssertDiscarded(self, relpath, content):
+    self._Load()
+    self.assertTrue(self._IsRestored())
+    project_fixture.WriteFile(self.tmpdir, relpath, content)
+    self.assertFalse(self._IsRestored(), relpath)
+    self.assertTrue(self._IsRestored(), relpath)
+
+  def testRestored(self):
+    problem = self._Load()
+    self.assertEqual(self.restored, [False])
+    restored = self._Load()
+    self.assertEqual(self.restored, [False, True])
+    self.assertEqual(sorted(s.name for s in restored.solutions),
+                     sorted(s.name for s in problem.solutions))
+    self.assertEqual([t.name for t in restored.testsets],
+                     [t.name for t in problem.testsets])
+    self.assertEqual(restored.reference_solution.name, 'correct')
+    self.assertEqual(restored.timeout, problem.timeout)
+    # Restored targets belong to the new project and problem.
+    for target in restored.solutions + restored.testsets:
+      self.assertTrue(target.problem is restored)
+      self.assertTrue(target.project is restored.project)
+    self.assertFalse(restored.project is problem.project)
+
+  def testProjectConfigEdited(self):
+    self._AssertDiscarded(
+      'PROJECT', "use_plugin('rime_plus')\nproject(library_dir='lib')\n"
+      "# edited\n")
+
+  def testProblemConfigEdited(self):
+    self._AssertDiscarded(
+      'a+b/PROBLEM', "problem(title='A+B', id='A', time_limit=2.0)\n")
+    self.assertEqual(self._Load().timeout, 2.0)
+
+  def testSolutionConfigEdited(self):
+    self._AssertDiscarded(
+      'a+b/wrong/SOLUTION',
+      "script_solution(src='main.py', challenge_cases=['1.in'])\n")
+    wrong = self._Load().FindByBaseDir(os.path.join(self.tmpdir, 'a+b/wrong'))
+    self.assertEqual(wrong.challenge_cases, ['1.in'])
+
+  def testTestsetConfigEdited(self):
+    self._AssertDiscarded(
+      'a+b/tests/TESTSET',
+      "script_validator(src='validator.py')\n# edited\n")
+
+  def testFileAddedToTestset(self):
+    self._AssertDiscarded('a+b/tests/3.in', '5 6\n')
+
+  def testFileRemovedFromTestset(self):
+    self._Load()
+    self.assertTrue(self._IsRestored())
+    os.remove(os.path.join(self.tmpdir, 'a+b/tests/2.diff'))
+    self.assertFalse(self._IsRestored())
+
+  def testSolutionAdded(self):
+    self._Load()
+    self.assertTrue(self._IsRestored())
+    project_fixture.WriteFile(self.tmpdir, 'a+b/other/SOLUTION',
+                              "script_solution(src='main.py')\n")
+    project_fixture.WriteFile(self.tmpdir, 'a+b/other/main.py',
+                              project_fixture.CORRECT_SOLUTION)
+    problem = self._Load()
+    self.assertFalse(self.restored[-1])
+    self.assertTrue('other' in [s.name for s in problem.solutions])
+
+  def testSourceChanged(self):
+    self._AssertDiscarded('a+b/wrong/main.py', project_fixture.WRONG_SOLUTION +
+                          '\n')
+    self._AssertDiscarded('a+b/tests/validator.py',
+                          project_fixture.VALIDATOR + '\n')
+
+  def testOtherFileChanged(self):
+    self._Load()
+    self.assertTrue(self._IsRestored())
+    project_fixture.WriteFile(self.tmpdir, 'a+b/tests/1.in', '10 20\n')
+    project_fixture.WriteFile(self.tmpdir, 'README', 'readme\n')
+    self.assertTrue(self._IsRestored())
+
+  def testNotSavedWithErrors(self):
+    project_fixture.WriteFile(self.tmpdir, 'a+b/broken/SOLUTION', 'error(\n')
+    files.InvalidatePath()
+    project, ui = project_fixture.LoadProject(self.tmpdir)
+    self.projects.append(project)
+    project.FindByBaseDir(os.path.join(self.tmpdir, 'a+b'))
+    self.assertNotEqual(ui.errors.errors, [])
+    self.assertFalse(os.path.exists(os.path.join(
+      self.tmpdir, 'a+b', 'rime-out', snapshot.consts.SNAPSHOT_FILE)))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from rime.util import files
+from tests import plugin_loader
+from tests import project_fixture
+
+watch = plugin_loader.ImportPlugin('rime.plugins.plus.watch')
+
+
+class FakeWatcher(object):
+  def __init__(self):
+    self.dirs = []
+
+  def AddTree(self, dir):
+    self.dirs.append(dir)
+
+  def RemoveTree(self, dir):
+    self.dirs.remove(dir)
+
+
+class WatchSessionTest(unittest.TestCase):
+  def setUp(self):
+    self.restore_plugin = plugin_loader.InstallPlugin('rime.plugins.rime_plus')
+    self.tmpdir = tempfile.mkdtemp()
+    project_fixture.CreateProject(self.tmpdir)
+    files.MakeDir(os.path.join(self.tmpdir, 'lib2'))
+    project, ui = project_fixture.LoadProject(self.tmpdir)
+    self.session = watch.WatchSession(
+      project, os.path.join(self.tmpdir, 'a+b'), ui)
+    self.session.target = project.FindByBaseDir(self.session.base_dir)
+    self.session.watcher = FakeWatcher()
+
+  def tearDown(self):
+    self.session.project.CloseCaches()
+    shutil.rmtree(self.tmpdir)
+    self.restore_plugin()
+
+  def _Path(self, relpath):
+    return os.path.join(self.tmpdir, relpath)
+
+  def _SetLibraryDir(self, library_dir):
+    project_fixture.WriteFile(
+      self.tmpdir, 'PROJECT',
+      "use_plugin('rime_plus')\nproject(library_dir=%r)\n" % library_dir)
+    self.assertTrue(self.session._Reload())
+
+  def testWatchedDirs(self):
+    self.session._UpdateWatchedDirs()
+    self.assertEqual(sorted(self.session.watcher.dirs),
+                     [self._Path('a+b'), self._Path('lib')])
+
+  def testLibraryDirChanged(self):
+    self.session._UpdateWatchedDirs()
+    self._SetLibraryDir('lib2')
+    self.assertEqual(sorted(self.session.watcher.dirs),
+                     [self._Path('a+b'), self._Path('lib2')])
+
+  def testLibraryDirRemoved(self):
+    self.session._UpdateWatchedDirs()
+    shutil.rmtree(self._Path('lib'))
+    self._SetLibraryDir('lib')
+    self.assertEqual(self.session.watcher.dirs, [self._Path('a+b')])
+
+
+if __name__ == '__main__':
+  unittest.main()
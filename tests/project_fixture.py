@@ -0,0 +1,116 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+"""Helpers to create small projects in tests."""
+
+import os
+import os.path
+import sys
+
+from rime.core import commands as commands_mod
+from rime.core import main
+from rime.core import ui as ui_mod
+from rime.util import console as console_mod
+from rime.util import files
+from rime.util import struct
+
+# Scripts are run by the interpreter named in their shebang lines.
+SHEBANG = '#!%s\n' % sys.executable
+
+VALIDATOR = SHEBANG + """
+import sys
+a, b = map(int, sys.stdin.read().split())
+assert 0 <= a <= 1000 and 0 <= b <= 1000
+"""
+
+CORRECT_SOLUTION = SHEBANG + """
+import sys
+a, b = map(int, sys.stdin.read().split())
+print a + b
+"""
+
+WRONG_SOLUTION = SHEBANG + """
+import sys
+a, b = map(int, sys.stdin.read().split())
+print a * b
+"""
+
+CASES = {
+  '1': ('1 2\n', '3\n'),
+  '2': ('30 40\n', '70\n'),
+  }
+
+
+def CreateProject(base_dir):
+  """Creates a project with problem a+b under base_dir.
+
+  The problem has testset tests with a validator and static cases, a correct
+  solution correct and a wrong solution wrong.
+  """
+  WriteFile(base_dir, 'PROJECT',
+            "use_plugin('rime_plus')\nproject(library_dir='lib')\n")
+  files.MakeDir(os.path.join(base_dir, 'lib'))
+  WriteFile(base_dir, 'a+b/PROBLEM',
+            "problem(title='A+B', id='A', time_limit=1.0)\n")
+  WriteFile(base_dir, 'a+b/tests/TESTSET',
+            "script_validator(src='validator.py')\n")
+  WriteFile(base_dir, 'a+b/tests/validator.py', VALIDATOR)
+  for name, (indata, diffdata) in CASES.items():
+    WriteFile(base_dir, 'a+b/tests/%s.in' % name, indata)
+    WriteFile(base_dir, 'a+b/tests/%s.diff' % name, diffdata)
+  WriteFile(base_dir, 'a+b/correct/SOLUTION',
+            "script_solution(src='main.py')\n")
+  WriteFile(base_dir, 'a+b/correct/main.py', CORRECT_SOLUTION)
+  WriteFile(base_dir, 'a+b/wrong/SOLUTION',
+            "script_solution(src='main.py', challenge_cases=[])\n")
+  WriteFile(base_dir, 'a+b/wrong/main.py', WRONG_SOLUTION)
+
+
+def LoadProject(base_dir, cmd_name='test', **options):
+  """Loads the project under base_dir.
+
+  Returns the project and a UI context with default options of the command,
+  overridden by options. Tasks run serially unless parallelism is given.
+  """
+  main.LoadRequiredModules(base_dir)
+  cmds = commands_mod.GetCommands()
+  values = cmds[cmd_name].GetDefaultOptionDict()
+  values['parallelism'] = 0
+  values.update(options)
+  ui = ui_mod.UiContext(struct.Struct(values), console_mod.NullConsole(),
+                        cmds, None)
+  project = main.LoadProject(base_dir, ui)
+  assert project is not None, ui.errors.errors
+  return project, ui
+
+
+def WriteFile(base_dir, relpath, content):
+  """Writes a file under base_dir with a later mtime than it had."""
+  path = os.path.join(base_dir, relpath)
+  files.MakeDir(os.path.dirname(path))
+  mtime = None
+  if os.path.exists(path):
+    mtime = os.stat(path).st_mtime
+  files.WriteFile(content, path)
+  # Edits within the timestamp granularity must still look newer.
+  if mtime is not None and os.stat(path).st_mtime <= mtime:
+    os.utime(path, (mtime + 1, mtime + 1))
@@ -0,0 +1,140 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import os
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from rime.util import cache_store
+from rime.util import cas
+from rime.util import files
+
+
+class CacheStoreTest(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.db_path = os.path.join(self.tmpdir, 'cache.db')
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+
+  def testPutGet(self):
+    store = cache_store.CacheStore(self.db_path)
+    self.assertEqual(store.Get('ns', 'key'), None)
+    store.Put('ns', 'key', {'verdict': 'Accepted', 'time': 0.5})
+    self.assertEqual(store.Get('ns', 'key'),
+                     {'verdict': 'Accepted', 'time': 0.5})
+    self.assertEqual(store.Get('other', 'key', 'default'), 'default')
+    store.Close()
+
+  def testPersistence(self):
+    store = cache_store.CacheStore(self.db_path)
+    store.Put('ns', 'key', 42)
+    store.Close()
+    store = cache_store.CacheStore(self.db_path)
+    self.assertEqual(store.Get('ns', 'key'), 42)
+    store.Close()
+
+  def testGetMany(self):
+    store = cache_store.CacheStore(self.db_path)
+    for i in xrange(1000):
+      store.Put('ns', 'key%d' % i, i)
+    values = store.GetMany('ns', ['key%d' % i for i in xrange(0, 2000, 2)])
+    self.assertEqual(len(values), 500)
+    self.assertEqual(values['key998'], 998)
+    store.Close()
+
+  def testGetFileHash(self):
+    store = cache_store.CacheStore(self.db_path)
+    path = os.path.join(self.tmpdir, 'data')
+    files.WriteFile('hello', path)
+    self.assertEqual(store.GetFileHash(path), files.GetFileHash(path))
+    store.Close()
+
+  def testLastRunStats(self):
+    store = cache_store.CacheStore(self.db_path)
+    store.Put('ns', 'key', 1)
+    store.Get('ns', 'key')
+    store.GetMany('ns', ['key', 'missing1', 'missing2'])
+    store.Close()
+    store = cache_store.CacheStore(self.db_path)
+    hits, misses, timestamp = store.GetLastRunStats()['ns']
+    self.assertEqual((hits, misses), (2, 2))
+    store.Close()
+
+  def testListAndDeleteEntries(self):
+    store = cache_store.CacheStore(self.db_path)
+    store.Put('ns', 'a', 1)
+    store.Put('ns', 'b', 2)
+    self.assertEqual(sorted(entry[1] for entry in store.ListEntries()),
+                     ['a', 'b'])
+    store.DeleteEntries([('ns', 'a')])
+    self.assertEqual(store.Items('ns'), [('b', 2)])
+    store.Close()
+
+  def testBlobsLastUsed(self):
+    store = cache_store.CacheStore(self.db_path)
+    store.MarkBlobsUsed(['a', 'b'])
+    store.Close()
+    store = cache_store.CacheStore(self.db_path)
+    self.assertEqual(sorted(store.GetBlobsLastUsed()), ['a', 'b'])
+    store.DeleteBlobs(['a'])
+    self.assertEqual(sorted(store.GetBlobsLastUsed()), ['b'])
+    store.Close()
+
+
+class ContentStoreTest(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+
+  def testPutGet(self):
+    store = cas.ContentStore(os.path.join(self.tmpdir, 'objects'))
+    src = os.path.join(self.tmpdir, 'src')
+    dst = os.path.join(self.tmpdir, 'dst')
+    files.WriteFile('hello', src)
+    digest = store.Put(src)
+    self.assertTrue(store.Has(digest))
+    self.assertTrue(store.Get(digest, dst))
+    self.assertEqual(files.ReadFile(dst), 'hello')
+    self.assertFalse(store.Get('0' * 40, dst))
+
+  def testListBlobsAndVerify(self):
+    store = cas.ContentStore(os.path.join(self.tmpdir, 'objects'))
+    src = os.path.join(self.tmpdir, 'src')
+    files.WriteFile('hello', src)
+    digest = store.Put(src)
+    self.assertEqual([blob[0] for blob in store.ListBlobs()], [digest])
+    self.assertTrue(store.Verify(digest))
+    files.AppendFile('!', store.GetPath(digest))
+    self.assertFalse(store.Verify(digest))
+    store.Remove(digest)
+    self.assertFalse(store.Has(digest))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,88 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import os
+import os.path
+import shutil
+import tempfile
+import time
+import unittest
+
+from rime.util import cache_store
+from rime.util import cas
+from rime.util import files
+
+
+class ContentStoreTest(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.store = cas.ContentStore(os.path.join(self.tmpdir, 'objects'))
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+    files.InvalidatePath()
+
+  def _Path(self, name):
+    return os.path.join(self.tmpdir, name)
+
+  def testDedupSharesContent(self):
+    files.WriteFile('same', self._Path('a'))
+    files.WriteFile('same', self._Path('b'))
+    digest = self.store.Dedup(self._Path('a'))
+    self.assertEqual(self.store.Dedup(self._Path('b')), digest)
+    self.assertTrue(os.path.samefile(self._Path('a'), self._Path('b')))
+    self.assertTrue(self.store.Verify(digest))
+    # Writes to a deduplicated file must not reach the blob.
+    files.WriteFile('changed', self._Path('a'))
+    self.assertEqual(files.ReadFile(self._Path('b')), 'same')
+    self.assertTrue(self.store.Verify(digest))
+
+  def testPutCopiesByDefault(self):
+    files.WriteFile('data', self._Path('a'))
+    digest = self.store.Put(self._Path('a'))
+    self.assertFalse(
+      os.path.samefile(self._Path('a'), self.store.GetPath(digest)))
+    self.assertTrue(self.store.Get(digest, self._Path('c')))
+    self.assertEqual(files.ReadFile(self._Path('c')), 'data')
+    self.assertFalse(self.store.Get('0' * 40, self._Path('d')))
+
+  def testLastUsed(self):
+    db = cache_store.CacheStore(self._Path('cache.db'))
+    store = cas.ContentStore(self._Path('objects'), cache_store=db)
+    files.WriteFile('data', self._Path('a'))
+    digest = store.Dedup(self._Path('a'))
+    os.utime(self._Path('a'), (1000000000, 1000000000))
+    now = time.time()
+    self.assertTrue(store.Get(digest, self._Path('b')))
+    # Files linked to the blob keep their modification time.
+    self.assertEqual(os.path.getmtime(self._Path('a')), 1000000000)
+    (listed_digest, _, _, last_used), = list(store.ListBlobs())
+    self.assertEqual(listed_digest, digest)
+    self.assertTrue(last_used >= now)
+    store.Remove(digest)
+    self.assertEqual(db.GetBlobsLastUsed(), {})
+    db.Close()
+
+
+if __name__ == '__main__':
+  unittest.main()
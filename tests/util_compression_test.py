@@ -0,0 +1,77 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import os
+import os.path
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from rime.util import compression
+from rime.util import files
+
+
+class CompressionTest(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+    files.InvalidatePath()
+
+  def _Path(self, name):
+    return os.path.join(self.tmpdir, name)
+
+  def testExtension(self):
+    self.assertEqual(compression.GetExtension('a.in.gz'), '.gz')
+    self.assertEqual(compression.GetExtension('a.in'), '')
+    self.assertEqual(compression.StripExtension('a.in.zst'), 'a.in')
+    self.assertEqual(compression.StripExtension('a.in'), 'a.in')
+
+  def testStreams(self):
+    path = self._Path('a.in.gz')
+    with compression.OpenOutput(path) as f:
+      subprocess.check_call(['echo', 'hello'], stdout=f)
+    self.assertEqual(compression.ReadFile(path), 'hello\n')
+    with compression.OpenInput(path) as f:
+      self.assertEqual(subprocess.check_output(['cat'], stdin=f), 'hello\n')
+      # Rewinding restarts the stream.
+      f.seek(0)
+      self.assertEqual(subprocess.check_output(['cat'], stdin=f), 'hello\n')
+    compression.ExpandFile(path, self._Path('a.txt'))
+    self.assertEqual(files.ReadFile(self._Path('a.txt')), 'hello\n')
+
+  def testNamedPipes(self):
+    path = self._Path('a.in.gz')
+    with compression.OpenOutput(path) as f:
+      subprocess.check_call(['echo', 'hello'], stdout=f)
+    files.WriteFile('plain\n', self._Path('b.in'))
+    with compression.NamedPipes([path, self._Path('b.in'), path]) as paths:
+      self.assertEqual(paths[1], self._Path('b.in'))
+      self.assertEqual(files.ReadFile(paths[0]), 'hello\n')
+      # Pipes which are never read do not block leaving the block.
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import StringIO
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from rime.util import daemon
+
+
+class DaemonTest(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.socket_path = os.path.join(self.tmpdir, 'daemon.sock')
+    self.requests = []
+    self.server = daemon.DaemonServer(self.socket_path, self._Handle)
+    self.server.Bind()
+    self.thread = threading.Thread(target=self.server.Serve)
+    self.thread.daemon = True
+    self.thread.start()
+
+  def tearDown(self):
+    self.server.Stop()
+    self.thread.join()
+    shutil.rmtree(self.tmpdir)
+
+  def _Handle(self, request, writer):
+    self.requests.append(request)
+    writer.write('hello %s\n' % ' '.join(request['argv']))
+    return 3
+
+  def testSendRequest(self):
+    out = StringIO.StringIO()
+    status = daemon.SendRequest(
+      self.socket_path, {'argv': ['rime', 'test']}, out)
+    self.assertEqual(status, 3)
+    self.assertEqual(out.getvalue(), 'hello rime test\n')
+    self.assertEqual(self.requests, [{'argv': ['rime', 'test']}])
+
+  def testIsAlive(self):
+    self.assertTrue(self.server.IsAlive())
+    self.assertRaises(daemon.socket.error,
+                      daemon.DaemonServer(self.socket_path, None).Bind)
+
+  def testNotRunning(self):
+    self.assertEqual(
+      daemon.SendRequest(os.path.join(self.tmpdir, 'missing.sock'),
+                         {'argv': []}, StringIO.StringIO()),
+      None)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,97 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import os
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from rime.util import files
+
+
+class FileSnapshotTest(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    files.InvalidatePath()
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+    files.InvalidatePath()
+
+  def _Path(self, *names):
+    return os.path.join(self.tmpdir, *names)
+
+  def testListDir(self):
+    files.MakeDir(self._Path('sub'))
+    files.WriteFile('a', self._Path('a.txt'))
+    files.WriteFile('b', self._Path('sub', 'b.txt'))
+    files.WriteFile('c', self._Path('.hidden'))
+    self.assertEqual(sorted(files.ListDir(self.tmpdir)), ['a.txt', 'sub'])
+    self.assertEqual(sorted(files.ListDir(self.tmpdir, True)),
+                     ['a.txt', 'sub', os.path.join('sub', 'b.txt')])
+    self.assertEqual(files.ListDir(self._Path('missing')), [])
+    self.assertEqual(files.ListDir(self._Path('a.txt')), [])
+
+  def testInvalidate(self):
+    files.MakeDir(self._Path('sub'))
+    self.assertEqual(files.ListDir(self._Path('sub')), [])
+    # Writes by others are not noticed until invalidated.
+    open(self._Path('sub', 'x'), 'w').close()
+    self.assertEqual(files.ListDir(self._Path('sub')), [])
+    files.InvalidatePath(self._Path('sub', 'x'))
+    self.assertEqual(files.ListDir(self._Path('sub')), ['x'])
+    # Writes through files are noticed.
+    files.WriteFile('y', self._Path('sub', 'y'))
+    self.assertEqual(sorted(files.ListDir(self._Path('sub'))), ['x', 'y'])
+    files.RemoveTree(self._Path('sub'))
+    self.assertEqual(files.ListDir(self.tmpdir), [])
+
+  def testGetLastModifiedUnder(self):
+    files.MakeDir(self._Path('sub'))
+    files.WriteFile('a', self._Path('sub', 'a'))
+    os.utime(self._Path('sub', 'a'), (1000000000, 1000000000))
+    os.utime(self._Path('sub'), (1000000000, 1000000000))
+    os.utime(self.tmpdir, (1000000000, 1000000000))
+    files.InvalidatePath()
+    self.assertEqual(files.GetLastModifiedUnder(self.tmpdir),
+                     files.GetModified(self._Path('sub', 'a')))
+    os.utime(self._Path('sub', 'a'), (1000000100, 1000000100))
+    files.InvalidatePath(self._Path('sub', 'a'))
+    self.assertEqual(files.GetLastModifiedUnder(self.tmpdir),
+                     files.GetModified(self._Path('sub', 'a')))
+
+  def testLinkFileDoesNotShareWrites(self):
+    files.WriteFile('src', self._Path('a'))
+    files.MakeDir(self._Path('out'))
+    files.LinkFile(self._Path('a'), self._Path('out'))
+    self.assertEqual(files.ReadFile(self._Path('out', 'a')), 'src')
+    # Copying over a linked file must not modify the source.
+    files.WriteFile('other', self._Path('b'))
+    files.CopyFile(self._Path('b'), self._Path('out', 'a'))
+    self.assertEqual(files.ReadFile(self._Path('out', 'a')), 'other')
+    self.assertEqual(files.ReadFile(self._Path('a')), 'src')
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,77 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import os
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from rime.util import files
+from rime.util import includes
+
+
+class IncludeClosureTest(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.src_dir = os.path.join(self.tmpdir, 'src')
+    self.lib_dir = os.path.join(self.tmpdir, 'lib')
+    files.MakeDir(self.src_dir)
+    files.MakeDir(self.lib_dir)
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+
+  def _Write(self, dir, name, content):
+    path = os.path.join(dir, name)
+    files.WriteFile(content, path)
+    return path
+
+  def testClosure(self):
+    main = self._Write(self.src_dir, 'main.cc',
+                       '#include <cstdio>\n'
+                       '#include "local.h"\n'
+                       '  #  include <a.h>\n')
+    local = self._Write(self.src_dir, 'local.h', '#include "b.h"\n')
+    a = self._Write(self.lib_dir, 'a.h', '#include "c.h"\n#include "a.h"\n')
+    b = self._Write(self.lib_dir, 'b.h', '')
+    c = self._Write(self.lib_dir, 'c.h', '')
+    self._Write(self.lib_dir, 'unused.h', '')
+    self.assertEqual(includes.GetIncludeClosure([main], [self.lib_dir]),
+                     sorted([local, a, b, c]))
+
+  def testQuotedPrefersIncludingDir(self):
+    main = self._Write(self.src_dir, 'main.c', '#include "a.h"\n')
+    local = self._Write(self.src_dir, 'a.h', '')
+    self._Write(self.lib_dir, 'a.h', '')
+    self.assertEqual(includes.GetIncludeClosure([main], [self.lib_dir]),
+                     [local])
+
+  def testNonSourceIgnored(self):
+    path = self._Write(self.src_dir, 'SOLUTION', '#include "a.h"\n')
+    self._Write(self.lib_dir, 'a.h', '')
+    self.assertEqual(includes.GetIncludeClosure([path], [self.lib_dir]), [])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,108 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import json
+import threading
+import unittest
+import urllib2
+
+from rime.util import judge_server
+
+
+class FakeRunner(object):
+  def __init__(self):
+    self.batches = []
+    self.release = threading.Event()
+
+  def Validate(self, request):
+    if 'source' not in request:
+      raise ValueError('source is missing')
+
+  def RunBatch(self, jobs):
+    self.release.wait()
+    self.batches.append([job.id for job in jobs])
+    for job in jobs:
+      job.result = {'length': len(job.request['source'])}
+
+  def GetStats(self):
+    return {'batches': len(self.batches)}
+
+
+class JudgeServerTest(unittest.TestCase):
+  def setUp(self):
+    self.runner = FakeRunner()
+    self.queue = judge_server.JobQueue(self.runner, 2)
+    self.server = judge_server.JudgeServer(('localhost', 0), self.queue)
+    self.url = 'http://localhost:%d' % self.server.server_address[1]
+    self.threads = [threading.Thread(target=self.server.serve_forever),
+                    threading.Thread(target=self.queue.Serve)]
+    for thread in self.threads:
+      thread.daemon = True
+      thread.start()
+
+  def tearDown(self):
+    self.runner.release.set()
+    self.queue.Stop()
+    self.server.shutdown()
+    self.server.server_close()
+    for thread in self.threads:
+      thread.join()
+
+  def _Open(self, path, request=None):
+    data = None if request is None else json.dumps(request)
+    return json.loads(urllib2.urlopen(self.url + path, data).read())
+
+  def testSubmitAndWait(self):
+    self.runner.release.set()
+    job = self._Open('/submit?wait=1', {'source': 'abc'})
+    self.assertEqual(job['state'], 'done')
+    self.assertEqual(job['result'], {'length': 3})
+    self.assertEqual(self._Open('/jobs/%s' % job['id']), job)
+
+  def testBatches(self):
+    jobs = [self._Open('/submit', {'source': 'x' * i}) for i in range(4)]
+    self.assertEqual(self._Open('/stats')['submitted'], 4)
+    self.runner.release.set()
+    for job in jobs:
+      self.queue.Get(job['id']).done.wait()
+    self.assertTrue(all(len(batch) <= 2 for batch in self.runner.batches))
+    self.assertEqual(sum(self.runner.batches, []), ['1', '2', '3', '4'])
+    stats = self._Open('/stats')
+    self.assertEqual(stats['finished'], 4)
+    self.assertEqual(stats['queued'], 0)
+    self.assertEqual(stats['batches'], len(self.runner.batches))
+
+  def testErrors(self):
+    for path, request, code in [('/submit', {}, 400),
+                                ('/submit', [], 400),
+                                ('/jobs/42', None, 404),
+                                ('/unknown', None, 404)]:
+      try:
+        self._Open(path, request)
+        self.fail('%s should fail' % path)
+      except urllib2.HTTPError as e:
+        self.assertEqual(e.code, code)
+
+
+if __name__ == '__main__':
+  unittest.main()
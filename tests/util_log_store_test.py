@@ -0,0 +1,102 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import os
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from rime.util import log_store
+
+
+class LogStoreTest(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.path = os.path.join(self.tmpdir, 'out', '.logs')
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+
+  def testPutAndGet(self):
+    store = log_store.LogStore(self.path)
+    self.assertEqual(store.Get('1.judge'), None)
+    store.Put('1.judge', 'WA\n')
+    store.Put('2.judge', '')
+    self.assertEqual(store.Get('1.judge'), 'WA\n')
+    self.assertEqual(store.Get('2.judge'), '')
+    self.assertEqual(store.Keys(), ['1.judge', '2.judge'])
+
+  def testLastRecordWins(self):
+    store = log_store.LogStore(self.path)
+    store.Put('1.judge', 'first')
+    store.Put('1.judge', 'second')
+    self.assertEqual(store.Get('1.judge'), 'second')
+    self.assertEqual(log_store.LogStore(self.path).Get('1.judge'), 'second')
+
+  def testSeesRecordsOfOtherWriters(self):
+    store = log_store.LogStore(self.path)
+    store.Put('1.judge', 'a')
+    log_store.LogStore(self.path).Put('2.judge', 'b')
+    self.assertEqual(store.Get('2.judge'), 'b')
+
+  def testIgnoresPartialRecord(self):
+    store = log_store.LogStore(self.path)
+    store.Put('1.judge', 'ok')
+    with open(self.path, 'ab') as f:
+      f.write('["2.judge", 100]\nshort')
+    store = log_store.LogStore(self.path)
+    self.assertEqual(store.Keys(), ['1.judge'])
+
+  def testResetAfterRemoval(self):
+    store = log_store.LogStore(self.path)
+    store.Put('1.judge', 'ok')
+    os.remove(self.path)
+    self.assertEqual(store.Get('1.judge'), None)
+    store.Put('2.judge', 'ok')
+    self.assertEqual(store.Keys(), ['2.judge'])
+
+  def testCompaction(self):
+    store = log_store.LogStore(self.path)
+    data = 'x' * (log_store._COMPACT_MIN_GARBAGE // 4)
+    for _ in xrange(8):
+      store.Put('1.judge', data)
+    store.Put('2.judge', 'ok')
+    size = os.path.getsize(self.path)
+    store = log_store.LogStore(self.path)
+    self.assertEqual(store.Get('1.judge'), data)
+    self.assertEqual(store.Get('2.judge'), 'ok')
+    self.assertTrue(os.path.getsize(self.path) < size)
+
+  def testMaterialize(self):
+    store = log_store.LogStore(self.path)
+    store.Put('1.judge', 'WA\n')
+    dst = os.path.join(self.tmpdir, '1.judge')
+    self.assertTrue(store.Materialize('1.judge', dst))
+    with open(dst) as f:
+      self.assertEqual(f.read(), 'WA\n')
+    self.assertFalse(store.Materialize('2.judge', dst))
+
+
+if __name__ == '__main__':
+  unittest.main()
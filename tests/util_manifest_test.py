@@ -0,0 +1,93 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import hashlib
+import os
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from rime.util import files
+from rime.util import manifest
+
+
+class ManifestTest(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+    files.InvalidatePath()
+
+  def _Path(self, name):
+    return os.path.join(self.tmpdir, name)
+
+  def _WriteOld(self, content, name):
+    # Entries of recently modified files are not reused.
+    files.WriteFile(content, self._Path(name))
+    os.utime(self._Path(name), (1000000000, 1000000000))
+    return self._Path(name)
+
+  def testScanFile(self):
+    path = self._WriteOld('1 2\n3 4\n', 'a.in')
+    entry = manifest.ScanFile(path)
+    self.assertEqual(entry['size'], 8)
+    self.assertEqual(entry['lines'], 2)
+    self.assertEqual(entry['md5'], hashlib.md5('1 2\n3 4\n').hexdigest())
+    self.assertEqual(entry['sha1'], files.GetFileHash(path))
+    self.assertEqual(entry['mtime'], 1000000000)
+
+  def testReuseUnchangedEntries(self):
+    path = self._WriteOld('data\n', 'a.in')
+    previous = dict(manifest.ScanFile(path), md5='reused')
+    self.assertEqual(manifest.ScanFile(path, previous)['md5'], 'reused')
+    files.WriteFile('changed\n', path)
+    entry = manifest.ScanFile(path, previous)
+    self.assertNotEqual(entry['md5'], 'reused')
+    self.assertIsNone(entry['mtime'])
+
+  def testScanFiles(self):
+    paths = [self._WriteOld('%d\n' % i, '%d.in' % i) for i in xrange(10)]
+    entries = manifest.ScanFiles(paths, parallelism=4)
+    self.assertEqual(sorted(entries.keys()), sorted(paths))
+    for path in paths:
+      self.assertEqual(entries[path]['sha1'], files.GetFileHash(path))
+
+  def testHashContents(self):
+    paths = [self._WriteOld('1 2\n', 'a.in'), self._WriteOld('3 4\n', 'b.in')]
+    self.assertEqual(manifest.HashContents(paths),
+                     hashlib.md5('1 2\n3 4\n').hexdigest())
+    self.assertEqual(manifest.HashContents([]), hashlib.md5().hexdigest())
+
+  def testLoadIgnoresOtherVersions(self):
+    path = self._Path('manifest.json')
+    self.assertIsNone(manifest.Load(path))
+    manifest.Save({'cases': [], 'files': {}}, path)
+    self.assertEqual(manifest.Load(path)['cases'], [])
+    files.WriteFile('{"version": 0}', path)
+    self.assertIsNone(manifest.Load(path))
+
+
+if __name__ == '__main__':
+  unittest.main()
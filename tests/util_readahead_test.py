@@ -0,0 +1,75 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import os
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from rime.util import files
+from rime.util import readahead
+
+
+class PrefetcherTest(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.prefetched = []
+    self.saved_prefetch = readahead.Prefetch
+    readahead.Prefetch = self.prefetched.append
+    self.paths = []
+    for i in xrange(5):
+      path = os.path.join(self.tmpdir, '%d.in' % i)
+      files.WriteFile('x' * 10, path)
+      self.paths.append(path)
+
+  def tearDown(self):
+    readahead.Prefetch = self.saved_prefetch
+    shutil.rmtree(self.tmpdir)
+    files.InvalidatePath()
+
+  def testPrefetchWithinBudget(self):
+    prefetcher = readahead.Prefetcher(self.paths, budget=25)
+    prefetcher.Touch(self.paths[0])
+    self.assertEqual(self.prefetched, self.paths[:2])
+    prefetcher.Touch(self.paths[1])
+    self.assertEqual(self.prefetched, self.paths[:3])
+    # Out of order notifications do not move the window back.
+    prefetcher.Touch(self.paths[0])
+    self.assertEqual(self.prefetched, self.paths[:3])
+    # Files passed over are not prefetched any more.
+    prefetcher.Touch(self.paths[4])
+    self.assertEqual(self.prefetched, self.paths[:3] + self.paths[4:])
+
+  def testAlwaysPrefetchFileToRead(self):
+    prefetcher = readahead.Prefetcher(self.paths, budget=0)
+    prefetcher.Touch(self.paths[2])
+    self.assertEqual(self.prefetched, [self.paths[2]])
+
+  def testPrefetchMissingFile(self):
+    self.assertFalse(self.saved_prefetch(os.path.join(self.tmpdir, 'none')))
+    self.saved_prefetch(self.paths[0])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import os
+import os.path
+import shutil
+import tempfile
+import threading
+import unittest
+
+from rime.util import cache_store
+from rime.util import cas
+from rime.util import files
+from rime.util import remote_cache
+
+
+class RemoteCacheTest(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.server = remote_cache.CacheServer(
+      ('localhost', 0), os.path.join(self.tmpdir, 'server'))
+    self.thread = threading.Thread(target=self.server.serve_forever)
+    self.thread.start()
+    self.remote = remote_cache.RemoteCache(
+      'http://localhost:%d/' % self.server.server_address[1])
+
+  def tearDown(self):
+    self.server.shutdown()
+    self.server.server_close()
+    self.thread.join()
+    shutil.rmtree(self.tmpdir)
+
+  def testEntries(self):
+    self.remote.PutEntry('ns', 'a', {'verdict': 'Accepted'})
+    self.remote.PutEntry('ns', 'b', 42)
+    self.remote.Flush()
+    self.assertEqual(self.remote.GetEntries('ns', ['a', 'b', 'c']),
+                     {'a': {'verdict': 'Accepted'}, 'b': 42})
+
+  def testBlobs(self):
+    src = os.path.join(self.tmpdir, 'src')
+    files.WriteFile('hello', src)
+    digest = files.GetFileHash(src)
+    self.remote.PutBlob(digest, src)
+    self.remote.PutBlob('0' * 40, src)  # rejected by digest mismatch
+    self.remote.Flush()
+    get_path = lambda digest: os.path.join(self.tmpdir, 'dst', digest)
+    self.assertEqual(self.remote.FetchBlobs([digest, '0' * 40], get_path),
+                     [digest])
+    self.assertEqual(files.ReadFile(get_path(digest)), 'hello')
+
+  def testSecondTier(self):
+    store = cache_store.CacheStore(os.path.join(self.tmpdir, 'a.db'),
+                                   remote=self.remote)
+    content_store = cas.ContentStore(os.path.join(self.tmpdir, 'a'),
+                                     remote=self.remote)
+    src = os.path.join(self.tmpdir, 'src')
+    files.WriteFile('hello', src)
+    store.Put('ns', 'key', content_store.Put(src))
+    store.Close()
+    self.remote.Flush()
+
+    store = cache_store.CacheStore(os.path.join(self.tmpdir, 'b.db'),
+                                   remote=self.remote)
+    content_store = cas.ContentStore(os.path.join(self.tmpdir, 'b'),
+                                     remote=self.remote)
+    dst = os.path.join(self.tmpdir, 'dst')
+    self.assertTrue(content_store.Get(store.Get('ns', 'key'), dst))
+    self.assertEqual(files.ReadFile(dst), 'hello')
+    store.Close()
+
+  def testUnreachable(self):
+    self.server.shutdown()
+    self.server.server_close()
+    self.assertEqual(self.remote.GetEntries('ns', ['a']), {})
+    self.assertFalse(self.remote.IsAvailable())
+    self.server = remote_cache.CacheServer(
+      ('localhost', 0), os.path.join(self.tmpdir, 'server'))
+    self.thread.join()
+    self.thread = threading.Thread(target=self.server.serve_forever)
+    self.thread.start()
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import os
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from rime.util import files
+from rime.util import scratch
+
+
+class ScratchSpaceTest(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.root = os.path.join(self.tmpdir, 'shm')
+    self.fallback_dir = os.path.join(self.tmpdir, 'run')
+    os.mkdir(self.root)
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+    files.InvalidatePath()
+
+  def testRunDirsArePrivate(self):
+    space = scratch.ScratchSpace(self.root, self.fallback_dir)
+    dir1, on_scratch = space.CreateRunDir()
+    dir2, _ = space.CreateRunDir()
+    self.assertTrue(on_scratch)
+    self.assertNotEqual(dir1, dir2)
+    self.assertTrue(dir1.startswith(self.root + os.sep))
+    space.Close()
+    self.assertFalse(os.path.exists(dir1))
+    self.assertEqual(os.listdir(self.root), [])
+
+  def testFallbackWithoutRoot(self):
+    space = scratch.ScratchSpace(None, self.fallback_dir)
+    run_dir, on_scratch = space.CreateRunDir()
+    self.assertFalse(on_scratch)
+    self.assertTrue(run_dir.startswith(self.fallback_dir + os.sep))
+    space.Close()
+
+  def testFallbackWhenRootIsFull(self):
+    space = scratch.ScratchSpace(self.root, self.fallback_dir)
+    space.HasFreeSpace = lambda: False
+    run_dir, on_scratch = space.CreateRunDir()
+    self.assertFalse(on_scratch)
+    self.assertTrue(run_dir.startswith(self.fallback_dir + os.sep))
+    space.Close()
+
+
+if __name__ == '__main__':
+  unittest.main()
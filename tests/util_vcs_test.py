@@ -0,0 +1,107 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+import os
+import os.path
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from rime.util import files
+from rime.util import vcs
+
+
+class GetChangedFilesTest(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.repo = os.path.join(self.tmpdir, 'repo')
+    os.mkdir(self.repo)
+    self._Git('init', '-q')
+    for name in ('a', 'b', 'c', 'sub/d'):
+      self._Write(name, name)
+    self._Write('.gitignore', 'ignored\n')
+    self._Git('add', '.')
+    self._Git('commit', '-q', '-m', 'initial')
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+
+  def _Git(self, *args):
+    subprocess.check_call(
+      ['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com'] +
+      list(args), cwd=self.repo)
+
+  def _Write(self, name, content):
+    path = os.path.join(self.repo, name)
+    files.MakeDir(os.path.dirname(path))
+    files.WriteFile(content, path)
+
+  def _Paths(self, *names):
+    return [os.path.join(self.repo, name) for name in names]
+
+  def testNoChanges(self):
+    self.assertEqual(vcs.GetChangedFiles(self.repo, 'HEAD'), [])
+
+  def testWorkingTreeChanges(self):
+    self._Write('a', 'modified')
+    os.remove(os.path.join(self.repo, 'b'))
+    self._Write('untracked', 'new')
+    self._Write('ignored', 'ignored')
+    self._Write('sub/with space', 'new')
+    self.assertEqual(vcs.GetChangedFiles(self.repo, 'HEAD'),
+                     self._Paths('a', 'b', 'sub/with space', 'untracked'))
+
+  def testCommittedChanges(self):
+    self._Write('a', 'modified')
+    self._Git('mv', 'c', 'renamed')
+    self._Git('commit', '-q', '-a', '-m', 'second')
+    self.assertEqual(vcs.GetChangedFiles(self.repo, 'HEAD'), [])
+    self.assertEqual(vcs.GetChangedFiles(self.repo, 'HEAD~1'),
+                     self._Paths('a', 'c', 'renamed'))
+
+  def testSubdirectory(self):
+    self._Write('a', 'modified')
+    self._Write('sub/d', 'modified')
+    sub = os.path.join(self.repo, 'sub')
+    self.assertEqual(vcs.GetChangedFiles(sub, 'HEAD'),
+                     self._Paths('a', 'sub/d'))
+
+  def testSymlinkedDir(self):
+    link = os.path.join(self.tmpdir, 'link')
+    os.symlink(self.repo, link)
+    self._Write('a', 'modified')
+    self.assertEqual(vcs.GetChangedFiles(link, 'HEAD'),
+                     [os.path.join(link, 'a')])
+
+  def testInvalidRevision(self):
+    self.assertRaises(vcs.VcsError, vcs.GetChangedFiles, self.repo,
+                      'no-such-revision')
+
+  def testNotRepository(self):
+    dir = os.path.join(self.tmpdir, 'other')
+    os.mkdir(dir)
+    self.assertRaises(vcs.VcsError, vcs.GetChangedFiles, dir, 'HEAD')
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,101 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2015 Rime Project.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+import os
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from rime.util import files
+from rime.util import watcher
+
+
+class WatcherTestMixin(object):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    files.MakeDir(os.path.join(self.tmpdir, 'sub'))
+    files.MakeDir(os.path.join(self.tmpdir, 'rime-out'))
+    self.watcher = self.CreateWatcher(
+      lambda path: os.path.basename(path) == 'rime-out')
+    self.watcher.AddTree(self.tmpdir)
+
+  def tearDown(self):
+    self.watcher.Close()
+    shutil.rmtree(self.tmpdir)
+
+  def testNoChanges(self):
+    self.assertEqual(self.watcher.Wait(timeout=0.1), [])
+
+  def testChanges(self):
+    path = os.path.join(self.tmpdir, 'sub', 'a.txt')
+    files.WriteFile('a', path)
+    files.WriteFile('b', os.path.join(self.tmpdir, 'rime-out', 'b.txt'))
+    files.WriteFile('c', os.path.join(self.tmpdir, 'sub', '.c.swp'))
+    self.assertEqual(self.watcher.Wait(timeout=5), [path])
+
+  def testNewDirectory(self):
+    files.MakeDir(os.path.join(self.tmpdir, 'new'))
+    self.watcher.Wait(timeout=5)
+    path = os.path.join(self.tmpdir, 'new', 'a.txt')
+    files.WriteFile('a', path)
+    self.assertIn(path, self.watcher.Wait(timeout=5))
+
+  def testRemoveTree(self):
+    other = tempfile.mkdtemp()
+    try:
+      self.watcher.AddTree(other)
+      self.watcher.RemoveTree(other)
+      files.WriteFile('a', os.path.join(other, 'a.txt'))
+      self.assertEqual(self.watcher.Wait(timeout=0.1), [])
+    finally:
+      shutil.rmtree(other)
+
+  def testRemoveOverlappingTree(self):
+    sub = os.path.join(self.tmpdir, 'sub')
+    self.watcher.AddTree(sub)
+    self.watcher.RemoveTree(sub)
+    path = os.path.join(sub, 'a.txt')
+    files.WriteFile('a', path)
+    self.assertEqual(self.watcher.Wait(timeout=5), [path])
+    self.watcher.RemoveTree(self.tmpdir)
+    files.WriteFile('b', path)
+    self.assertEqual(self.watcher.Wait(timeout=0.1), [])
+
+
+class PollingWatcherTest(WatcherTestMixin, unittest.TestCase):
+  def CreateWatcher(self, ignore):
+    return watcher.PollingWatcher(ignore)
+
+
+class InotifyWatcherTest(WatcherTestMixin, unittest.TestCase):
+  def CreateWatcher(self, ignore):
+    return watcher.InotifyWatcher(ignore)
+
+
+if watcher._LoadLibc() is None:
+  del InotifyWatcherTest
+
+
+if __name__ == '__main__':
+  unittest.main()